@@ -4,10 +4,18 @@ Thiết lập giao diện admin cho tất cả các model
 """
 
 from django.contrib import admin
+from django.utils import timezone
 from .models import (
     Category, Product, Order, UserProfile,
-    Warehouse, WarehouseStock, StockMovement
+    Warehouse, WarehouseStock, StockMovement, StockSnapshot,
+    StockMovementArchive, StockMovementDailyRollup, DemandForecast,
+    TransferProposal, OrderItem, Job, QueuedEmail,
+    OutboxEvent, OutboxConsumerOffset
 )
+from .allocation import allocate_orders
+from .search import search_ranking
+from .stock_counters import demote, promote
+from .rebalancing import apply_proposal
 
 
 # ========== USER ADMIN ==========
@@ -76,25 +84,61 @@ class WarehouseAdmin(admin.ModelAdmin):
 
 # ========== STOCK MANAGEMENT ADMIN ==========
 
+class NeedsReorderFilter(admin.SimpleListFilter):
+    """Lọc dòng tồn kho theo kết quả dự báo tiêu thụ (lệnh compute_demand)"""
+    title = 'Cần đặt hàng'
+    parameter_name = 'reorder'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('yes', 'Cần đặt hàng'),
+            ('no', 'Đủ hàng'),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(demand__needs_reorder=True)
+        if self.value() == 'no':
+            return queryset.exclude(demand__needs_reorder=True)
+        return queryset
+
+
 @admin.register(WarehouseStock)
 class WarehouseStockAdmin(admin.ModelAdmin):
-    list_display = ['product', 'warehouse', 'quantity', 'last_counted']
-    list_filter = ['warehouse', 'product__category', 'last_counted']
+    list_display = ['product', 'warehouse', 'quantity', 'bin_location', 'is_sharded', 'last_counted']
+    list_filter = [NeedsReorderFilter, 'warehouse', 'product__category', 'is_sharded', 'last_counted']
     search_fields = ['product__name', 'warehouse__name', 'product__sku']
-    readonly_fields = ['last_counted']
+    readonly_fields = ['last_counted', 'is_sharded']
+    actions = ['shard_selected', 'unshard_selected']
     
     fieldsets = (
         ('📦 Sản phẩm & Kho', {
-            'fields': ('product', 'warehouse')
+            'fields': ('product', 'warehouse', 'bin_location')
         }),
         ('📊 Số lượng', {
-            'fields': ('quantity',)
+            'fields': ('quantity', 'is_sharded')
         }),
         ('📝 Ghi chú', {
             'fields': ('notes', 'last_counted'),
             'classes': ('collapse',)
         }),
     )
+    
+    def get_readonly_fields(self, request, obj=None):
+        # Dòng đang chia phần: quantity chỉ là tổng được đồng bộ, không sửa trực tiếp
+        if obj is not None and obj.is_sharded:
+            return self.readonly_fields + ['quantity']
+        return self.readonly_fields
+    
+    @admin.action(description='Chia phần số lượng (dòng bán chạy)')
+    def shard_selected(self, request, queryset):
+        promoted = sum(promote(stock) for stock in queryset)
+        self.message_user(request, f'Đã chia phần {promoted} dòng tồn kho.')
+    
+    @admin.action(description='Gộp các phần về một dòng')
+    def unshard_selected(self, request, queryset):
+        demoted = sum(demote(stock) for stock in queryset)
+        self.message_user(request, f'Đã gộp {demoted} dòng tồn kho.')
 
 
 @admin.register(StockMovement)
@@ -116,6 +160,72 @@ class StockMovementAdmin(admin.ModelAdmin):
         }),
     )
 
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['warehouse_stock', 'quantity', 'last_movement_id', 'taken_at']
+    list_filter = ['taken_at', 'warehouse_stock__warehouse']
+    search_fields = ['warehouse_stock__product__name', 'warehouse_stock__product__sku']
+    readonly_fields = ['warehouse_stock', 'quantity', 'last_movement_id', 'taken_at']
+    date_hierarchy = 'taken_at'
+
+
+@admin.register(DemandForecast)
+class DemandForecastAdmin(admin.ModelAdmin):
+    list_display = [
+        'warehouse_stock', 'velocity', 'demand_stddev', 'days_of_cover',
+        'reorder_point', 'needs_reorder', 'computed_at',
+    ]
+    list_filter = ['needs_reorder', 'warehouse_stock__warehouse']
+    search_fields = ['warehouse_stock__product__name', 'warehouse_stock__product__sku']
+    readonly_fields = list_display
+    ordering = ['days_of_cover']
+
+
+@admin.register(TransferProposal)
+class TransferProposalAdmin(admin.ModelAdmin):
+    list_display = ['product', 'source', 'destination', 'quantity', 'status', 'batch', 'created_at']
+    list_filter = ['status', 'batch', 'source', 'destination']
+    search_fields = ['product__name', 'product__sku', 'batch']
+    readonly_fields = ['batch', 'product', 'source', 'destination', 'quantity', 'created_at']
+    actions = ['apply_selected', 'reject_selected']
+
+    @admin.action(description='Thực hiện các đề xuất đã chọn')
+    def apply_selected(self, request, queryset):
+        applied = skipped = 0
+        for proposal in queryset.filter(status='proposed'):
+            if apply_proposal(proposal, user=request.user):
+                applied += 1
+            else:
+                skipped += 1
+        self.message_user(request, f'Đã thực hiện {applied} đề xuất, bỏ qua {skipped} (kho nguồn không đủ hàng).')
+
+    @admin.action(description='Từ chối các đề xuất đã chọn')
+    def reject_selected(self, request, queryset):
+        updated = queryset.filter(status='proposed').update(status='rejected')
+        self.message_user(request, f'Đã từ chối {updated} đề xuất.')
+
+
+@admin.register(StockMovementArchive)
+class StockMovementArchiveAdmin(admin.ModelAdmin):
+    list_display = ['id', 'movement_type', 'warehouse_stock', 'quantity', 'reference', 'created_at', 'archived_at']
+    list_filter = ['movement_type', 'warehouse_stock__warehouse']
+    search_fields = ['reference', 'warehouse_stock__product__name']
+    readonly_fields = [
+        'id', 'warehouse_stock', 'movement_type', 'quantity', 'reference',
+        'notes', 'created_by', 'created_at', 'archived_at',
+    ]
+
+
+@admin.register(StockMovementDailyRollup)
+class StockMovementDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['day', 'warehouse', 'product', 'movement_type', 'quantity', 'movement_count']
+    list_filter = ['movement_type', 'warehouse']
+    search_fields = ['product__name', 'product__sku']
+    readonly_fields = ['day', 'warehouse', 'product', 'movement_type', 'quantity', 'movement_count']
+    date_hierarchy = 'day'
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'created_at']
@@ -130,17 +240,24 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'sku', 'price', 'category', 'stock', 'get_warehouse_stock']
+    list_display = ['name', 'sku', 'price', 'category', 'stock', 'available_quantity']
     list_filter = ['category', 'created_at']
     search_fields = ['name', 'description', 'sku']
-    readonly_fields = ['created_at', 'updated_at', 'total_warehouse_stock']
+    readonly_fields = ['created_at', 'updated_at', 'total_warehouse_stock', 'available_quantity']
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Tìm qua chỉ mục đảo (không phân biệt dấu) thay vì LIKE trên từng cột"""
+        ranking = search_ranking(search_term)
+        if ranking is None:
+            return queryset, False
+        return queryset.filter(id__in=ranking.values('product_id')), False
     
     fieldsets = (
         ('📦 Thông tin cơ bản', {
             'fields': ('name', 'sku', 'category', 'price')
         }),
         ('📊 Tồn kho', {
-            'fields': ('stock', 'total_warehouse_stock')
+            'fields': ('stock', 'total_warehouse_stock', 'available_quantity')
         }),
         ('📝 Chi tiết', {
             'fields': ('description', 'image')
@@ -150,11 +267,13 @@ class ProductAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
-    
-    def get_warehouse_stock(self, obj):
-        """Lấy tổng tồn kho của sản phẩm ở tất cả các kho"""
-        return obj.total_warehouse_stock
-    get_warehouse_stock.short_description = "Tồn kho kho"
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    fields = ['product', 'quantity', 'price', 'warehouse']
+    raw_id_fields = ['product']
 
 
 @admin.register(Order)
@@ -163,6 +282,8 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at', 'warehouse']
     search_fields = ['customer_name', 'phone', 'address', 'user__username']
     readonly_fields = ['created_at', 'updated_at']
+    inlines = [OrderItemInline]
+    actions = ['allocate_selected']
     
     fieldsets = (
         ('📋 Thông tin đơn hàng', {
@@ -180,3 +301,61 @@ class OrderAdmin(admin.ModelAdmin):
         """Lấy tên người dùng hoặc hiển thị 'Khách' nếu chưa đăng nhập"""
         return obj.user.username if obj.user else "Khách (chưa đăng nhập)"
     get_user.short_description = "Người dùng"
+
+    @admin.action(description='Tự động phân kho cho các đơn đã chọn')
+    def allocate_selected(self, request, queryset):
+        result = allocate_orders(order_ids=list(queryset.values_list('id', flat=True)))
+        self.message_user(
+            request,
+            f'Đã phân kho {len(result.allocated)} đơn ({len(result.split)} đơn tách kho), '
+            f'{len(result.skipped)} đơn chưa đủ hàng hoặc đã có kho.'
+        )
+
+
+# ========== BACKGROUND JOB ADMIN ==========
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'queue', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'finished_at']
+    list_filter = ['status', 'queue', 'task']
+    search_fields = ['task', 'last_error']
+    readonly_fields = ['attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at']
+    actions = ['retry_selected']
+
+    @admin.action(description='Chạy lại các công việc thất bại đã chọn')
+    def retry_selected(self, request, queryset):
+        updated = queryset.filter(status='failed').update(
+            status='queued', attempts=0, run_at=timezone.now(), finished_at=None,
+        )
+        self.message_user(request, f'Đã đưa {updated} công việc trở lại hàng đợi.')
+
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'order', 'to_email', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['to_email', 'subject', 'order__id']
+    readonly_fields = ['kind', 'order', 'to_email', 'subject', 'body_text', 'body_html',
+                       'attempts', 'locked_at', 'last_error', 'created_at', 'sent_at']
+    actions = ['retry_selected']
+
+    @admin.action(description='Gửi lại các email thất bại đã chọn')
+    def retry_selected(self, request, queryset):
+        updated = queryset.filter(status='failed').update(
+            status='queued', attempts=0, next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f'Đã đưa {updated} email trở lại hàng đợi.')
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'topic', 'event_type', 'object_id', 'created_at']
+    list_filter = ['topic', 'event_type']
+    search_fields = ['object_id']
+    readonly_fields = ['topic', 'event_type', 'object_id', 'payload', 'created_at']
+
+
+@admin.register(OutboxConsumerOffset)
+class OutboxConsumerOffsetAdmin(admin.ModelAdmin):
+    list_display = ['consumer', 'last_event_id', 'failures', 'updated_at']
+    readonly_fields = ['failures', 'last_error', 'updated_at']
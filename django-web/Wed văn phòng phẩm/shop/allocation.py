@@ -0,0 +1,177 @@
+"""
+Phân kho xuất hàng tự động cho các đơn hàng đang chờ
+
+Toàn bộ lô đơn hàng được xử lý trên một ma trận tồn kho khả dụng
+(sản phẩm x kho) dựng sẵn từ WarehouseStock, trừ đi phần đã giữ cho các
+đơn hàng đã được phân kho nhưng chưa xuất. Đơn hàng được xét theo thứ tự
+đặt hàng, mỗi đơn trừ vào ma trận nên các đơn sau thấy đúng lượng còn lại.
+
+Ưu tiên giao từ một kho duy nhất; nếu không kho nào đủ hàng cho cả đơn thì
+tách đơn tham lam: mỗi bước chọn kho đáp ứng được nhiều dòng còn lại nhất.
+Kết quả được ghi bằng một bulk update cho mỗi bảng.
+"""
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Order, OrderItem, Warehouse, WarehouseStock
+from .outbox import record_events
+from .stock_counters import stock_quantity
+
+
+# Đơn hàng đã phân kho ở các trạng thái này vẫn đang giữ hàng trong kho
+RESERVING_STATUSES = ('pending', 'confirmed')
+
+
+@dataclass
+class AllocationResult:
+    allocated: list = field(default_factory=list)   # ID đơn hàng đã phân kho
+    split: list = field(default_factory=list)       # ID đơn hàng phải tách kho
+    skipped: list = field(default_factory=list)     # ID đơn hàng không đủ hàng
+
+
+def build_availability(product_ids):
+    """
+    Dựng ma trận tồn kho khả dụng cho các sản phẩm trong lô.
+
+    Trả về:
+        tuple: (ma trận (P, W) int64, {product_id: hàng}, mảng warehouse_id)
+    """
+    warehouse_ids = np.array(
+        Warehouse.objects.filter(is_active=True).order_by('id').values_list('id', flat=True),
+        dtype=np.int64,
+    )
+    row_of = {pid: i for i, pid in enumerate(sorted(product_ids))}
+    col_of = {wid: j for j, wid in enumerate(warehouse_ids.tolist())}
+    available = np.zeros((len(row_of), len(col_of)), dtype=np.int64)
+
+    for product_id, warehouse_id, quantity in WarehouseStock.objects.filter(
+        product_id__in=row_of, warehouse_id__in=col_of
+    ).annotate(current=stock_quantity()).values_list('product_id', 'warehouse_id', 'current'):
+        available[row_of[product_id], col_of[warehouse_id]] = quantity
+
+    reserved = (
+        OrderItem.objects
+        .filter(product_id__in=row_of, warehouse_id__in=col_of, order__status__in=RESERVING_STATUSES)
+        .values('product_id', 'warehouse_id')
+        .annotate(total=Sum('quantity'))
+        .order_by()
+    )
+    for row in reserved:
+        available[row_of[row['product_id']], col_of[row['warehouse_id']]] -= row['total']
+
+    return available, row_of, warehouse_ids
+
+
+def choose_warehouses(available, rows, quantities):
+    """
+    Chọn kho cho từng dòng của một đơn hàng và trừ vào ma trận `available`.
+
+    Tham số:
+        available: Ma trận tồn kho khả dụng (được cập nhật tại chỗ)
+        rows: Mảng chỉ số hàng (sản phẩm) của các dòng
+        quantities: Mảng số lượng của các dòng
+
+    Trả về:
+        np.ndarray | None: Chỉ số cột (kho) cho từng dòng, None nếu không đủ hàng
+    """
+    stock = available[rows]                        # (L, W)
+    fits = stock >= quantities[:, None]            # dòng nào kho nào đáp ứng được
+    if not fits.any(axis=1).all():
+        return None
+
+    whole = fits.all(axis=0)
+    if whole.any():
+        # Một kho giao cả đơn: chọn kho còn nhiều hàng nhất sau khi trừ
+        remaining = np.where(whole, (stock - quantities[:, None]).sum(axis=0), -1)
+        columns = np.full(len(rows), int(np.argmax(remaining)))
+    else:
+        columns = np.full(len(rows), -1)
+        pending = np.ones(len(rows), dtype=bool)
+        while pending.any():
+            coverage = (fits & pending[:, None]).sum(axis=0)
+            best = int(np.argmax(coverage))
+            chosen = pending & fits[:, best]
+            columns[chosen] = best
+            pending &= ~chosen
+
+    np.subtract.at(available, (rows, columns), quantities)
+    return columns
+
+
+def allocate_orders(order_ids=None, limit=None):
+    """
+    Phân kho cho các đơn hàng 'pending' chưa có kho.
+
+    Tham số:
+        order_ids: Chỉ xét các đơn hàng này (mặc định: tất cả đơn đang chờ)
+        limit: Số đơn tối đa mỗi lần chạy
+
+    Trả về:
+        AllocationResult
+    """
+    result = AllocationResult()
+    with transaction.atomic():
+        orders = (
+            Order.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='pending', warehouse__isnull=True)
+            .order_by('created_at', 'id')
+        )
+        if order_ids is not None:
+            orders = orders.filter(id__in=order_ids)
+        if limit:
+            orders = orders[:limit]
+        # outbox_payload() đọc status/user_id: nạp sẵn để không truy vấn thêm cho từng đơn
+        orders = list(orders.only('id', 'status', 'user_id'))
+        if not orders:
+            return result
+
+        items_by_order = defaultdict(list)
+        for item in OrderItem.objects.filter(order__in=orders).only('id', 'order_id', 'product_id', 'quantity'):
+            items_by_order[item.order_id].append(item)
+
+        product_ids = {item.product_id for items in items_by_order.values() for item in items}
+        available, row_of, warehouse_ids = build_availability(product_ids)
+        if not len(warehouse_ids):
+            result.skipped = [order.id for order in orders]
+            return result
+
+        changed_items = []
+        for order in orders:
+            items = items_by_order.get(order.id)
+            if not items:
+                result.skipped.append(order.id)
+                continue
+            rows = np.array([row_of[item.product_id] for item in items])
+            quantities = np.array([item.quantity for item in items], dtype=np.int64)
+            columns = choose_warehouses(available, rows, quantities)
+            if columns is None:
+                result.skipped.append(order.id)
+                continue
+
+            for item, column in zip(items, columns):
+                item.warehouse_id = int(warehouse_ids[column])
+                changed_items.append(item)
+            # Kho chính của đơn: kho xuất nhiều dòng nhất
+            order.warehouse_id = int(warehouse_ids[Counter(columns.tolist()).most_common(1)[0][0]])
+            result.allocated.append(order)
+            if len(set(columns.tolist())) > 1:
+                result.split.append(order.id)
+
+        # bulk_update bỏ qua auto_now: tự cập nhật updated_at để tổng hợp doanh thu
+        # theo kho (mốc updated_at, shop/reports.py) thấy đơn vừa được phân kho
+        now = timezone.now()
+        for order in result.allocated:
+            order.updated_at = now
+        OrderItem.objects.bulk_update(changed_items, ['warehouse'], batch_size=1000)
+        Order.objects.bulk_update(result.allocated, ['warehouse', 'updated_at'], batch_size=1000)
+        record_events('order', [(order.id, order.outbox_payload()) for order in result.allocated])
+
+    result.allocated = [order.id for order in result.allocated]
+    return result
@@ -7,3 +7,5 @@ class ShopConfig(AppConfig):
     
     def ready(self):
         import shop.signals
+        import shop.tasks
+        import shop.consumers
@@ -0,0 +1,171 @@
+"""
+Lưu trữ chuyển động hàng cũ và tổng hợp theo ngày
+
+Bảng `shop_stockmovement` chỉ giữ các chuyển động trong khoảng thời gian lưu
+giữ. Chuyển động cũ hơn được cộng dồn vào `StockMovementDailyRollup` rồi
+chuyển sang `StockMovementArchive` theo từng lô nhỏ, mỗi lô một transaction
+để không giữ khóa lâu.
+
+Báo cáo đọc tổng hợp cho phần đã lưu trữ và dòng gốc cho phần gần đây; vì
+mỗi chuyển động nằm ở đúng một trong hai nơi nên tổng luôn khớp.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import StockMovement, StockMovementArchive, StockMovementDailyRollup
+
+
+DEFAULT_RETENTION_DAYS = 180
+
+
+def retention_cutoff(days=None):
+    """Mốc thời gian: chuyển động trước mốc này được lưu trữ (setting STOCK_MOVEMENT_RETENTION_DAYS)"""
+    if days is None:
+        days = getattr(settings, 'STOCK_MOVEMENT_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    return timezone.now() - timedelta(days=days)
+
+
+def day_bounds(start, end):
+    """Chuyển khoảng ngày [start, end] thành khoảng datetime [đầu ngày start, đầu ngày end + 1)"""
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def _fold_into_rollups(rows):
+    """Cộng dồn các chuyển động (dạng dict) vào bảng tổng hợp theo ngày"""
+    totals = defaultdict(lambda: [0, 0])
+    for row in rows:
+        key = (
+            timezone.localdate(row['created_at']),
+            row['warehouse_stock__warehouse_id'],
+            row['warehouse_stock__product_id'],
+            row['movement_type'],
+        )
+        totals[key][0] += row['quantity']
+        totals[key][1] += 1
+
+    existing = {
+        (r.day, r.warehouse_id, r.product_id, r.movement_type): r
+        for r in StockMovementDailyRollup.objects.select_for_update().filter(
+            day__in={key[0] for key in totals},
+            warehouse_id__in={key[1] for key in totals},
+            product_id__in={key[2] for key in totals},
+        )
+    }
+
+    to_update, to_create = [], []
+    for key, (quantity, count) in totals.items():
+        rollup = existing.get(key)
+        if rollup is not None:
+            rollup.quantity += quantity
+            rollup.movement_count += count
+            to_update.append(rollup)
+        else:
+            day, warehouse_id, product_id, movement_type = key
+            to_create.append(StockMovementDailyRollup(
+                day=day,
+                warehouse_id=warehouse_id,
+                product_id=product_id,
+                movement_type=movement_type,
+                quantity=quantity,
+                movement_count=count,
+            ))
+
+    StockMovementDailyRollup.objects.bulk_update(to_update, ['quantity', 'movement_count'])
+    StockMovementDailyRollup.objects.bulk_create(to_create)
+
+
+def archive_batch(cutoff, batch_size=1000):
+    """
+    Lưu trữ một lô chuyển động cũ hơn `cutoff` trong một transaction.
+
+    Các dòng được khóa theo thứ tự khóa chính (bỏ qua dòng đang bị khóa),
+    cộng vào bảng tổng hợp, chép sang bảng lưu trữ rồi xóa khỏi bảng chính.
+
+    Trả về:
+        int: Số chuyển động đã lưu trữ (0 khi không còn gì để lưu trữ)
+    """
+    with transaction.atomic():
+        ids = list(
+            StockMovement.objects
+            .select_for_update(skip_locked=True)
+            .filter(created_at__lt=cutoff)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        rows = list(
+            StockMovement.objects.filter(id__in=ids).values(
+                'id', 'warehouse_stock_id', 'warehouse_stock__warehouse_id',
+                'warehouse_stock__product_id', 'movement_type', 'quantity',
+                'reference', 'notes', 'created_by_id', 'created_at',
+            )
+        )
+        _fold_into_rollups(rows)
+        StockMovementArchive.objects.bulk_create([
+            StockMovementArchive(
+                id=row['id'],
+                warehouse_stock_id=row['warehouse_stock_id'],
+                movement_type=row['movement_type'],
+                quantity=row['quantity'],
+                reference=row['reference'],
+                notes=row['notes'],
+                created_by_id=row['created_by_id'],
+                created_at=row['created_at'],
+            )
+            for row in rows
+        ])
+        StockMovement.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def movement_summary(start, end, warehouse_id=None, movement_type=None):
+    """
+    Tổng số lượng và số chuyển động theo loại trong khoảng ngày [start, end].
+
+    Phần đã lưu trữ được đọc từ bảng tổng hợp, phần còn lại đọc từ bảng
+    chuyển động gốc (có index theo created_at).
+
+    Trả về:
+        list[dict]: [{'movement_type', 'label', 'quantity', 'movement_count'}, ...]
+    """
+    rollups = StockMovementDailyRollup.objects.filter(day__gte=start, day__lte=end)
+    start_dt, end_dt = day_bounds(start, end)
+    recent = StockMovement.objects.filter(created_at__gte=start_dt, created_at__lt=end_dt)
+
+    if warehouse_id:
+        rollups = rollups.filter(warehouse_id=warehouse_id)
+        recent = recent.filter(warehouse_stock__warehouse_id=warehouse_id)
+    if movement_type:
+        rollups = rollups.filter(movement_type=movement_type)
+        recent = recent.filter(movement_type=movement_type)
+
+    totals = defaultdict(lambda: {'quantity': 0, 'movement_count': 0})
+    for row in rollups.values('movement_type').annotate(
+        total=Sum('quantity'), count=Sum('movement_count')
+    ).order_by():
+        totals[row['movement_type']]['quantity'] += row['total'] or 0
+        totals[row['movement_type']]['movement_count'] += row['count'] or 0
+    for row in recent.values('movement_type').annotate(
+        total=Sum('quantity'), count=Count('id')
+    ).order_by():
+        totals[row['movement_type']]['quantity'] += row['total'] or 0
+        totals[row['movement_type']]['movement_count'] += row['count']
+
+    labels = dict(StockMovement.MOVEMENT_TYPES)
+    return [
+        {'movement_type': value, 'label': labels[value], **totals[value]}
+        for value, _ in StockMovement.MOVEMENT_TYPES
+        if value in totals
+    ]
@@ -0,0 +1,194 @@
+"""
+Gợi ý tìm kiếm (autocomplete) từ chỉ mục tiền tố trong bộ nhớ
+
+Mỗi worker giữ một mảng đã sắp xếp các khóa (chuỗi đã bỏ dấu, xem
+search.fold) kèm ID sản phẩm. Khóa gồm SKU và tên sản phẩm bắt đầu từ mỗi
+từ, nên "thien" khớp cả "Bút bi Thiên Long". Tra cứu tiền tố là hai lần
+bisect trên mảng, không truy cập cơ sở dữ liệu.
+
+Kết quả xếp theo độ phổ biến (tổng số lượng đã bán qua OrderItem). Tiền tố
+khớp quá nhiều khóa (thường là tiền tố ngắn) được ghi nhớ kết quả đến lần
+cập nhật chỉ mục tiếp theo.
+
+Chỉ mục được làm mới tối đa mỗi AUTOCOMPLETE_REFRESH_SECONDS: worker so sánh
+dấu phiên bản (số sản phẩm, updated_at lớn nhất, tổng ID) rồi chỉ nạp lại
+các sản phẩm đã đổi (updated_at từ mốc trước) và bỏ các sản phẩm đã xóa (so
+tập ID). Chỉ mục đang dùng không bao giờ bị sửa: bản mới được dựng riêng rồi
+thay tham chiếu, nên các thread đọc không cần khóa.
+"""
+
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max, Q, Sum
+
+from .models import OrderItem, Product
+from .search import fold
+
+
+MAX_KEY_WORDS = 8
+# Ghi nhớ kết quả của tiền tố khớp từ MEMO_MIN_RANGE khóa trở lên, tối đa MEMO_MAX_SIZE tiền tố
+MEMO_MIN_RANGE = 500
+MEMO_MAX_SIZE = 20000
+_SENTINEL = '\uffff'
+# Khi làm mới, nạp lại cả sản phẩm sửa ngay trước mốc lần trước (transaction commit trễ)
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+def product_keys(name, sku):
+    """Các khóa tiền tố của một sản phẩm: tên bắt đầu từ mỗi từ và SKU"""
+    words = fold(name).split()
+    keys = {' '.join(words[i:]) for i in range(min(len(words), MAX_KEY_WORDS))}
+    if sku:
+        keys.add(fold(sku))
+    return keys
+
+
+class PrefixIndex:
+    """Mảng (khóa, product_id) đã sắp xếp cùng thông tin hiển thị và độ phổ biến"""
+
+    def __init__(self):
+        self.entries = []
+        self.products = {}
+        self.memo = {}
+
+    @classmethod
+    def build(cls, rows):
+        """Dựng chỉ mục từ các bộ (id, name, sku, popularity)"""
+        index = cls()
+        entries = []
+        for product_id, name, sku, popularity in rows:
+            index.products[product_id] = (name, sku, popularity)
+            entries.extend((key, product_id) for key in product_keys(name, sku))
+        entries.sort()
+        index.entries = entries
+        return index
+
+    def with_changes(self, changed, removed, popularity):
+        """
+        Chỉ mục mới với các sản phẩm đã thêm/sửa (`changed`: (id, name, sku)) và đã xóa.
+
+        Chỉ mục hiện tại không bị sửa nên các thread khác đọc nó mà không cần khóa;
+        worker thay tham chiếu sang chỉ mục mới khi dựng xong.
+        """
+        index = PrefixIndex()
+        index.products = dict(self.products)
+        for product_id in removed:
+            index.products.pop(product_id, None)
+        added = []
+        for product_id, name, sku in changed:
+            index.products[product_id] = (name, sku, popularity.get(product_id, 0))
+            added.extend((key, product_id) for key in product_keys(name, sku))
+        added.sort()
+        dropped = set(removed) | {row[0] for row in changed}
+        index.entries = list(heapq.merge(
+            (entry for entry in self.entries if entry[1] not in dropped), added,
+        ))
+        return index
+
+    def suggest(self, query, limit=10):
+        """
+        Gợi ý sản phẩm có khóa bắt đầu bằng `query` (đã chuẩn hóa).
+
+        Trả về:
+            list: [(product_id, name, sku)] theo độ phổ biến giảm dần
+        """
+        prefix = ' '.join(fold(query).split())
+        if not prefix:
+            return []
+        memo_key = (prefix, limit)
+        if memo_key in self.memo:
+            return self.memo[memo_key]
+
+        start = bisect_left(self.entries, (prefix,))
+        end = bisect_left(self.entries, (prefix + _SENTINEL,), start)
+        candidates = {self.entries[i][1] for i in range(start, end)}
+        products = self.products
+        best = heapq.nsmallest(
+            limit, candidates,
+            key=lambda pid: (-products[pid][2], len(products[pid][0]), pid),
+        )
+        result = [(pid, products[pid][0], products[pid][1]) for pid in best]
+        if end - start >= MEMO_MIN_RANGE:
+            if len(self.memo) >= MEMO_MAX_SIZE:
+                self.memo.clear()
+            self.memo[memo_key] = result
+        return result
+
+
+def _catalog_stamp():
+    # Tổng ID đổi khi xóa một sản phẩm rồi thêm sản phẩm khác (số lượng giữ nguyên)
+    stamp = Product.objects.aggregate(count=Count('id'), latest=Max('updated_at'), id_sum=Sum('id'))
+    return stamp['count'], stamp['latest'], stamp['id_sum']
+
+
+def _popularity(product_ids=None):
+    rows = OrderItem.objects.values('product_id').annotate(units=Sum('quantity')).order_by()
+    if product_ids is not None:
+        rows = rows.filter(product_id__in=product_ids)
+    return {row['product_id']: row['units'] for row in rows}
+
+
+def build_from_catalog():
+    """Dựng chỉ mục đầy đủ từ bảng Product"""
+    popularity = _popularity()
+    rows = (
+        (product_id, name, sku, popularity.get(product_id, 0))
+        for product_id, name, sku in Product.objects.values_list('id', 'name', 'sku').iterator(chunk_size=5000)
+    )
+    return PrefixIndex.build(rows)
+
+
+class _WorkerIndex:
+    """Chỉ mục của worker hiện tại, tự làm mới theo chu kỳ"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.stamp = None
+        self.checked_at = 0.0
+
+    def get(self):
+        interval = getattr(settings, 'AUTOCOMPLETE_REFRESH_SECONDS', 30)
+        if self.index is not None and time.monotonic() - self.checked_at < interval:
+            return self.index
+        with self.lock:
+            if self.index is None or time.monotonic() - self.checked_at >= interval:
+                self.refresh()
+        return self.index
+
+    def refresh(self):
+        stamp = _catalog_stamp()
+        if self.index is None:
+            self.index = build_from_catalog()
+        elif stamp != self.stamp:
+            # Chỉ nạp lại sản phẩm mới/đã sửa kể từ lần trước (lùi lại REFRESH_OVERLAP để
+            # bắt transaction commit trễ) và bỏ các sản phẩm không còn trong bảng
+            current_ids = set(Product.objects.values_list('id', flat=True))
+            removed = self.index.products.keys() - current_ids
+            changed = Product.objects.values_list('id', 'name', 'sku')
+            if self.stamp[1] is not None:
+                changed = changed.filter(
+                    Q(updated_at__gte=self.stamp[1] - REFRESH_OVERLAP)
+                    | Q(id__in=current_ids - self.index.products.keys())
+                )
+            changed = list(changed)
+            popularity = _popularity([row[0] for row in changed])
+            self.index = self.index.with_changes(changed, removed, popularity)
+        self.stamp = stamp
+        self.checked_at = time.monotonic()
+
+    def invalidate(self):
+        """Buộc kiểm tra lại ở request kế tiếp (gọi khi sản phẩm đổi trong cùng process)"""
+        self.checked_at = 0.0
+
+
+worker_index = _WorkerIndex()
+
+
+def suggest(query, limit=10):
+    return worker_index.get().suggest(query, limit)
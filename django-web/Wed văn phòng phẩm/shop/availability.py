@@ -0,0 +1,68 @@
+"""
+Số lượng khả dụng của sản phẩm (Product.available_quantity)
+
+available_quantity = Product.stock + tổng WarehouseStock.quantity ở các kho
+đang hoạt động. Trường được lưu sẵn và đánh chỉ mục để lọc "còn hàng", hiển
+thị badge và sắp xếp không phải cộng tồn kho từng sản phẩm.
+
+Giá trị được tính lại bằng một câu UPDATE ... = stock + (SELECT SUM ...) ngay
+trong transaction làm thay đổi tồn kho (signals), nên không đọc-sửa-ghi
+trong Python. Sản phẩm có giá trị thay đổi được cập nhật updated_at để bộ
+lọc "còn hàng" trong cache của mọi worker (facets) nhận ra. Lệnh
+rebuild_availability kiểm tra và sửa lệch.
+"""
+
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, WarehouseStock
+
+
+def computed_availability():
+    """Biểu thức SQL tính số lượng khả dụng từ tồn kho chung và các kho đang hoạt động"""
+    warehouse_total = (
+        WarehouseStock.objects
+        .filter(product=OuterRef('pk'), warehouse__is_active=True)
+        .values('product')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    return F('stock') + Coalesce(Subquery(warehouse_total, output_field=IntegerField()), Value(0))
+
+
+def refresh_availability(product_ids=None):
+    """
+    Tính lại available_quantity của các sản phẩm (mặc định: tất cả).
+
+    Chỉ ghi các sản phẩm có giá trị thay đổi và tăng updated_at của chúng:
+    worker_facets.invalidate() chỉ có hiệu lực trong tiến trình hiện tại, các
+    worker khác nhận ra thay đổi qua Max(updated_at).
+
+    Trả về:
+        int: Số sản phẩm đã cập nhật
+    """
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+    expected = computed_availability()
+    return products.exclude(available_quantity=expected).update(
+        available_quantity=expected, updated_at=timezone.now(),
+    )
+
+
+def find_drift(limit=None):
+    """
+    Các sản phẩm có available_quantity lệch so với tồn kho thực tế.
+
+    Trả về:
+        list: [(product_id, giá trị đang lưu, giá trị đúng)]
+    """
+    drift = (
+        Product.objects
+        .annotate(expected=computed_availability())
+        .exclude(available_quantity=F('expected'))
+        .values_list('id', 'available_quantity', 'expected')
+        .order_by('id')
+    )
+    return list(drift[:limit] if limit else drift)
@@ -0,0 +1,170 @@
+"""
+Lưu trữ giỏ hàng
+
+Giỏ hàng được mã hóa gọn thành chuỗi "id:số_lượng,id:số_lượng" (sắp theo id)
+và chỉ được ghi lại khi chuỗi mã hóa thay đổi, nên các thao tác không làm
+thay đổi giỏ hàng không ghi lại bản ghi session.
+
+Nơi lưu được chọn bằng setting CART_STORE:
+    - shop.cart.SessionCartStore (mặc định): lưu trong session
+    - shop.cart.CacheCartStore: lưu trong cache dùng chung (Redis/Memcached),
+      theo người dùng hoặc theo cookie cart_id đã ký cho khách
+
+Số dòng giỏ hàng được giữ trong cookie đã ký `cart_count` (CartMiddleware
+cập nhật), để base.html hiển thị mà không phải nạp session.
+"""
+
+import uuid
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+
+CART_SESSION_KEY = 'cart'
+CART_COUNT_COOKIE = 'cart_count'
+CART_ID_COOKIE = 'cart_id'
+COOKIE_SALT = 'shop.cart'
+
+
+def encode_cart(cart):
+    """Mã hóa giỏ hàng {id: số lượng} thành chuỗi gọn, thứ tự ổn định"""
+    return ','.join(
+        f'{product_id}:{quantity}'
+        for product_id, quantity in sorted(cart.items(), key=lambda item: int(item[0]))
+    )
+
+
+def decode_cart(value):
+    """Giải mã chuỗi giỏ hàng (chấp nhận cả dict kiểu cũ trong session)"""
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        return {str(k): int(v) for k, v in value.items()}
+    cart = {}
+    for part in value.split(','):
+        product_id, _, quantity = part.partition(':')
+        cart[product_id] = int(quantity)
+    return cart
+
+
+class SessionCartStore:
+    """Lưu giỏ hàng trong session (login() của Django giữ nguyên dữ liệu session của khách)"""
+
+    def read(self, request):
+        return request.session.get(CART_SESSION_KEY)
+
+    def write(self, request, encoded):
+        if encoded:
+            request.session[CART_SESSION_KEY] = encoded
+        else:
+            request.session.pop(CART_SESSION_KEY, None)
+
+    def merge_on_login(self, request, user):
+        pass
+
+
+class CacheCartStore:
+    """Lưu giỏ hàng trong cache: theo user khi đã đăng nhập, theo cookie cart_id cho khách"""
+
+    def _guest_id(self, request):
+        try:
+            return request.get_signed_cookie(CART_ID_COOKIE, salt=COOKIE_SALT)
+        except (KeyError, signing.BadSignature):
+            return None
+
+    def _key(self, request, create=False):
+        if request.user.is_authenticated:
+            return f'cart:u:{request.user.pk}'
+        guest_id = getattr(request, '_cart_new_id', None) or self._guest_id(request)
+        if guest_id is None and create:
+            guest_id = request._cart_new_id = uuid.uuid4().hex
+        return f'cart:g:{guest_id}' if guest_id else None
+
+    def read(self, request):
+        key = self._key(request)
+        return cache.get(key) if key else None
+
+    def write(self, request, encoded):
+        key = self._key(request, create=bool(encoded))
+        if key is None:
+            return
+        if encoded:
+            cache.set(key, encoded, settings.SESSION_COOKIE_AGE)
+        else:
+            cache.delete(key)
+
+    def merge_on_login(self, request, user):
+        """Gộp giỏ hàng của khách vào giỏ hàng đã lưu của người dùng (cộng số lượng)"""
+        guest_id = self._guest_id(request)
+        if not guest_id:
+            return
+        guest_key = f'cart:g:{guest_id}'
+        guest_cart = decode_cart(cache.get(guest_key))
+        request._cart_drop_id = True
+        if not guest_cart:
+            return
+
+        user_key = f'cart:u:{user.pk}'
+        cart = decode_cart(cache.get(user_key))
+        for product_id, quantity in guest_cart.items():
+            cart[product_id] = cart.get(product_id, 0) + quantity
+        cache.set(user_key, encode_cart(cart), settings.SESSION_COOKIE_AGE)
+        cache.delete(guest_key)
+        request._cart_count = len(cart)
+
+
+@lru_cache(maxsize=None)
+def get_cart_store():
+    """Nơi lưu giỏ hàng theo setting CART_STORE"""
+    return import_string(getattr(settings, 'CART_STORE', 'shop.cart.SessionCartStore'))()
+
+
+def load_cart(request):
+    """Đọc giỏ hàng của request thành dict {product_id (str): số lượng}"""
+    value = get_cart_store().read(request)
+    # Dict kiểu cũ (khác rỗng) được đánh dấu None để lần lưu sau chuyển sang dạng gọn
+    request._cart_loaded = value if isinstance(value, str) else ('' if not value else None)
+    cart = decode_cart(value)
+    request._cart_count = len(cart)
+    return cart
+
+
+def save_cart(request, cart):
+    """
+    Lưu giỏ hàng nếu có thay đổi so với lúc đọc.
+
+    Trả về:
+        bool: True nếu đã ghi
+    """
+    encoded = encode_cart(cart)
+    if encoded == getattr(request, '_cart_loaded', None):
+        return False
+    get_cart_store().write(request, encoded)
+    request._cart_loaded = encoded
+    request._cart_count = len(cart)
+    return True
+
+
+def clear_cart(request):
+    """Xóa toàn bộ giỏ hàng"""
+    save_cart(request, {})
+
+
+def cart_count(request):
+    """
+    Số dòng trong giỏ hàng, ưu tiên cookie đã ký để không phải nạp session.
+
+    Chỉ đọc nơi lưu giỏ hàng khi chưa có cookie mà khách đã có session/giỏ hàng.
+    """
+    if hasattr(request, '_cart_count'):
+        return request._cart_count
+    try:
+        return int(request.get_signed_cookie(CART_COUNT_COOKIE, salt=COOKIE_SALT))
+    except (KeyError, ValueError, signing.BadSignature):
+        pass
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES and CART_ID_COOKIE not in request.COOKIES:
+        return 0
+    return len(load_cart(request))
@@ -0,0 +1,28 @@
+"""
+Các consumer của outbox (chạy bởi lệnh relay_outbox, xem shop/outbox.py)
+
+Handler nhận một lô OutboxEvent và có thể nhận lại sự kiện đã xử lý, nên
+chỉ làm những việc lặp lại được (dựng lại chỉ mục, xếp việc nền).
+"""
+
+from .jobs import enqueue
+from .models import Job, Product
+from .outbox import consumer
+from .search import index_products
+from .tasks import refresh_report_rollups
+
+
+@consumer('search-index', topics=['product'])
+def update_search_index(events):
+    """Dựng lại chỉ mục tìm kiếm của các sản phẩm thay đổi (sản phẩm đã xóa tự mất chỉ mục)"""
+    product_ids = {event.object_id for event in events if event.event_type != 'deleted'}
+    if product_ids:
+        index_products(Product.objects.filter(id__in=product_ids).select_related('category'))
+
+
+@consumer('report-rollups', topics=['order'])
+def refresh_dashboards(events):
+    """Đơn hàng thay đổi: cập nhật sớm bảng tổng hợp báo cáo thay vì chờ lịch JOB_SCHEDULE"""
+    task_name = refresh_report_rollups.task_name
+    if not Job.objects.filter(task=task_name, status='queued').exists():
+        enqueue(task_name)
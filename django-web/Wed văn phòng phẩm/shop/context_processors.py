@@ -0,0 +1,10 @@
+"""
+Context processor cho Cửa hàng Văn Phòng Phẩm
+"""
+
+from .cart import cart_count as get_cart_count
+
+
+def cart(request):
+    """Số dòng giỏ hàng cho badge trên thanh điều hướng (đọc từ cookie đã ký)"""
+    return {'cart_count': get_cart_count(request)}
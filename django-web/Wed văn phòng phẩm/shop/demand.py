@@ -0,0 +1,156 @@
+"""
+Tốc độ tiêu thụ và điểm đặt hàng lại tính vector hóa trên sổ cái
+
+Các chuyển động 'sale' và 'export' trong cửa sổ thời gian được đọc theo lô
+vào mảng NumPy, sau đó mọi phép tính theo (kho, sản phẩm) được thực hiện
+bằng bincount trên ma trận tiêu thụ theo ngày:
+
+- velocity: tiêu thụ trung bình mỗi ngày
+- demand_stddev: độ lệch chuẩn tiêu thụ theo ngày
+- days_of_cover: tồn kho hiện tại / velocity
+- reorder_point: velocity * L + z * stddev * sqrt(L), với L là thời gian chờ hàng
+"""
+
+import math
+from datetime import timedelta
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DemandForecast, StockMovement, WarehouseStock
+from .stock_counters import stock_quantity
+
+
+DEMAND_MOVEMENT_TYPES = ('sale', 'export')
+DEFAULT_WINDOW_DAYS = 90
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_SERVICE_Z = 1.65  # ~95% mức phục vụ
+
+
+def load_demand(start, chunk_size=50000):
+    """
+    Đọc các chuyển động tiêu thụ từ `start` đến nay vào mảng NumPy.
+
+    Trả về:
+        tuple: (warehouse_stock_ids, timestamps giây, số lượng tuyệt đối)
+    """
+    rows = (
+        StockMovement.objects
+        .filter(movement_type__in=DEMAND_MOVEMENT_TYPES, created_at__gte=start)
+        .order_by()
+        .values_list('warehouse_stock_id', 'created_at', 'quantity')
+        .iterator(chunk_size=chunk_size)
+    )
+    ws_chunks, ts_chunks, qty_chunks = [], [], []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        ws_ids, created, quantities = zip(*chunk)
+        ws_chunks.append(np.fromiter(ws_ids, dtype=np.int64, count=len(chunk)))
+        ts_chunks.append(np.fromiter((c.timestamp() for c in created), dtype=np.float64, count=len(chunk)))
+        qty_chunks.append(np.abs(np.fromiter(quantities, dtype=np.int64, count=len(chunk))))
+
+    if not ws_chunks:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty, empty.astype(np.int64)
+    return np.concatenate(ws_chunks), np.concatenate(ts_chunks), np.concatenate(qty_chunks)
+
+
+def compute_forecasts(ws_ids, timestamps, quantities, stock_ids, stock_quantities,
+                      start, window_days, lead_time_days, service_z):
+    """
+    Tính các chỉ số tiêu thụ cho mọi dòng tồn kho (thuần NumPy, không truy cập DB).
+
+    Tham số:
+        ws_ids, timestamps, quantities: Các chuyển động tiêu thụ (từ load_demand)
+        stock_ids, stock_quantities: Tất cả dòng tồn kho (ít nhất một) và số lượng hiện tại
+
+    Trả về:
+        dict: Các mảng 'velocity', 'stddev', 'days_of_cover', 'reorder_point',
+              'needs_reorder' theo thứ tự của stock_ids
+    """
+    stock_ids = np.asarray(stock_ids, dtype=np.int64)
+    stock_quantities = np.asarray(stock_quantities, dtype=np.float64)
+    n = len(stock_ids)
+
+    # Ánh xạ warehouse_stock_id -> vị trí trong stock_ids; bỏ chuyển động của dòng đã bị xóa
+    order = np.argsort(stock_ids)
+    sorted_ids = stock_ids[order]
+    positions = np.searchsorted(sorted_ids, ws_ids).clip(max=n - 1)
+    valid = sorted_ids[positions] == ws_ids
+    rows = order[positions[valid]]
+
+    days = ((timestamps[valid] - start.timestamp()) // 86400).astype(np.int64)
+    days = np.clip(days, 0, window_days - 1)
+    daily = np.bincount(
+        rows * window_days + days,
+        weights=quantities[valid],
+        minlength=n * window_days,
+    ).reshape(n, window_days)
+
+    velocity = daily.mean(axis=1)
+    stddev = daily.std(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_cover = np.where(velocity > 0, stock_quantities / velocity, np.nan)
+    reorder_point = np.ceil(
+        velocity * lead_time_days + service_z * stddev * math.sqrt(lead_time_days)
+    ).astype(np.int64)
+    needs_reorder = (velocity > 0) & (stock_quantities <= reorder_point)
+
+    return {
+        'velocity': velocity,
+        'stddev': stddev,
+        'days_of_cover': days_of_cover,
+        'reorder_point': reorder_point,
+        'needs_reorder': needs_reorder,
+    }
+
+
+def refresh_demand_forecasts(window_days=None, lead_time_days=None, service_z=None, chunk_size=50000):
+    """
+    Tính lại DemandForecast cho tất cả các dòng tồn kho.
+
+    Trả về:
+        int: Số dòng dự báo đã ghi
+    """
+    window_days = window_days or getattr(settings, 'DEMAND_WINDOW_DAYS', DEFAULT_WINDOW_DAYS)
+    lead_time_days = lead_time_days or getattr(settings, 'REORDER_LEAD_TIME_DAYS', DEFAULT_LEAD_TIME_DAYS)
+    service_z = service_z if service_z is not None else getattr(settings, 'REORDER_SERVICE_Z', DEFAULT_SERVICE_Z)
+
+    now = timezone.now()
+    start = now - timedelta(days=window_days)
+    ws_ids, timestamps, quantities = load_demand(start, chunk_size)
+
+    stock_ids, stock_quantities = [], []
+    stocks = WarehouseStock.objects.annotate(current=stock_quantity()).order_by().values_list('id', 'current')
+    for ws_id, quantity in stocks.iterator(chunk_size=chunk_size):
+        stock_ids.append(ws_id)
+        stock_quantities.append(quantity)
+    if not stock_ids:
+        return 0
+
+    result = compute_forecasts(
+        ws_ids, timestamps, quantities, stock_ids, stock_quantities,
+        start, window_days, lead_time_days, service_z,
+    )
+
+    forecasts = [
+        DemandForecast(
+            warehouse_stock_id=ws_id,
+            velocity=float(result['velocity'][i]),
+            demand_stddev=float(result['stddev'][i]),
+            days_of_cover=None if np.isnan(result['days_of_cover'][i]) else float(result['days_of_cover'][i]),
+            reorder_point=int(result['reorder_point'][i]),
+            needs_reorder=bool(result['needs_reorder'][i]),
+            computed_at=now,
+        )
+        for i, ws_id in enumerate(stock_ids)
+    ]
+    with transaction.atomic():
+        DemandForecast.objects.all().delete()
+        DemandForecast.objects.bulk_create(forecasts, batch_size=5000)
+    return len(forecasts)
@@ -0,0 +1,235 @@
+"""
+Lọc danh mục sản phẩm theo nhiều tiêu chí (facet) bằng bitmap trong bộ nhớ
+
+Mỗi worker giữ một bitmap (số nguyên Python, bit thứ i = sản phẩm có id i)
+cho từng danh mục, từng khoảng giá và trạng thái còn hàng. Một tổ hợp lọc
+bất kỳ là phép OR trong cùng một facet và AND giữa các facet; số lượng của
+mỗi giá trị facet được tính bằng cách giao với lựa chọn của các facet khác
+rồi đếm bit, không cần COUNT ... GROUP BY.
+
+Bitmap được làm mới theo chu kỳ FACET_REFRESH_SECONDS: worker so sánh dấu
+phiên bản của Product (số dòng, updated_at, ID lớn nhất) và WarehouseStock
+(số dòng, last_counted, ID lớn nhất) rồi chỉ tính lại các sản phẩm đã đổi;
+sản phẩm bị xóa được tìm bằng cách so tập ID, dòng tồn kho bị xóa thì dựng
+lại toàn bộ. Chỉ mục đang dùng không bao giờ bị sửa: bản mới được dựng riêng
+rồi thay tham chiếu, nên các thread đọc không cần khóa.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max, Q
+
+from .models import Product, WarehouseStock
+
+
+# Khoảng giá (VNĐ): (khóa, nhãn, giá từ, giá đến - không bao gồm)
+PRICE_BANDS = [
+    ('lt10k', 'Dưới 10.000đ', 0, 10000),
+    ('10k-50k', '10.000đ - 50.000đ', 10000, 50000),
+    ('50k-100k', '50.000đ - 100.000đ', 50000, 100000),
+    ('100k-500k', '100.000đ - 500.000đ', 100000, 500000),
+    ('gte500k', 'Từ 500.000đ', 500000, None),
+]
+
+# Khi làm mới, tính lại cả dòng sửa ngay trước mốc lần trước (transaction commit trễ)
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+def price_band(price):
+    for key, _, low, high in PRICE_BANDS:
+        if price >= low and (high is None or price < high):
+            return key
+    return PRICE_BANDS[0][0]
+
+
+def bitmap_ids(bitmap):
+    """Danh sách id (tăng dần) của các bit bật trong bitmap"""
+    if not bitmap:
+        return []
+    raw = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder='little')).tolist()
+
+
+class FacetIndex:
+    """Bitmap theo facet: 'category' -> {id: bitmap}, 'price' -> {khóa: bitmap}, 'stock' -> {True/False: bitmap}"""
+
+    def __init__(self):
+        self.facets = {'category': {}, 'price': {}, 'stock': {}}
+        self.placement = {}
+        self.all = 0
+
+    @classmethod
+    def build(cls, rows):
+        """Dựng bitmap từ các bộ (id, category_id, price, còn hàng)"""
+        index = cls()
+        for row in rows:
+            index.set_product(*row)
+        return index
+
+    def with_changes(self, rows, removed=()):
+        """
+        Chỉ mục mới sau khi đặt lại các sản phẩm `rows` và bỏ các sản phẩm `removed`.
+
+        Chỉ mục hiện tại không bị sửa nên các thread khác đọc nó mà không cần khóa
+        (bitmap là số nguyên bất biến, chỉ các dict chứa chúng được sao chép).
+        """
+        index = FacetIndex()
+        index.facets = {facet: dict(bitmaps) for facet, bitmaps in self.facets.items()}
+        index.placement = dict(self.placement)
+        index.all = self.all
+        for product_id in removed:
+            index.clear_product(product_id)
+        for row in rows:
+            index.set_product(*row)
+        return index
+
+    def set_product(self, product_id, category_id, price, in_stock):
+        """Đặt (hoặc cập nhật) vị trí của một sản phẩm; chỉ gọi trên chỉ mục chưa dùng"""
+        self.clear_product(product_id)
+        bit = 1 << product_id
+        values = {'category': category_id, 'price': price_band(price), 'stock': bool(in_stock)}
+        for facet, value in values.items():
+            bitmaps = self.facets[facet]
+            bitmaps[value] = bitmaps.get(value, 0) | bit
+        self.placement[product_id] = values
+        self.all |= bit
+
+    def clear_product(self, product_id):
+        values = self.placement.pop(product_id, None)
+        if values is None:
+            return
+        mask = ~(1 << product_id)
+        for facet, value in values.items():
+            self.facets[facet][value] &= mask
+        self.all &= mask
+
+    def _selected(self, facet, values):
+        """Bitmap của lựa chọn trong một facet (OR các giá trị); không chọn = tất cả"""
+        if not values:
+            return self.all
+        bitmap = 0
+        for value in values:
+            bitmap |= self.facets[facet].get(value, 0)
+        return bitmap
+
+    def query(self, selection):
+        """
+        Lọc theo tổ hợp facet.
+
+        Tham số:
+            selection: {'category': [id...], 'price': [khóa...], 'stock': [True]}
+
+        Trả về:
+            tuple: (bitmap kết quả, {facet: {giá trị: số sản phẩm}})
+        """
+        selected = {facet: self._selected(facet, selection.get(facet)) for facet in self.facets}
+        result = self.all
+        for bitmap in selected.values():
+            result &= bitmap
+
+        counts = {}
+        for facet, bitmaps in self.facets.items():
+            others = self.all
+            for other, bitmap in selected.items():
+                if other != facet:
+                    others &= bitmap
+            counts[facet] = {value: (bitmap & others).bit_count() for value, bitmap in bitmaps.items()}
+        return result, counts
+
+
+def _product_rows(product_ids=None):
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+    for product_id, category_id, price, available in products.values_list(
+        'id', 'category_id', 'price', 'available_quantity'
+    ).order_by().iterator(chunk_size=5000):
+        yield product_id, category_id, price, available > 0
+
+
+def _catalog_stamp():
+    products = Product.objects.aggregate(count=Count('id'), latest=Max('updated_at'), last_id=Max('id'))
+    stocks = WarehouseStock.objects.aggregate(count=Count('id'), latest=Max('last_counted'), last_id=Max('id'))
+    return (
+        products['count'], products['latest'], products['last_id'] or 0,
+        stocks['count'], stocks['latest'], stocks['last_id'] or 0,
+    )
+
+
+def _changed_since(queryset, field, since, last_id):
+    """Dòng sửa từ mốc `since` (lùi lại REFRESH_OVERLAP) hoặc mới thêm sau ID `last_id`"""
+    if since is None:
+        return queryset
+    return queryset.filter(Q(**{f'{field}__gte': since - REFRESH_OVERLAP}) | Q(id__gt=last_id))
+
+
+class _WorkerFacets:
+    """Bitmap của worker hiện tại, tự làm mới theo chu kỳ"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.stamp = None
+        self.checked_at = 0.0
+
+    def get(self):
+        interval = getattr(settings, 'FACET_REFRESH_SECONDS', 30)
+        if self.index is not None and time.monotonic() - self.checked_at < interval:
+            return self.index
+        with self.lock:
+            if self.index is None or time.monotonic() - self.checked_at >= interval:
+                self.refresh()
+        return self.index
+
+    def refresh(self):
+        stamp = _catalog_stamp()
+        if self.index is None or stamp == self.stamp:
+            if self.index is None:
+                self.index = FacetIndex.build(_product_rows())
+            self.stamp = stamp
+            self.checked_at = time.monotonic()
+            return
+
+        product_count, product_since, product_last, stock_count, stock_since, stock_last = self.stamp
+        added_stocks = WarehouseStock.objects.filter(id__gt=stock_last).count()
+        if stock_count + added_stocks != stamp[3]:
+            # Có dòng tồn kho bị xóa: không biết sản phẩm nào mất tồn kho
+            self.index = FacetIndex.build(_product_rows())
+        else:
+            changed_ids = set(
+                _changed_since(Product.objects.all(), 'updated_at', product_since, product_last)
+                .values_list('id', flat=True)
+            )
+            changed_ids.update(
+                _changed_since(WarehouseStock.objects.all(), 'last_counted', stock_since, stock_last)
+                .values_list('product_id', flat=True)
+            )
+            removed = ()
+            if product_count + Product.objects.filter(id__gt=product_last).count() != stamp[0]:
+                # Có sản phẩm bị xóa (kể cả khi đồng thời thêm sản phẩm khác): so tập ID
+                removed = self.index.placement.keys() - set(Product.objects.values_list('id', flat=True))
+            self.index = self.index.with_changes(_product_rows(changed_ids), removed)
+        self.stamp = stamp
+        self.checked_at = time.monotonic()
+
+    def invalidate(self):
+        """Buộc kiểm tra lại ở request kế tiếp (gọi khi dữ liệu đổi trong cùng process)"""
+        self.checked_at = 0.0
+
+
+worker_facets = _WorkerFacets()
+
+
+def filter_catalog(selection):
+    """
+    Lọc danh mục theo lựa chọn facet.
+
+    Trả về:
+        tuple: (danh sách id sản phẩm tăng dần, số lượng theo facet)
+    """
+    bitmap, counts = worker_facets.get().query(selection)
+    return bitmap_ids(bitmap), counts
@@ -1,8 +1,10 @@
 """
 Form Django cho Cửa hàng Văn Phòng Phẩm
-Các Form: Đăng ký, Đăng nhập, Hồ sơ người dùng
+Các Form: Đăng ký, Đăng nhập, Hồ sơ người dùng, Đặt hàng nhanh
 """
 
+import re
+
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
@@ -190,3 +192,78 @@ class UserProfileForm(forms.ModelForm):
             profile.user.save()
             profile.save()
         return profile
+
+
+# ========== QUICK ORDER FORM ==========
+class QuickOrderForm(forms.Form):
+    """Form đặt hàng nhanh: dán hoặc tải lên danh sách dòng `sku,số lượng`"""
+    MAX_LINES = 2000
+    LINE_SEPARATOR = re.compile(r'[,;\t ]+')
+
+    lines = forms.CharField(
+        required=False,
+        label='Danh sách SKU',
+        widget=forms.Textarea(attrs={
+            'class': 'form-control font-monospace',
+            'placeholder': 'SKU001,10\nSKU002,5\nSKU003',
+            'rows': 12
+        })
+    )
+    file = forms.FileField(
+        required=False,
+        label='Hoặc tải lên file CSV',
+        widget=forms.FileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.txt'
+        })
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        text = cleaned_data.get('lines') or ''
+        upload = cleaned_data.get('file')
+        if upload:
+            try:
+                text += '\n' + upload.read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                raise forms.ValidationError('File phải là văn bản UTF-8 (CSV)!')
+
+        entries, invalid = self.parse_lines(text)
+        if not entries and not invalid:
+            raise forms.ValidationError('Vui lòng nhập ít nhất một dòng SKU!')
+        if len(entries) > self.MAX_LINES:
+            raise forms.ValidationError(f'Tối đa {self.MAX_LINES} dòng mỗi lần đặt!')
+
+        cleaned_data['entries'] = entries
+        cleaned_data['invalid'] = invalid
+        return cleaned_data
+
+    @classmethod
+    def parse_lines(cls, text):
+        """
+        Tách nội dung thành các dòng (số dòng, sku, số lượng).
+
+        Số lượng bỏ trống được hiểu là 1; dòng tiêu đề `sku,quantity` được bỏ qua.
+
+        Trả về:
+            tuple: (danh sách dòng hợp lệ, danh sách (số dòng, nội dung) không hợp lệ)
+        """
+        entries = []
+        invalid = []
+        for line_no, raw in enumerate(text.splitlines(), start=1):
+            line = raw.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = cls.LINE_SEPARATOR.split(line, maxsplit=1)
+            sku = parts[0].strip('"\'')
+            quantity = parts[1].strip().strip('"\'') if len(parts) > 1 else '1'
+            if not quantity.isdecimal():
+                if not entries and not invalid and sku.lower() == 'sku':
+                    continue
+                invalid.append((line_no, line))
+                continue
+            if not sku or int(quantity) < 1:
+                invalid.append((line_no, line))
+                continue
+            entries.append((line_no, sku, int(quantity)))
+        return entries, invalid
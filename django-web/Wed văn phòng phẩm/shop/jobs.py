@@ -0,0 +1,278 @@
+"""
+Hàng đợi công việc nền lưu ở CSDL (bảng Job), không cần broker bên ngoài
+
+Đăng ký task bằng @task rồi đưa vào hàng đợi trong request:
+
+    @task(queue='email')
+    def send_email(subject, message, recipient_list): ...
+
+    send_email.enqueue(subject='...', message='...', recipient_list=[...])
+    send_email.enqueue(delay=timedelta(minutes=5), ...)   # chạy sau
+
+Lệnh runworker nhận việc bằng SELECT ... FOR UPDATE SKIP LOCKED nên nhiều
+worker chạy song song không nhận trùng, chạy trên pool thread hoặc process
+và thử lại lỗi với thời gian chờ tăng dần, trả lại hàng đợi các việc của
+worker đã chết. Giới hạn đồng thời của từng queue (JOB_QUEUES) tính trên tất
+cả worker: việc nhận việc của một queue giữ khóa dòng JobLock và trừ đi số
+việc đang 'running' ở mọi worker (việc của worker đã chết vẫn được tính cho
+tới khi requeue_stale trả lại hàng đợi). Task định kỳ (JOB_SCHEDULE) cũng
+được tạo dưới khóa nên nhiều worker không tạo trùng.
+Tham số task phải lưu được dạng JSON.
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobLock
+
+
+logger = logging.getLogger(__name__)
+
+# Giữ tối đa bấy nhiêu ký tự traceback trong Job.last_error
+MAX_ERROR_LENGTH = 4000
+
+_registry = {}
+
+
+@dataclass
+class TaskSpec:
+    name: str
+    func: object
+    queue: str
+    max_attempts: int
+
+
+def task(func=None, *, name=None, queue='default', max_attempts=5):
+    """Decorator đăng ký hàm làm task; thêm thuộc tính .enqueue(**kwargs)"""
+    def register(func):
+        spec = TaskSpec(
+            name=name or f'{func.__module__}.{func.__name__}',
+            func=func,
+            queue=queue,
+            max_attempts=max_attempts,
+        )
+        _registry[spec.name] = spec
+        func.task_name = spec.name
+        func.enqueue = lambda **kwargs: enqueue(spec.name, **kwargs)
+        return func
+
+    return register(func) if func is not None else register
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def enqueue(task_name, *, queue=None, run_at=None, delay=None, max_attempts=None, **kwargs):
+    """Tạo Job cho task `task_name`; trong transaction thì chỉ hiện ra khi commit"""
+    spec = _registry[task_name]
+    if run_at is None:
+        run_at = timezone.now() + (delay or timedelta())
+    return Job.objects.create(
+        queue=queue or spec.queue,
+        task=spec.name,
+        kwargs=kwargs,
+        run_at=run_at,
+        max_attempts=max_attempts or spec.max_attempts,
+    )
+
+
+def backoff_delay(attempts):
+    """Thời gian chờ trước lần thử lại thứ `attempts` (tăng gấp đôi, có nhiễu)"""
+    base = settings.JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    seconds = min(base, settings.JOB_RETRY_MAX_SECONDS)
+    return timedelta(seconds=seconds * random.uniform(0.8, 1.2))
+
+
+# ========== NHẬN VÀ CHẠY VIỆC ==========
+
+def _lock(name):
+    """Khóa dòng JobLock `name` tới hết transaction hiện tại (tạo nếu chưa có)"""
+    JobLock.objects.get_or_create(name=name)
+    JobLock.objects.select_for_update().get(name=name)
+
+
+def claim_jobs(queue, limit, worker_id, max_running=None):
+    """
+    Nhận tối đa `limit` việc đã tới giờ của `queue`; trả về danh sách ID.
+    Với `max_running`, số việc 'running' của queue trên mọi worker không vượt
+    quá giá trị này.
+    """
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    with transaction.atomic():
+        if max_running is not None:
+            # Các worker đếm-rồi-nhận lần lượt, nếu không hai worker cùng thấy còn chỗ
+            _lock(f'queue:{queue}')
+            running = Job.objects.filter(status='running', queue=queue).count()
+            limit = min(limit, max_running - running)
+            if limit <= 0:
+                return []
+        job_ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', queue=queue, run_at__lte=now)
+            .order_by('run_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if job_ids:
+            Job.objects.filter(id__in=job_ids).update(
+                status='running', locked_by=worker_id, locked_at=now,
+                attempts=F('attempts') + 1,
+            )
+    return job_ids
+
+
+def run_job(job_id, worker_id):
+    """Chạy một việc đã nhận; trả về True nếu thành công. Dùng được trong process con."""
+    close_old_connections()
+    try:
+        job = Job.objects.filter(id=job_id, status='running', locked_by=worker_id).first()
+        if job is None:
+            # Đã bị trả lại hàng đợi (quá hạn khóa) và worker khác nhận
+            return False
+
+        spec = get_task(job.task)
+        try:
+            if spec is None:
+                raise LookupError(f'Task chưa được đăng ký: {job.task}')
+            spec.func(**job.kwargs)
+        except Exception:
+            _record_failure(job, worker_id, traceback.format_exc())
+            return False
+
+        Job.objects.filter(id=job.id, locked_by=worker_id).update(
+            status='done', finished_at=timezone.now(), last_error='',
+        )
+        return True
+    finally:
+        close_old_connections()
+
+
+def _record_failure(job, worker_id, error):
+    now = timezone.now()
+    fields = {'last_error': error[-MAX_ERROR_LENGTH:], 'locked_by': '', 'locked_at': None}
+    if job.attempts >= job.max_attempts:
+        fields.update(status='failed', finished_at=now)
+        logger.error('Job #%s (%s) thất bại sau %s lần: %s', job.id, job.task, job.attempts, error)
+    else:
+        fields.update(status='queued', run_at=now + backoff_delay(job.attempts))
+    Job.objects.filter(id=job.id, locked_by=worker_id).update(**fields)
+
+
+def requeue_stale(lock_timeout):
+    """Trả lại hàng đợi các việc 'running' quá lâu (worker chết giữa chừng)"""
+    cutoff = timezone.now() - lock_timeout
+    stale = Job.objects.filter(status='running', locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=timezone.now(), locked_by='', locked_at=None,
+        last_error='Worker không hoàn thành trong thời hạn khóa',
+    )
+    requeued = stale.update(status='queued', run_at=timezone.now(), locked_by='', locked_at=None)
+    return requeued, failed
+
+
+def ensure_scheduled(schedule):
+    """Đảm bảo mỗi task định kỳ (tên -> số giây) luôn có một lần chạy kế tiếp"""
+    for name, seconds in schedule.items():
+        if get_task(name) is None:
+            continue
+        with transaction.atomic():
+            # Kiểm tra-rồi-tạo dưới khóa: worker khác chờ tới khi Job mới đã commit
+            _lock(f'schedule:{name}')
+            if not Job.objects.filter(task=name, status__in=('queued', 'running')).exists():
+                enqueue(name, delay=timedelta(seconds=seconds))
+
+
+def _init_process():
+    # Process con (spawn/forkserver) phải tự khởi tạo Django; fork thì đã có sẵn
+    django.setup()
+
+
+class Worker:
+    """
+    Vòng lặp nhận việc cho các queue (tên -> số việc chạy đồng thời tối đa,
+    tính trên mọi worker) và chạy trên pool thread hoặc process.
+    """
+
+    def __init__(self, queues, mode='thread', poll_interval=1.0, schedule=None,
+                 lock_timeout=timedelta(minutes=15), burst=False):
+        self.queues = queues
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.schedule = schedule or {}
+        self.lock_timeout = lock_timeout
+        self.burst = burst
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.succeeded = 0
+        self.failed = 0
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def _executor(self):
+        size = sum(self.queues.values())
+        if self.mode == 'process':
+            # Không để process con dùng chung kết nối CSDL của tiến trình cha
+            connections.close_all()
+            return ProcessPoolExecutor(max_workers=size, initializer=_init_process)
+        return ThreadPoolExecutor(max_workers=size, thread_name_prefix='job')
+
+    def run(self):
+        in_flight = {}   # future -> queue
+        last_maintenance = 0.0
+        with self._executor() as executor:
+            while not self.stopping.is_set():
+                if time.monotonic() - last_maintenance >= self.poll_interval * 30:
+                    requeue_stale(self.lock_timeout)
+                    if self.schedule:
+                        ensure_scheduled(self.schedule)
+                    last_maintenance = time.monotonic()
+
+                claimed = 0
+                for queue, limit in self.queues.items():
+                    busy = sum(1 for name in in_flight.values() if name == queue)
+                    for job_id in claim_jobs(queue, limit - busy, self.worker_id, max_running=limit):
+                        in_flight[executor.submit(run_job, job_id, self.worker_id)] = queue
+                        claimed += 1
+
+                if not in_flight:
+                    if self.burst and not claimed:
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                done, _ = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                self._collect(in_flight, done)
+
+            # Dừng: không nhận việc mới, chờ các việc đang chạy xong
+            self._collect(in_flight, wait(in_flight).done)
+        close_old_connections()
+
+    def _collect(self, in_flight, done):
+        for future in done:
+            in_flight.pop(future)
+            try:
+                ok = future.result()
+            except Exception:
+                # Process con chết: việc sẽ được requeue_stale trả lại hàng đợi
+                logger.exception('Lỗi khi chạy công việc nền')
+                ok = False
+            if ok:
+                self.succeeded += 1
+            else:
+                self.failed += 1
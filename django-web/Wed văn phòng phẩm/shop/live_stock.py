@@ -0,0 +1,224 @@
+"""
+Luồng sự kiện thay đổi tồn kho (Server-Sent Events) cho trang kho
+
+Mỗi tiến trình ASGI có một StockChangeFeed duy nhất: một task asyncio đọc
+thay đổi từ CSDL mỗi LIVE_STOCK_POLL_SECONDS giây rồi phát cho mọi kết nối
+SSE đang mở, nên số truy vấn không tăng theo số người đang xem. Task chỉ
+chạy khi có người nghe.
+
+Nguồn thay đổi:
+    - StockMovement mới (theo ID tăng dần) -> sự kiện `movement`, kèm sự kiện
+      `stock` với số lượng hiện tại của các dòng tồn kho bị ảnh hưởng
+    - WarehouseStock sửa trực tiếp (admin, kiểm kê) theo `last_counted`
+      -> sự kiện `stock`
+
+Mỗi lần đọc lùi lại một đoạn (ID/thời gian) để không lỡ transaction commit
+trễ; sự kiện đã phát được bỏ qua. Trình duyệt chỉ ghi đè giá trị nên sự kiện
+lặp lại (hiếm) cũng vô hại.
+
+Chỉ phục vụ qua asgi.py (uvicorn/daphne): dưới WSGI, StreamingHttpResponse gom
+toàn bộ async iterator vào danh sách trước khi gửi nên luồng vô hạn giữ chặt
+worker mà không giao được gì. Trang kho chỉ mở EventSource khi
+streaming_supported(request).
+"""
+
+import asyncio
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import StockMovement, WarehouseStock, WarehouseStockShard
+
+
+# Mỗi lần đọc lùi lại bấy nhiêu ID chuyển động / giây kiểm kê để bắt transaction commit trễ
+MOVEMENT_ID_OVERLAP = 500
+STOCK_TIME_OVERLAP = timedelta(seconds=10)
+# Số chuyển động tối đa mỗi lần đọc
+POLL_LIMIT = 1000
+# Số sự kiện tối đa chờ gửi cho một kết nối; đầy thì yêu cầu trình duyệt tải lại trang
+CLIENT_QUEUE_SIZE = 500
+
+
+def streaming_supported(request):
+    """Request đến qua ASGI (luồng SSE phục vụ được)"""
+    return isinstance(request, ASGIRequest)
+
+
+def format_event(event, data, event_id=None):
+    """Một sự kiện theo định dạng text/event-stream"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+class StockChangeFeed:
+    """Bộ đọc thay đổi dùng chung trong tiến trình, phát sự kiện theo kho"""
+
+    def __init__(self):
+        self.subscribers = {}       # warehouse_id (None = mọi kho) -> set(asyncio.Queue)
+        self.task = None
+        self.last_movement_id = None
+        self.last_counted = None
+        self.seen_movements = set()
+        self.seen_stock = set()     # (id, last_counted) đã phát trong khoảng lùi lại
+        self.polls = 0
+        # Một thread riêng cho truy vấn của bộ đọc: giữ một kết nối CSDL, không chiếm
+        # thread dành cho code đồng bộ của request
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stock-feed')
+
+    # ---------- người nghe ----------
+
+    def subscribe(self, warehouse_id=None):
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.subscribers.setdefault(warehouse_id, set()).add(queue)
+        if self.task is None or self.task.done():
+            # Ngữ cảnh rỗng: task sống lâu hơn request đã tạo ra nó
+            self.task = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+        return queue
+
+    def unsubscribe(self, queue):
+        for warehouse_id, queues in list(self.subscribers.items()):
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[warehouse_id]
+
+    def listener_count(self):
+        return sum(len(queues) for queues in self.subscribers.values())
+
+    def _publish(self, events):
+        for warehouse_id, event in events:
+            for key in (warehouse_id, None):
+                for queue in list(self.subscribers.get(key, ())):
+                    try:
+                        queue.put_nowait(event)
+                    except asyncio.QueueFull:
+                        # Kết nối quá chậm: bỏ phần tồn đọng, trang tự tải lại toàn bộ
+                        while not queue.empty():
+                            queue.get_nowait()
+                        queue.put_nowait(('reload', {}, None))
+
+    # ---------- vòng đọc ----------
+
+    async def _run(self):
+        interval = settings.LIVE_STOCK_POLL_SECONDS
+        loop = asyncio.get_running_loop()
+        try:
+            if self.last_movement_id is None:
+                await loop.run_in_executor(self.executor, self._start_marks)
+            while self.subscribers:
+                await asyncio.sleep(interval)
+                if not self.subscribers:
+                    break
+                events = await loop.run_in_executor(self.executor, self.poll)
+                self._publish(events)
+        finally:
+            self.task = None
+
+    def _start_marks(self):
+        # Bắt đầu từ hiện tại: những gì đã có trong khoảng lùi lại coi như đã phát
+        close_old_connections()
+        self.last_movement_id = StockMovement.objects.aggregate(last=Max('id'))['last'] or 0
+        self.last_counted = timezone.now()
+        self.seen_movements = set(
+            StockMovement.objects.filter(id__gt=self.last_movement_id - MOVEMENT_ID_OVERLAP)
+            .values_list('id', flat=True)
+        )
+        self.seen_stock = set(
+            WarehouseStock.objects.filter(last_counted__gte=self.last_counted - STOCK_TIME_OVERLAP)
+            .values_list('id', 'last_counted')
+        )
+
+    def poll(self):
+        """Đọc thay đổi kể từ lần trước; trả về danh sách (warehouse_id, (event, data, id))"""
+        close_old_connections()
+        self.polls += 1
+        events = []
+
+        low_id = max(self.last_movement_id - MOVEMENT_ID_OVERLAP, 0)
+        movements = [
+            movement for movement in
+            StockMovement.objects.filter(id__gt=low_id)
+            .select_related('warehouse_stock__product', 'warehouse_stock__warehouse', 'created_by')
+            .order_by('id')[:POLL_LIMIT]
+            if movement.id not in self.seen_movements
+        ]
+        for movement in movements:
+            stock = movement.warehouse_stock
+            events.append((stock.warehouse_id, ('movement', {
+                'id': movement.id,
+                'warehouse_stock': stock.id,
+                'warehouse': stock.warehouse.name,
+                'product': stock.product.name,
+                'movement_type': movement.movement_type,
+                'movement_type_display': movement.get_movement_type_display(),
+                'quantity': movement.quantity,
+                'reference': movement.reference,
+                'created_by': movement.created_by.username if movement.created_by else '',
+                'created_at': timezone.localtime(movement.created_at).strftime('%d/%m/%Y %H:%M'),
+            }, movement.id)))
+            self.seen_movements.add(movement.id)
+        if movements:
+            self.last_movement_id = max(self.last_movement_id, movements[-1].id)
+            floor = self.last_movement_id - MOVEMENT_ID_OVERLAP
+            self.seen_movements = {mid for mid in self.seen_movements if mid > floor}
+
+        # Dòng tồn kho bị chuyển động tác động + dòng được sửa trực tiếp gần đây
+        changed_ids = {movement.warehouse_stock_id for movement in movements}
+        since = self.last_counted - STOCK_TIME_OVERLAP
+        for stock_id, last_counted in WarehouseStock.objects.filter(last_counted__gte=since) \
+                .values_list('id', 'last_counted'):
+            if (stock_id, last_counted) not in self.seen_stock:
+                self.seen_stock.add((stock_id, last_counted))
+                changed_ids.add(stock_id)
+            self.last_counted = max(self.last_counted, last_counted)
+        self.seen_stock = {item for item in self.seen_stock if item[1] >= since}
+
+        if changed_ids:
+            rows = list(WarehouseStock.objects.filter(id__in=changed_ids)
+                        .values('id', 'warehouse_id', 'product_id', 'quantity', 'is_sharded'))
+            sharded = [row['id'] for row in rows if row['is_sharded']]
+            totals = dict(
+                WarehouseStockShard.objects.filter(warehouse_stock_id__in=sharded)
+                .values('warehouse_stock_id').annotate(total=Sum('quantity'))
+                .values_list('warehouse_stock_id', 'total')
+            ) if sharded else {}
+            for row in rows:
+                quantity = totals.get(row['id'], 0) if row['is_sharded'] else row['quantity']
+                events.append((row['warehouse_id'], ('stock', {
+                    'warehouse_stock': row['id'],
+                    'product': row['product_id'],
+                    'quantity': quantity,
+                }, None)))
+        return events
+
+
+# Một bộ đọc cho mỗi tiến trình
+stock_feed = StockChangeFeed()
+
+
+async def stream_events(warehouse_id, keepalive):
+    """Sinh chuỗi text/event-stream cho một kết nối"""
+    # Đăng ký khi bắt đầu phát: kết nối đóng trước đó thì không để lại hàng đợi mồ côi
+    queue = stock_feed.subscribe(warehouse_id)
+    try:
+        yield f'retry: {settings.LIVE_STOCK_RETRY_MS}\n\n'
+        while True:
+            try:
+                event, data, event_id = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                # Giữ kết nối qua proxy và phát hiện trình duyệt đã đóng
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event, data, event_id)
+    finally:
+        stock_feed.unsubscribe(queue)
@@ -0,0 +1,191 @@
+"""
+Email thông báo đơn hàng: dựng nội dung ngoài request, gửi theo lô
+
+1. Signal của Order đưa task render_order_email vào hàng đợi công việc nền
+   (cùng transaction với đơn hàng, nên đơn bị rollback thì không có email).
+2. Task dựng tiêu đề/nội dung từ templates/emails/ và ghi QueuedEmail.
+3. Lệnh send_queued_mail nhận từng lô QueuedEmail (SKIP LOCKED) và gửi qua
+   một kết nối SMTP dùng lại cho nhiều email, giới hạn tốc độ gửi
+   (MAIL_RATE_PER_SECOND), thử lại lỗi tạm thời với thời gian chờ tăng dần.
+
+Đơn của khách không đăng nhập (không có email) thì không gửi thông báo.
+"""
+
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .jobs import backoff_delay
+from .models import Order, QueuedEmail
+
+
+MAX_ERROR_LENGTH = 2000
+# Khoảng cách giữa hai lần trả lại email kẹt ở 'sending' khi chạy liên tục
+REQUEUE_INTERVAL = timedelta(minutes=1)
+
+
+# ========== DỰNG NỘI DUNG ==========
+
+def queue_order_email(order_id, kind):
+    """Dựng email `kind` cho đơn hàng và ghi vào hàng đợi; None nếu không có người nhận"""
+    order = (
+        Order.objects.select_related('user', 'warehouse')
+        .prefetch_related('items__product')
+        .filter(id=order_id).first()
+    )
+    if order is None or order.user is None or not order.user.email:
+        return None
+
+    context = {'order': order, 'items': order.items.all()}
+    subject = ' '.join(render_to_string(f'emails/{kind}_subject.txt', context).split())
+    return QueuedEmail.objects.create(
+        kind=kind,
+        order=order,
+        to_email=order.user.email,
+        subject=subject,
+        body_text=render_to_string(f'emails/{kind}.txt', context),
+        body_html=render_to_string(f'emails/{kind}.html', context),
+    )
+
+
+# ========== GỬI THEO LÔ ==========
+
+def claim_batch(limit):
+    """Nhận tối đa `limit` email đã tới lượt gửi"""
+    now = timezone.now()
+    with transaction.atomic():
+        email_ids = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if email_ids:
+            QueuedEmail.objects.filter(id__in=email_ids).update(
+                status='sending', locked_at=now, attempts=F('attempts') + 1,
+            )
+    return list(QueuedEmail.objects.filter(id__in=email_ids).order_by('id'))
+
+
+def requeue_stale(lock_timeout):
+    """Trả lại hàng đợi email kẹt ở 'sending' (tiến trình gửi chết giữa lô)"""
+    cutoff = timezone.now() - lock_timeout
+    return QueuedEmail.objects.filter(status='sending', locked_at__lt=cutoff).update(
+        status='queued', locked_at=None,
+    )
+
+
+class BatchMailer:
+    """
+    Gửi QueuedEmail qua một kết nối dùng lại; mở lại kết nối sau lỗi hoặc sau
+    MAIL_MESSAGES_PER_CONNECTION email (nhiều máy chủ SMTP giới hạn số thư mỗi phiên).
+    """
+
+    def __init__(self, connection=None, rate=None, max_attempts=None, messages_per_connection=None):
+        self.connection = connection or get_connection()
+        rate = settings.MAIL_RATE_PER_SECOND if rate is None else rate
+        self.interval = 1.0 / rate if rate else 0.0
+        self.max_attempts = max_attempts or settings.MAIL_MAX_ATTEMPTS
+        self.messages_per_connection = messages_per_connection or settings.MAIL_MESSAGES_PER_CONNECTION
+        self.from_email = settings.DEFAULT_FROM_EMAIL
+        self.sent = 0
+        self.failed = 0
+        self.connections_opened = 0
+        self._on_connection = 0
+        self._next_slot = 0.0
+
+    def _throttle(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self._next_slot > now:
+            time.sleep(self._next_slot - now)
+        self._next_slot = max(now, self._next_slot) + self.interval
+
+    def _ensure_open(self):
+        if self._on_connection >= self.messages_per_connection:
+            self.close()
+        if self.connection.open():
+            self.connections_opened += 1
+
+    def close(self):
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+        self._on_connection = 0
+
+    def _message(self, email):
+        message = EmailMultiAlternatives(
+            email.subject, email.body_text, self.from_email, [email.to_email],
+            connection=self.connection,
+        )
+        if email.body_html:
+            message.attach_alternative(email.body_html, 'text/html')
+        return message
+
+    def _record_failure(self, email, exc):
+        # Người nhận bị từ chối là lỗi vĩnh viễn, không thử lại
+        permanent = isinstance(exc, smtplib.SMTPRecipientsRefused)
+        fields = {'last_error': repr(exc)[:MAX_ERROR_LENGTH], 'locked_at': None}
+        if permanent or email.attempts >= self.max_attempts:
+            fields['status'] = 'failed'
+        else:
+            fields.update(status='queued', next_attempt_at=timezone.now() + backoff_delay(email.attempts))
+        QueuedEmail.objects.filter(id=email.id).update(**fields)
+        self.failed += 1
+
+    def send_batch(self, emails):
+        """Gửi một lô; trả về số email gửi thành công"""
+        sent = 0
+        for email in emails:
+            self._throttle()
+            try:
+                self._ensure_open()
+                self.connection.send_messages([self._message(email)])
+            except (smtplib.SMTPException, OSError) as exc:
+                self._record_failure(email, exc)
+                # Kết nối có thể đã hỏng: đóng để email sau mở kết nối mới
+                self.close()
+            else:
+                self._on_connection += 1
+                # Ghi ngay từng email: tiến trình chết giữa lô thì email đã gửi không bị gửi lại
+                QueuedEmail.objects.filter(id=email.id).update(
+                    status='sent', sent_at=timezone.now(), locked_at=None, last_error='',
+                )
+                sent += 1
+
+        self.sent += sent
+        return sent
+
+    def run(self, stop_event, batch_size=None, poll_interval=None, burst=False,
+            lock_timeout=timedelta(minutes=10)):
+        """Vòng lặp gửi tới khi stop_event được đặt (hoặc hết email nếu burst)"""
+        batch_size = batch_size or settings.MAIL_BATCH_SIZE
+        poll_interval = poll_interval or settings.MAIL_POLL_SECONDS
+        last_requeue = None
+        try:
+            while not stop_event.is_set():
+                # Định kỳ, không chỉ lúc khởi động: tiến trình gửi khác có thể chết bất cứ lúc nào
+                now = timezone.now()
+                if last_requeue is None or now - last_requeue >= REQUEUE_INTERVAL:
+                    requeue_stale(lock_timeout)
+                    last_requeue = now
+                emails = claim_batch(batch_size)
+                if emails:
+                    self.send_batch(emails)
+                    continue
+                if burst:
+                    break
+                # Không giữ phiên SMTP mở khi rảnh
+                self.close()
+                stop_event.wait(poll_interval)
+        finally:
+            self.close()
@@ -0,0 +1,35 @@
+"""
+Lệnh phân kho xuất hàng cho các đơn hàng đang chờ (chạy định kỳ bằng cron)
+
+Ví dụ:
+    python manage.py allocate_orders
+    python manage.py allocate_orders --limit 5000
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.allocation import allocate_orders
+
+
+class Command(BaseCommand):
+    help = 'Tự động chọn kho xuất hàng cho các đơn hàng "Chờ xác nhận" chưa có kho'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Số đơn tối đa mỗi lần chạy')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        result = allocate_orders(limit=options['limit'])
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã phân kho {len(result.allocated)} đơn ({len(result.split)} đơn tách kho) '
+            f'trong {elapsed:.2f}s.'
+        ))
+        if result.skipped:
+            self.stdout.write(self.style.WARNING(
+                f'{len(result.skipped)} đơn chưa đủ hàng hoặc không có dòng sản phẩm: '
+                + ', '.join(f'#{order_id}' for order_id in result.skipped[:50])
+            ))
@@ -0,0 +1,47 @@
+"""
+Lệnh lưu trữ chuyển động hàng cũ theo lô nhỏ
+
+Ví dụ:
+    python manage.py archive_stock_movements
+    python manage.py archive_stock_movements --days 90 --batch-size 500 --sleep 0.2
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.archival import archive_batch, retention_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Chuyển chuyển động hàng quá hạn lưu giữ sang bảng lưu trữ và tổng hợp theo ngày'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Số ngày lưu giữ trong bảng chính (mặc định: STOCK_MOVEMENT_RETENTION_DAYS)',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Số dòng mỗi lô')
+        parser.add_argument('--sleep', type=float, default=0.1, help='Nghỉ giữa các lô (giây)')
+        parser.add_argument('--max-batches', type=int, default=None, help='Dừng sau số lô này')
+
+    def handle(self, *args, **options):
+        cutoff = retention_cutoff(options['days'])
+        self.stdout.write(f'Lưu trữ chuyển động trước {cutoff:%d/%m/%Y %H:%M}...')
+
+        started = time.monotonic()
+        total = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            archived = archive_batch(cutoff, options['batch_size'])
+            if not archived:
+                break
+            total += archived
+            batches += 1
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  Lô {batches}: {archived} dòng')
+            time.sleep(options['sleep'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã lưu trữ {total} chuyển động trong {batches} lô ({elapsed:.1f}s).'
+        ))
@@ -0,0 +1,77 @@
+"""
+Lệnh đo độ trễ và bộ nhớ của chỉ mục gợi ý tìm kiếm
+
+Mặc định dùng danh mục sản phẩm thật; --synthetic N sinh N sản phẩm ngẫu nhiên
+(không truy cập DB) để ước lượng cho danh mục lớn.
+
+Ví dụ:
+    python manage.py benchmark_autocomplete
+    python manage.py benchmark_autocomplete --synthetic 100000
+"""
+
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from shop.autocomplete import PrefixIndex, build_from_catalog
+
+
+WORDS = (
+    'bút bi chì thước kẻ giấy vở tập kẹp ghim bấm băng dính keo dán màu đỏ xanh đen '
+    'thiên long hồng hà deli văn phòng hộp file túi sổ lò xo phấn bảng mực dấu'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Đo thời gian dựng, bộ nhớ và độ trễ tra cứu của chỉ mục autocomplete'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', type=int, default=None, help='Số sản phẩm ngẫu nhiên')
+        parser.add_argument('--queries', type=int, default=5000, help='Số truy vấn đo độ trễ')
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        if options['synthetic']:
+            rows = [
+                (i, ' '.join(rng.sample(WORDS, 4)) + f' {rng.randint(1, 999)}', f'SKU{i:06d}', rng.randint(0, 500))
+                for i in range(options['synthetic'])
+            ]
+            build = lambda: PrefixIndex.build(rows)
+        else:
+            build = build_from_catalog
+
+        started = time.perf_counter()
+        index = build()
+        built = time.perf_counter() - started
+
+        # Dựng lại lần nữa dưới tracemalloc để đo bộ nhớ (chậm hơn nhiều nên không tính giờ)
+        del index
+        tracemalloc.start()
+        index = build()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        names = [name for name, _, _ in index.products.values()] or ['a']
+        queries = []
+        for _ in range(options['queries']):
+            name = rng.choice(names)
+            start = rng.randrange(len(name))
+            queries.append(name[start:start + rng.randint(1, 8)])
+
+        timings = []
+        for query in queries:
+            t = time.perf_counter()
+            index.suggest(query)
+            timings.append(time.perf_counter() - t)
+        timings.sort()
+
+        def pct(p):
+            return timings[min(int(len(timings) * p), len(timings) - 1)] * 1000
+
+        self.stdout.write(
+            f'{len(index.products)} sản phẩm, {len(index.entries)} khóa: dựng {built:.2f}s, '
+            f'bộ nhớ ~{memory / 1024 / 1024:.0f} MB'
+        )
+        self.stdout.write(f'Tra cứu: p50 {pct(0.5):.3f} ms, p99 {pct(0.99):.3f} ms, max {timings[-1] * 1000:.2f} ms')
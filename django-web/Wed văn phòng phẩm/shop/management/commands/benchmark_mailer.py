@@ -0,0 +1,85 @@
+"""
+Lệnh đo thông lượng gửi email (thư/giây) với máy chủ SMTP giả cục bộ
+
+Tạo tạm N QueuedEmail, gửi bằng BatchMailer qua SMTPStub (không gửi ra
+ngoài) rồi rollback toàn bộ, nên không để lại dữ liệu. So sánh dùng lại một
+kết nối cho cả lô với mở kết nối mới cho từng thư.
+
+Ví dụ:
+    python manage.py benchmark_mailer
+    python manage.py benchmark_mailer --messages 5000 --connect-ms 150 --message-ms 5
+"""
+
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from shop.mailer import BatchMailer, claim_batch
+from shop.models import QueuedEmail
+from shop.smtp_stub import SMTPStub
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Đo số email/giây của send_queued_mail với SMTP giả (dữ liệu được rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000, help='Số email khi dùng lại kết nối')
+        parser.add_argument('--naive-messages', type=int, default=200, help='Số email khi mở kết nối từng thư')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--connect-ms', type=float, default=50, help='Độ trễ giả lập khi mở phiên SMTP')
+        parser.add_argument('--message-ms', type=float, default=1, help='Độ trễ giả lập khi nhận mỗi thư')
+
+    def _run(self, stub, count, batch_size, messages_per_connection):
+        connection = get_connection(
+            'django.core.mail.backends.smtp.EmailBackend',
+            host='127.0.0.1', port=stub.port, username='', password='',
+            use_tls=False, use_ssl=False, timeout=10,
+        )
+        mailer = BatchMailer(
+            connection=connection, rate=0, messages_per_connection=messages_per_connection,
+        )
+        try:
+            with transaction.atomic():
+                QueuedEmail.objects.bulk_create([
+                    QueuedEmail(
+                        kind='order_confirmation',
+                        to_email=f'benchmark{i}@example.com',
+                        subject=f'[benchmark] Xác nhận đơn hàng #{i}',
+                        body_text='Cảm ơn bạn đã đặt hàng tại Cửa hàng Văn Phòng Phẩm.\n' * 20,
+                    )
+                    for i in range(count)
+                ], batch_size=1000)
+                received_before = stub.received
+                started = time.perf_counter()
+                while True:
+                    emails = claim_batch(batch_size)
+                    if not emails:
+                        break
+                    mailer.send_batch(emails)
+                mailer.close()
+                elapsed = time.perf_counter() - started
+                raise _Rollback
+        except _Rollback:
+            pass
+        return stub.received - received_before, mailer, elapsed
+
+    def handle(self, *args, **options):
+        with SMTPStub(
+            connect_delay=options['connect_ms'] / 1000, message_delay=options['message_ms'] / 1000,
+        ) as stub:
+            results = [
+                ('Dùng lại kết nối', *self._run(stub, options['messages'], options['batch_size'], None)),
+                ('Mỗi thư một kết nối', *self._run(stub, options['naive_messages'], options['batch_size'], 1)),
+            ]
+
+        for label, received, mailer, elapsed in results:
+            self.stdout.write(
+                f'{label}: {received} thư / {elapsed:.2f}s = {received / elapsed:.0f} thư/giây '
+                f'({mailer.connections_opened} phiên SMTP, {mailer.failed} lỗi)'
+            )
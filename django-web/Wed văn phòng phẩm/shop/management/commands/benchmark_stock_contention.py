@@ -0,0 +1,88 @@
+"""
+Lệnh đo thông lượng trừ kho đồng thời trên một dòng tồn kho theo số phần
+
+Tạo một kho và sản phẩm tạm, cho nhiều luồng cùng trừ kho (mỗi lần một
+transaction, giữ khóa thêm --hold-ms để mô phỏng phần còn lại của thanh
+toán) với 1, 2, 4, ... phần, rồi xóa dữ liệu tạm. Cần MySQL/PostgreSQL
+(khóa theo dòng); SQLite khóa cả cơ sở dữ liệu nên không đo được.
+
+Ví dụ:
+    python manage.py benchmark_stock_contention --shards 1,2,4,8,16 --threads 32 --ops 100
+"""
+
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from shop.models import Category, Product, Warehouse, WarehouseStock
+from shop.stock_counters import adjust_stock, current_quantity, promote
+
+
+class Command(BaseCommand):
+    help = 'Đo thông lượng trừ kho đồng thời theo số phần của dòng tồn kho'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', default='1,2,4,8,16', help='Danh sách số phần, ngăn cách bằng dấu phẩy')
+        parser.add_argument('--threads', type=int, default=16, help='Số luồng đồng thời')
+        parser.add_argument('--ops', type=int, default=100, help='Số lần trừ kho mỗi luồng')
+        parser.add_argument('--hold-ms', type=float, default=2.0, help='Thời gian giữ transaction sau khi trừ (ms)')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            raise CommandError('SQLite không có khóa theo dòng; hãy chạy trên MySQL/PostgreSQL.')
+        try:
+            shard_counts = [int(value) for value in options['shards'].split(',')]
+        except ValueError:
+            raise CommandError('--shards phải là danh sách số nguyên, ví dụ 1,2,4,8')
+
+        total_ops = options['threads'] * options['ops']
+        category = Category.objects.create(name='__benchmark__')
+        warehouse = Warehouse.objects.create(name='__benchmark__', location='', is_active=False)
+        product = Product.objects.create(name='__benchmark__', price=0, description='', category=category, sku='__BENCH__')
+        try:
+            for shard_count in shard_counts:
+                stock = WarehouseStock.objects.create(warehouse=warehouse, product=product, quantity=total_ops)
+                if shard_count > 1:
+                    promote(stock, shard_count)
+                    stock.refresh_from_db()
+
+                elapsed, errors = self.run_threads(stock, options)
+                left = current_quantity(stock)
+                self.stdout.write(
+                    f'{shard_count:>3} phần: {total_ops / elapsed:8.0f} lần trừ/s '
+                    f'({elapsed:.2f}s, còn {left}, lỗi {errors})'
+                )
+                stock.delete()
+        finally:
+            product.delete()
+            warehouse.delete()
+            category.delete()
+
+    def run_threads(self, stock, options):
+        hold = options['hold_ms'] / 1000
+        errors = []
+        barrier = threading.Barrier(options['threads'] + 1)
+
+        def worker():
+            barrier.wait()
+            try:
+                for _ in range(options['ops']):
+                    with transaction.atomic():
+                        if not adjust_stock(stock, -1):
+                            errors.append('hết hàng')
+                        time.sleep(hold)
+            except Exception as exc:
+                errors.append(repr(exc))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, len(errors)
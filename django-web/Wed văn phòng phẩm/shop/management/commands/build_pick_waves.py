@@ -0,0 +1,79 @@
+"""
+Lệnh lập đợt lấy hàng cho các đơn hàng đã xác nhận
+
+Ví dụ:
+    python manage.py build_pick_waves --warehouse 1
+    python manage.py build_pick_waves --warehouse 1 --wave-size 200 --csv waves.csv
+"""
+
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.models import Warehouse
+from shop.picking import build_pick_waves
+
+
+class Command(BaseCommand):
+    help = 'Gom đơn hàng đã xác nhận thành các đợt lấy hàng, cộng dồn theo SKU và sắp theo vị trí kệ'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--warehouse', type=int, action='append', help='ID kho (mặc định: tất cả kho đang hoạt động)')
+        parser.add_argument('--wave-size', type=int, default=50, help='Số đơn hàng tối đa mỗi đợt')
+        parser.add_argument('--csv', dest='csv_path', help='Ghi danh sách lấy hàng ra file CSV ("-" = stdout)')
+
+    def handle(self, *args, **options):
+        if options['wave_size'] < 1:
+            raise CommandError('--wave-size phải lớn hơn 0')
+
+        warehouses = Warehouse.objects.filter(is_active=True)
+        if options['warehouse']:
+            warehouses = warehouses.filter(id__in=options['warehouse'])
+
+        planned = []
+        for warehouse in warehouses:
+            started = time.monotonic()
+            waves = build_pick_waves(warehouse.id, wave_size=options['wave_size'])
+            elapsed = time.monotonic() - started
+            orders = sum(len(wave.order_ids) for wave in waves)
+            self.stderr.write(f'{warehouse.name}: {orders} đơn, {len(waves)} đợt ({elapsed:.2f}s)')
+            planned.append((warehouse, waves))
+
+        if options['csv_path']:
+            self.write_csv(options['csv_path'], planned)
+        else:
+            self.write_text(planned)
+
+    def write_text(self, planned):
+        for warehouse, waves in planned:
+            for wave in waves:
+                self.stdout.write('')
+                self.stdout.write(
+                    f'=== {warehouse.name} - Đợt {wave.number}: {len(wave.order_ids)} đơn, '
+                    f'{wave.total_units} sản phẩm ==='
+                )
+                self.stdout.write('Đơn: ' + ', '.join(f'#{order_id}' for order_id in wave.order_ids))
+                self.stdout.write(f'{"Vị trí":<12} {"SKU":<16} {"SL":>6} {"Số đơn":>7}  Sản phẩm')
+                for line in wave.lines:
+                    self.stdout.write(
+                        f'{line.location or "-":<12} {line.sku:<16} {line.quantity:>6} '
+                        f'{line.order_count:>7}  {line.name}'
+                    )
+
+    def write_csv(self, path, planned):
+        f = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            writer = csv.writer(f)
+            writer.writerow(['warehouse', 'wave', 'location', 'sku', 'product', 'quantity', 'orders'])
+            for warehouse, waves in planned:
+                for wave in waves:
+                    for line in wave.lines:
+                        writer.writerow([
+                            warehouse.name, wave.number, line.location, line.sku,
+                            line.name, line.quantity, line.order_count,
+                        ])
+        finally:
+            if f is not sys.stdout:
+                f.close()
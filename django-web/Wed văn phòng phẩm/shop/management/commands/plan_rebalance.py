@@ -0,0 +1,110 @@
+"""
+Lệnh lập kế hoạch điều chuyển hàng giữa các kho
+
+Ví dụ:
+    python manage.py plan_rebalance
+    python manage.py plan_rebalance --min-days 5 --target-days 14 --save
+    python manage.py plan_rebalance --csv transfers.csv
+    python manage.py plan_rebalance --benchmark 50000x50
+"""
+
+import csv
+import sys
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from shop.models import Product, Warehouse
+from shop.rebalancing import load_rebalance_input, plan_transfers, save_proposals
+
+
+class Command(BaseCommand):
+    help = 'Đề xuất điều chuyển hàng từ kho thừa sang kho thiếu (dựa trên compute_demand)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-days', type=float, default=7, help='Kho dưới mức ngày tồn kho này cần bổ sung')
+        parser.add_argument('--target-days', type=float, default=21, help='Mức ngày tồn kho mong muốn')
+        parser.add_argument('--max-days', type=float, default=60, help='Kho trên mức ngày tồn kho này có thể nhường hàng')
+        parser.add_argument('--min-transfer', type=int, default=1, help='Số lượng tối thiểu mỗi lần chuyển')
+        parser.add_argument('--csv', dest='csv_path', help='Ghi kế hoạch ra file CSV ("-" = stdout)')
+        parser.add_argument('--save', action='store_true', help='Lưu thành đề xuất điều chuyển trong admin')
+        parser.add_argument(
+            '--benchmark', metavar='SKUxKHO',
+            help='Chạy planner trên dữ liệu ngẫu nhiên (vd. 50000x50) và đo thời gian, không truy cập DB',
+        )
+
+    def handle(self, *args, **options):
+        params = {
+            'min_days': options['min_days'],
+            'target_days': options['target_days'],
+            'max_days': options['max_days'],
+            'min_transfer': options['min_transfer'],
+        }
+        if options['benchmark']:
+            return self.benchmark(options['benchmark'], params)
+
+        started = time.monotonic()
+        data = load_rebalance_input()
+        loaded = time.monotonic()
+        plan = plan_transfers(data.quantity, data.velocity, data.free_capacity, **params)
+        solved = time.monotonic()
+
+        sku, source, destination, quantity = plan
+        self.stdout.write(
+            f'{len(data.product_ids)} SKU x {len(data.warehouse_ids)} kho: '
+            f'{len(quantity)} lần chuyển, {int(quantity.sum())} đơn vị '
+            f'(đọc dữ liệu {loaded - started:.2f}s, giải {solved - loaded:.2f}s).'
+        )
+
+        if options['csv_path']:
+            self.write_csv(options['csv_path'], data, plan)
+
+        if options['save'] and len(quantity):
+            batch = timezone.now().strftime('REBAL-%Y%m%d-%H%M%S')
+            saved = save_proposals(data, plan, batch)
+            self.stdout.write(self.style.SUCCESS(f'Đã lưu {saved} đề xuất vào lô {batch}.'))
+
+    def write_csv(self, path, data, plan):
+        sku, source, destination, quantity = plan
+        names = dict(Product.objects.filter(id__in=data.product_ids[np.unique(sku)].tolist()).values_list('id', 'sku'))
+        warehouses = dict(Warehouse.objects.values_list('id', 'name'))
+
+        f = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            writer = csv.writer(f)
+            writer.writerow(['product_id', 'sku', 'source', 'destination', 'quantity'])
+            for s, src, dst, q in zip(sku, source, destination, quantity):
+                product_id = int(data.product_ids[s])
+                writer.writerow([
+                    product_id, names.get(product_id, ''),
+                    warehouses[int(data.warehouse_ids[src])],
+                    warehouses[int(data.warehouse_ids[dst])],
+                    int(q),
+                ])
+        finally:
+            if f is not sys.stdout:
+                f.close()
+
+    def benchmark(self, spec, params):
+        try:
+            n_skus, n_warehouses = (int(x) for x in spec.lower().split('x'))
+        except ValueError:
+            raise CommandError('Định dạng --benchmark: SKUxKHO, ví dụ 50000x50')
+
+        rng = np.random.default_rng(0)
+        velocity = rng.gamma(1.0, 2.0, (n_skus, n_warehouses))
+        quantity = rng.integers(0, 400, (n_skus, n_warehouses))
+        free_capacity = rng.integers(n_skus, n_skus * 20, n_warehouses).astype(np.float64)
+
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            sku, source, destination, moved = plan_transfers(quantity, velocity, free_capacity, **params)
+            timings.append(time.perf_counter() - started)
+
+        self.stdout.write(
+            f'{n_skus} SKU x {n_warehouses} kho: {len(moved)} lần chuyển, {int(moved.sum())} đơn vị; '
+            f'thời gian tốt nhất {min(timings):.2f}s, trung bình {sum(timings) / len(timings):.2f}s'
+        )
@@ -0,0 +1,105 @@
+"""
+Lệnh xóa session hết hạn theo lô nhỏ (thay cho clearsessions)
+
+clearsessions xóa tất cả session hết hạn bằng một câu DELETE lớn, khóa bảng
+django_session và làm chậm thanh toán. Lệnh này xóa theo lô nhỏ theo thứ tự
+khóa chính, nghỉ giữa các lô, và có thể xóa sớm session của khách không có
+giỏ hàng.
+
+Ví dụ:
+    python manage.py purge_sessions
+    python manage.py purge_sessions --batch-size 500 --sleep 0.2
+    python manage.py purge_sessions --empty-guests 24
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from shop.cart import CART_SESSION_KEY
+
+
+class Command(BaseCommand):
+    help = 'Xóa session hết hạn theo lô nhỏ, tùy chọn xóa sớm session khách có giỏ hàng trống'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Số dòng mỗi lô')
+        parser.add_argument('--sleep', type=float, default=0.1, help='Nghỉ giữa các lô (giây)')
+        parser.add_argument('--max-batches', type=int, default=None, help='Dừng sau số lô này (mỗi bước)')
+        parser.add_argument(
+            '--empty-guests', type=float, metavar='GIỜ', default=None,
+            help='Xóa cả session khách (chưa đăng nhập, giỏ hàng trống) không hoạt động quá số giờ này',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.SESSION_ENGINE.endswith(('.db', '.cached_db')):
+            raise CommandError(f'SESSION_ENGINE={settings.SESSION_ENGINE} không lưu session trong django_session.')
+        self.options = options
+
+        self.report('session hết hạn', *self.purge_expired())
+        if options['empty_guests'] is not None:
+            self.report('session khách giỏ hàng trống', *self.purge_empty_guests(options['empty_guests']))
+
+    def purge_expired(self):
+        now = timezone.now()
+        started = time.monotonic()
+        total = batches = 0
+        while self.options['max_batches'] is None or batches < self.options['max_batches']:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:self.options['batch_size']]
+            )
+            if not keys:
+                break
+            total += Session.objects.filter(pk__in=keys).delete()[0]
+            batches += 1
+            self.pause(batches, total)
+        return total, batches, time.monotonic() - started
+
+    def purge_empty_guests(self, idle_hours):
+        """
+        Duyệt session theo khóa chính (keyset) và xóa session khách không có giỏ hàng.
+
+        Session được lưu lần cuối lúc expire_date - SESSION_COOKIE_AGE, nên session
+        không hoạt động quá `idle_hours` có expire_date nhỏ hơn mốc dưới đây.
+        """
+        idle_before = timezone.now() + timedelta(seconds=settings.SESSION_COOKIE_AGE) - timedelta(hours=idle_hours)
+        decoder = Session.get_session_store_class()()
+        started = time.monotonic()
+        total = batches = 0
+        last_key = ''
+        while self.options['max_batches'] is None or batches < self.options['max_batches']:
+            rows = list(
+                Session.objects.filter(expire_date__lt=idle_before, pk__gt=last_key)
+                .order_by('pk')
+                .values_list('pk', 'session_data')[:self.options['batch_size']]
+            )
+            if not rows:
+                break
+            last_key = rows[-1][0]
+            keys = []
+            for key, data in rows:
+                decoded = decoder.decode(data)
+                if '_auth_user_id' not in decoded and not decoded.get(CART_SESSION_KEY):
+                    keys.append(key)
+            if keys:
+                total += Session.objects.filter(pk__in=keys).delete()[0]
+            batches += 1
+            self.pause(batches, total)
+        return total, batches, time.monotonic() - started
+
+    def pause(self, batches, total):
+        if self.options['verbosity'] >= 2:
+            self.stdout.write(f'  Lô {batches}: tổng {total} dòng')
+        time.sleep(self.options['sleep'])
+
+    def report(self, label, total, batches, elapsed):
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã xóa {total} {label} trong {batches} lô ({elapsed:.1f}s, {rate:.0f} dòng/s).'
+        ))
@@ -0,0 +1,47 @@
+"""
+Lệnh kiểm tra và tính lại số lượng khả dụng (Product.available_quantity)
+
+Ví dụ:
+    python manage.py rebuild_availability --check
+    python manage.py rebuild_availability
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.availability import find_drift, refresh_availability
+
+
+class Command(BaseCommand):
+    help = 'Đối chiếu available_quantity với tồn kho thực tế và sửa các sản phẩm bị lệch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Chỉ báo cáo, không sửa')
+        parser.add_argument('--all', action='store_true', help='Tính lại toàn bộ sản phẩm thay vì chỉ sản phẩm lệch')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['all'] and not options['check']:
+            updated = refresh_availability()
+            self.stdout.write(self.style.SUCCESS(
+                f'Đã tính lại {updated} sản phẩm ({time.monotonic() - started:.1f}s).'
+            ))
+            return
+
+        drift = find_drift()
+        for product_id, stored, expected in drift[:50]:
+            self.stdout.write(f'  #{product_id}: đang lưu {stored}, đúng là {expected}')
+        if len(drift) > 50:
+            self.stdout.write(f'  ... và {len(drift) - 50} sản phẩm khác')
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Không có sản phẩm nào bị lệch.'))
+        elif options['check']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} sản phẩm bị lệch.'))
+        else:
+            ids = [product_id for product_id, _, _ in drift]
+            updated = sum(refresh_availability(ids[i:i + 1000]) for i in range(0, len(ids), 1000))
+            self.stdout.write(self.style.SUCCESS(
+                f'Đã sửa {updated} sản phẩm bị lệch ({time.monotonic() - started:.1f}s).'
+            ))
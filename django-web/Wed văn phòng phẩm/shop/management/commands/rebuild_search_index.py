@@ -0,0 +1,31 @@
+"""
+Lệnh dựng lại chỉ mục tìm kiếm sản phẩm
+
+Chỉ mục của sản phẩm được cập nhật dần bởi consumer outbox 'search-index',
+nên sau khi dựng lại vẫn cần chạy relay_outbox để giữ chỉ mục mới nhất.
+
+Ví dụ:
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --batch-size 5000
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Dựng lại toàn bộ chỉ mục tìm kiếm (tên, mô tả, SKU, danh mục) của sản phẩm'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Số sản phẩm mỗi lô')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        products, tokens = rebuild_index(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã lập chỉ mục {products} sản phẩm ({tokens} dòng) trong {elapsed:.1f}s.'
+        ))
@@ -0,0 +1,73 @@
+"""
+Lệnh đối soát sổ cái chuyển động hàng với tồn kho đang lưu
+
+Ví dụ:
+    python manage.py reconcile_stock
+    python manage.py reconcile_stock --warehouse 1 --warehouse 2 --workers 4
+    python manage.py reconcile_stock --csv drift.csv --fix
+"""
+
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.models import Warehouse
+from shop.reconciliation import reconcile, write_adjustments
+
+
+class Command(BaseCommand):
+    help = 'Đối soát tồn kho (WarehouseStock) với sổ cái chuyển động hàng (StockMovement)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--warehouse', type=int, action='append', dest='warehouses',
+            help='ID kho cần đối soát (có thể lặp lại). Mặc định: tất cả các kho',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Số tiến trình song song (mặc định: số CPU, 1 = chạy tuần tự)',
+        )
+        parser.add_argument('--csv', dest='csv_path', help='Ghi báo cáo lệch ra file CSV')
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Ghi chuyển động "adjust" để sổ cái khớp với tồn kho đang lưu',
+        )
+
+    def handle(self, *args, **options):
+        warehouse_ids = options['warehouses'] or list(
+            Warehouse.objects.order_by('id').values_list('id', flat=True)
+        )
+        if not warehouse_ids:
+            raise CommandError('Không có kho nào để đối soát.')
+
+        started = time.monotonic()
+        drifts = reconcile(warehouse_ids, workers=options['workers'])
+        elapsed = time.monotonic() - started
+
+        for drift in drifts:
+            self.stdout.write(
+                f'Kho {drift.warehouse_id} / SP {drift.product_id} '
+                f'(tồn kho #{drift.warehouse_stock_id}): '
+                f'lưu {drift.stored}, sổ cái {drift.expected}, lệch {drift.difference:+d}'
+            )
+
+        if options['csv_path']:
+            with open(options['csv_path'], 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['warehouse_stock_id', 'warehouse_id', 'product_id', 'stored', 'expected', 'difference'])
+                for drift in drifts:
+                    writer.writerow([
+                        drift.warehouse_stock_id, drift.warehouse_id, drift.product_id,
+                        drift.stored, drift.expected, drift.difference,
+                    ])
+
+        self.stdout.write(
+            f'Đã đối soát {len(warehouse_ids)} kho trong {elapsed:.1f}s: {len(drifts)} dòng lệch.'
+        )
+
+        if options['fix'] and drifts:
+            created = write_adjustments(drifts)
+            self.stdout.write(self.style.SUCCESS(f'Đã ghi {created} chuyển động điều chỉnh.'))
+        elif not drifts:
+            self.stdout.write(self.style.SUCCESS('Sổ cái khớp với tồn kho.'))
@@ -0,0 +1,54 @@
+"""
+Lệnh giao sự kiện outbox cho các consumer đã đăng ký (shop/outbox.py)
+
+Chạy liên tục như một tiến trình riêng; dừng bằng Ctrl+C/SIGTERM sau khi
+giao xong lô hiện tại. Có thể chạy nhiều tiến trình, mỗi consumer chỉ được
+một tiến trình xử lý tại một thời điểm.
+
+Ví dụ:
+    python manage.py relay_outbox
+    python manage.py relay_outbox --burst           # đuổi kịp rồi thoát
+    python manage.py relay_outbox --status          # in độ trễ từng consumer
+"""
+
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.outbox import OutboxRelay, outbox_lag
+
+
+class Command(BaseCommand):
+    help = 'Giao sự kiện outbox theo thứ tự cho các consumer (ít nhất một lần)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Số sự kiện mỗi lô (mặc định OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--burst', action='store_true', help='Thoát khi đã giao hết sự kiện hiện có')
+        parser.add_argument('--status', action='store_true', help='Chỉ in độ trễ của các consumer rồi thoát')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            for row in outbox_lag():
+                line = (
+                    f"{row['consumer']}: vị trí {row['last_event_id']}/{row['head']}, "
+                    f"còn {row['pending']} sự kiện, trễ {row['lag_seconds']}s"
+                )
+                if row['failures']:
+                    line += f", lỗi {row['failures']} lần: {row['last_error']}"
+                self.stdout.write(self.style.WARNING(line) if row['failures'] else line)
+            return
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        signal.signal(signal.SIGINT, lambda *args: stop.set())
+
+        relay = OutboxRelay(batch_size=options['batch_size'])
+        started = time.monotonic()
+        relay.run(stop, burst=options['burst'])
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã giao {relay.delivered} sự kiện, dọn {relay.purged} sự kiện cũ ({elapsed:.1f}s).'
+        ))
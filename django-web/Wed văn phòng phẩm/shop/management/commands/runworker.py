@@ -0,0 +1,76 @@
+"""
+Lệnh chạy worker xử lý hàng đợi công việc nền (shop/jobs.py)
+
+Chạy nhiều worker (nhiều máy/tiến trình) song song được: mỗi việc chỉ được
+một worker nhận nhờ SELECT ... FOR UPDATE SKIP LOCKED. Giới hạn đồng thời
+theo queue (JOB_QUEUES) tính chung cho mọi worker. Dừng bằng Ctrl+C/SIGTERM:
+worker ngừng nhận việc và chờ các việc đang chạy xong.
+
+Ví dụ:
+    python manage.py runworker
+    python manage.py runworker --queue email --queue default
+    python manage.py runworker --queue reports:2 --mode process
+    python manage.py runworker --burst      # chạy hết việc đang chờ rồi thoát
+"""
+
+import signal
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = 'Nhận và chạy công việc nền từ bảng Job trên pool thread hoặc process'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue', action='append', default=[],
+            help='Queue cần xử lý, dạng tên hoặc tên:số_đồng_thời (mặc định: tất cả trong JOB_QUEUES)',
+        )
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread', help='Loại pool')
+        parser.add_argument('--poll', type=float, default=None, help='Chu kỳ kiểm tra việc mới (giây)')
+        parser.add_argument('--burst', action='store_true', help='Thoát khi không còn việc đã tới giờ')
+        parser.add_argument('--no-schedule', action='store_true', help='Không tạo task định kỳ (JOB_SCHEDULE)')
+
+    def _parse_queues(self, specs):
+        if not specs:
+            return dict(settings.JOB_QUEUES)
+        queues = {}
+        for spec in specs:
+            name, _, concurrency = spec.partition(':')
+            try:
+                queues[name] = int(concurrency) if concurrency else settings.JOB_QUEUES.get(name, 1)
+            except ValueError:
+                raise CommandError(f'Số đồng thời không hợp lệ: {spec}')
+            if queues[name] < 1:
+                raise CommandError(f'Số đồng thời phải >= 1: {spec}')
+        return queues
+
+    def handle(self, *args, **options):
+        queues = self._parse_queues(options['queue'])
+        worker = Worker(
+            queues,
+            mode=options['mode'],
+            poll_interval=options['poll'] or settings.JOB_POLL_SECONDS,
+            schedule={} if options['no_schedule'] else settings.JOB_SCHEDULE,
+            lock_timeout=timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS),
+            burst=options['burst'],
+        )
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+
+        self.stdout.write(
+            f'Worker {worker.worker_id} ({options["mode"]}) đang xử lý: '
+            + ', '.join(f'{name}×{limit}' for name, limit in queues.items())
+        )
+        started = time.monotonic()
+        worker.run()
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã dừng sau {elapsed:.1f}s: {worker.succeeded} việc thành công, {worker.failed} việc lỗi.'
+        ))
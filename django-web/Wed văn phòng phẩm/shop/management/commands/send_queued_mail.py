@@ -0,0 +1,44 @@
+"""
+Lệnh gửi email thông báo đơn hàng đang chờ theo lô (shop/mailer.py)
+
+Chạy liên tục như một tiến trình riêng; dừng bằng Ctrl+C/SIGTERM sau khi
+gửi xong lô hiện tại. Có thể chạy nhiều tiến trình, mỗi email chỉ được một
+tiến trình nhận.
+
+Ví dụ:
+    python manage.py send_queued_mail
+    python manage.py send_queued_mail --rate 5 --batch-size 50
+    python manage.py send_queued_mail --burst          # gửi hết rồi thoát
+"""
+
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.mailer import BatchMailer
+
+
+class Command(BaseCommand):
+    help = 'Gửi QueuedEmail theo lô qua một kết nối SMTP dùng lại, có giới hạn tốc độ và thử lại'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Số email mỗi lô (mặc định MAIL_BATCH_SIZE)')
+        parser.add_argument('--rate', type=float, default=None, help='Số email tối đa mỗi giây (0 = không giới hạn)')
+        parser.add_argument('--burst', action='store_true', help='Thoát khi không còn email đến lượt gửi')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        signal.signal(signal.SIGINT, lambda *args: stop.set())
+
+        mailer = BatchMailer(rate=options['rate'])
+        started = time.monotonic()
+        mailer.run(stop, batch_size=options['batch_size'], burst=options['burst'])
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã gửi {mailer.sent} email, {mailer.failed} lỗi, '
+            f'{mailer.connections_opened} phiên SMTP ({elapsed:.1f}s).'
+        ))
@@ -0,0 +1,41 @@
+"""
+Lệnh chụp tồn kho định kỳ (chạy bằng cron/scheduler)
+
+Ví dụ:
+    python manage.py take_stock_snapshot
+    python manage.py take_stock_snapshot --interval 6
+    python manage.py take_stock_snapshot --force
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shop.snapshots import last_snapshot_time, snapshot_interval, take_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Chụp tồn kho theo sổ cái cho tất cả các dòng tồn kho'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Khoảng cách tối thiểu giữa hai lần chụp (giờ). '
+                 'Mặc định: STOCK_SNAPSHOT_INTERVAL_HOURS',
+        )
+        parser.add_argument('--force', action='store_true', help='Chụp ngay, bỏ qua khoảng cách')
+
+    def handle(self, *args, **options):
+        interval = snapshot_interval()
+        if options['interval'] is not None:
+            interval = timedelta(hours=options['interval'])
+
+        now = timezone.now()
+        last = last_snapshot_time()
+        if not options['force'] and last is not None and now - last < interval:
+            self.stdout.write(f'Bỏ qua: lần chụp gần nhất lúc {last:%d/%m/%Y %H:%M}.')
+            return
+
+        created = take_snapshot(now)
+        self.stdout.write(self.style.SUCCESS(f'Đã chụp {created} dòng tồn kho.'))
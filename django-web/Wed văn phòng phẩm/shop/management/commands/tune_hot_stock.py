@@ -0,0 +1,36 @@
+"""
+Lệnh tự chia phần/gộp tồn kho theo mức tranh chấp khóa (chạy mỗi phút bằng cron)
+
+Ví dụ:
+    python manage.py tune_hot_stock
+    python manage.py tune_hot_stock --window 10 --hot-wait-ms 1000 --shards 16
+"""
+
+from django.core.management.base import BaseCommand
+
+from shop.stock_counters import sync_sharded_quantities, tune_hot_stock
+
+
+class Command(BaseCommand):
+    help = 'Chia phần dòng tồn kho bị chờ khóa nhiều, gộp dòng đã nguội và đồng bộ tổng số lượng'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=5, help='Cửa sổ quan sát thời gian chờ khóa (phút)')
+        parser.add_argument('--hot-wait-ms', type=float, default=None, help='Mặc định: STOCK_HOT_LOCK_WAIT_MS')
+        parser.add_argument('--cold-ops', type=int, default=None, help='Mặc định: STOCK_COLD_OPS')
+        parser.add_argument('--shards', type=int, default=None, help='Số phần khi chia (mặc định: STOCK_SHARD_COUNT)')
+
+    def handle(self, *args, **options):
+        promoted, demoted = tune_hot_stock(
+            window_minutes=options['window'],
+            hot_wait_ms=options['hot_wait_ms'],
+            cold_ops=options['cold_ops'],
+            shard_count=options['shards'],
+        )
+        synced = sync_sharded_quantities()
+        self.stdout.write(self.style.SUCCESS(
+            f'Chia phần {len(promoted)} dòng, gộp {len(demoted)} dòng, đồng bộ {synced} dòng đang chia phần.'
+        ))
+        for label, ids in (('Chia phần', promoted), ('Gộp', demoted)):
+            if ids:
+                self.stdout.write(f'  {label}: ' + ', '.join(f'#{pk}' for pk in ids))
@@ -0,0 +1,25 @@
+"""
+Lệnh cập nhật tăng dần các bảng tổng hợp báo cáo (chạy định kỳ bằng cron)
+
+Ví dụ:
+    python manage.py update_report_rollups
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.reports import refresh_movement_rollups, refresh_revenue_rollups
+
+
+class Command(BaseCommand):
+    help = 'Cập nhật tổng hợp doanh thu và chuyển động hàng từ mốc đã xử lý'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        days = refresh_revenue_rollups()
+        movements = refresh_movement_rollups()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã tính lại doanh thu {days} ngày, cộng {movements} chuyển động ({elapsed:.1f}s).'
+        ))
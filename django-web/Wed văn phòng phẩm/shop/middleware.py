@@ -0,0 +1,239 @@
+"""
+Middleware cho Cửa hàng Văn Phòng Phẩm
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.urls import Resolver404, resolve
+
+from .cart import CART_COUNT_COOKIE, CART_ID_COOKIE, COOKIE_SALT
+from .query_limits import QueryTooSlow, lift_statement_timeout, statement_timeout
+
+
+class CartMiddleware:
+    """Đồng bộ cookie đã ký `cart_count` (và `cart_id` của CacheCartStore) sau mỗi request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        count = getattr(request, '_cart_count', None)
+        if count is not None:
+            try:
+                current = request.get_signed_cookie(CART_COUNT_COOKIE, salt=COOKIE_SALT)
+            except (KeyError, signing.BadSignature):
+                current = None
+            if count and current != str(count):
+                response.set_signed_cookie(
+                    CART_COUNT_COOKIE, str(count), salt=COOKIE_SALT,
+                    max_age=settings.SESSION_COOKIE_AGE, httponly=True, samesite='Lax',
+                    secure=settings.SESSION_COOKIE_SECURE,
+                )
+            elif not count and CART_COUNT_COOKIE in request.COOKIES:
+                response.delete_cookie(CART_COUNT_COOKIE, samesite='Lax')
+
+        new_id = getattr(request, '_cart_new_id', None)
+        if new_id:
+            response.set_signed_cookie(
+                CART_ID_COOKIE, new_id, salt=COOKIE_SALT,
+                max_age=settings.SESSION_COOKIE_AGE, httponly=True, samesite='Lax',
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        elif getattr(request, '_cart_drop_id', False):
+            response.delete_cookie(CART_ID_COOKIE, samesite='Lax')
+
+        return response
+
+
+# ========== GIỚI HẠN THEO MỨC ƯU TIÊN ==========
+
+class PriorityClass:
+    """
+    Một lớp ưu tiên trong một tiến trình: tối đa `limit` request chạy cùng lúc,
+    tối đa `queue` request chờ, mỗi request chờ không quá `timeout_ms`.
+    `shed_at` (mặc định bằng `limit`) là số request đang chạy mà từ đó lớp
+    được coi là chịu tải: các lớp nhường cho lớp này (`yield_to`) bị cắt trước
+    khi lớp này hết chỗ.
+    """
+
+    def __init__(self, name, limit, queue=0, timeout_ms=0, yield_to=None, shed_at=None):
+        self.name = name
+        self.limit = limit
+        self.shed_at = limit if shed_at is None else min(shed_at, limit)
+        self.max_queue = queue
+        self.timeout = timeout_ms / 1000.0
+        self.yield_to = yield_to
+        self.cond = threading.Condition()
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def under_pressure(self):
+        """Đã tới ngưỡng `shed_at` hoặc đang có request phải chờ"""
+        return self.queued > 0 or self.in_flight >= self.shed_at
+
+    def acquire(self):
+        """Trả về None nếu được chạy, ngược lại là lý do từ chối"""
+        with self.cond:
+            # Còn chỗ thì chạy ngay, kể cả khi request đang chờ chưa kịp thức dậy
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                self.admitted += 1
+                return None
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                return 'queue_full'
+
+            deadline = time.monotonic() + self.timeout
+            self.queued += 1
+            try:
+                while self.in_flight >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        return 'timeout'
+                    self.cond.wait(remaining)
+                self.in_flight += 1
+                self.admitted += 1
+                return None
+            finally:
+                self.queued -= 1
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify()
+
+    def shed(self):
+        with self.cond:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self.cond:
+            return {
+                'limit': self.limit,
+                'shed_at': self.shed_at,
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+            }
+
+
+_priority_classes = {}
+_priority_classes_lock = threading.Lock()
+
+
+def priority_classes():
+    """Các lớp ưu tiên của tiến trình hiện tại, tạo từ REQUEST_PRIORITY_CLASSES"""
+    if not _priority_classes:
+        with _priority_classes_lock:
+            if not _priority_classes:
+                for name, options in getattr(settings, 'REQUEST_PRIORITY_CLASSES', {}).items():
+                    _priority_classes[name] = PriorityClass(name, **options)
+    return _priority_classes
+
+
+def priority_metrics():
+    """Độ sâu hàng đợi và số lần từ chối theo lớp (của tiến trình này)"""
+    return {name: klass.snapshot() for name, klass in priority_classes().items()}
+
+
+class PriorityLimitMiddleware:
+    """
+    Giới hạn số request đang chạy theo lớp ưu tiên của route (tên URL trong
+    REQUEST_PRIORITY_ROUTES, còn lại thuộc REQUEST_PRIORITY_DEFAULT).
+
+    Request vượt giới hạn chờ trong hàng đợi của lớp tới hạn timeout_ms; hàng
+    đợi đầy hoặc hết hạn thì trả ngay 503 kèm Retry-After. Lớp có `yield_to`
+    (vd. báo cáo nặng) bị từ chối ngay khi lớp được nhường (thanh toán) chạm
+    ngưỡng `shed_at` thấp hơn `limit`, nên tải được cắt ở trang nặng trước
+    khi thanh toán phải chờ.
+
+    Đặt ngay sau SecurityMiddleware để request bị từ chối không đọc session.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.classes = priority_classes()
+        if not self.classes:
+            raise MiddlewareNotUsed
+        self.routes = getattr(settings, 'REQUEST_PRIORITY_ROUTES', {})
+        self.default = settings.REQUEST_PRIORITY_DEFAULT
+        self.retry_after = str(getattr(settings, 'REQUEST_PRIORITY_RETRY_AFTER', 5))
+
+    def _class_for(self, request):
+        try:
+            url_name = resolve(request.path_info).view_name
+        except Resolver404:
+            url_name = None
+        return self.classes[self.routes.get(url_name, self.default)]
+
+    def _reject(self):
+        response = HttpResponse(
+            'Hệ thống đang quá tải, vui lòng thử lại sau ít phút.',
+            status=503, content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = self.retry_after
+        return response
+
+    def __call__(self, request):
+        klass = self._class_for(request)
+
+        protected = self.classes.get(klass.yield_to)
+        if protected is not None and protected.under_pressure():
+            klass.shed()
+            return self._reject()
+
+        if klass.acquire() is not None:
+            return self._reject()
+        try:
+            return self.get_response(request)
+        finally:
+            klass.release()
+
+
+# ========== GIỚI HẠN THỜI GIAN TRUY VẤN ==========
+
+class StatementTimeoutMiddleware:
+    """
+    Áp giới hạn thời gian truy vấn theo tên URL (STATEMENT_TIMEOUTS, ms) trong
+    suốt request, và hiển thị trang "truy vấn quá chậm" khi view gặp
+    QueryTooSlow (kể cả từ view dùng @statement_timeout trực tiếp).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.timeouts = getattr(settings, 'STATEMENT_TIMEOUTS', {})
+
+    def __call__(self, request):
+        timeout_ms = None
+        if self.timeouts:
+            try:
+                timeout_ms = self.timeouts.get(resolve(request.path_info).view_name)
+            except Resolver404:
+                pass
+        if not timeout_ms:
+            return self.get_response(request)
+        with statement_timeout(timeout_ms):
+            return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, QueryTooSlow):
+            return None
+        lift_statement_timeout()
+        return render(request, 'query_too_slow.html', {
+            'timeout_seconds': exception.timeout_ms / 1000,
+        }, status=503)
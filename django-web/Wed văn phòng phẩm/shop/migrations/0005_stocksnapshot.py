@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_alter_product_options_alter_stockmovement_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(help_text='Tồn kho theo sổ cái tại thời điểm chụp')),
+                ('last_movement_id', models.BigIntegerField(default=0, help_text='ID chuyển động cuối cùng đã được tính vào ảnh chụp')),
+                ('taken_at', models.DateTimeField(help_text='Thời điểm chụp')),
+                ('warehouse_stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='shop.warehousestock')),
+            ],
+            options={
+                'verbose_name': 'Ảnh chụp tồn kho',
+                'verbose_name_plural': 'Ảnh chụp tồn kho',
+                'ordering': ['-taken_at'],
+                'indexes': [models.Index(fields=['warehouse_stock', 'taken_at'], name='shop_stocks_warehou_c14bb0_idx'), models.Index(fields=['taken_at'], name='shop_stocks_taken_a_4150e4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 6.0 on 2026-10-19 09:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0005_stocksnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovementArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('movement_type', models.CharField(choices=[('import', 'Nhập hàng'), ('export', 'Xuất hàng'), ('transfer', 'Chuyển kho'), ('adjust', 'Điều chỉnh'), ('sale', 'Bán hàng')], max_length=20)),
+                ('quantity', models.IntegerField()),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Chuyển động hàng (lưu trữ)',
+                'verbose_name_plural': 'Chuyển động hàng (lưu trữ)',
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovementDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('movement_type', models.CharField(choices=[('import', 'Nhập hàng'), ('export', 'Xuất hàng'), ('transfer', 'Chuyển kho'), ('adjust', 'Điều chỉnh'), ('sale', 'Bán hàng')], max_length=20)),
+                ('quantity', models.IntegerField(default=0, help_text='Tổng số lượng thay đổi')),
+                ('movement_count', models.IntegerField(default=0, help_text='Số chuyển động')),
+            ],
+            options={
+                'verbose_name': 'Tổng hợp chuyển động theo ngày',
+                'verbose_name_plural': 'Tổng hợp chuyển động theo ngày',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['created_at'], name='shop_stockm_created_40264e_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockmovementarchive',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='stockmovementarchive',
+            name='warehouse_stock',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_movements', to='shop.warehousestock'),
+        ),
+        migrations.AddField(
+            model_name='stockmovementdailyrollup',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movement_rollups', to='shop.product'),
+        ),
+        migrations.AddField(
+            model_name='stockmovementdailyrollup',
+            name='warehouse',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movement_rollups', to='shop.warehouse'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovementarchive',
+            index=models.Index(fields=['created_at'], name='shop_stockm_created_95e8c4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovementdailyrollup',
+            index=models.Index(fields=['day', 'movement_type'], name='shop_stockm_day_998a1f_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='stockmovementdailyrollup',
+            unique_together={('day', 'warehouse', 'product', 'movement_type')},
+        ),
+    ]
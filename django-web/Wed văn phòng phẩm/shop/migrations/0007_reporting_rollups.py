@@ -0,0 +1,86 @@
+# Generated by Django 6.0 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0006_stockmovement_archive_and_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryMovementDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('movement_type', models.CharField(choices=[('import', 'Nhập hàng'), ('export', 'Xuất hàng'), ('transfer', 'Chuyển kho'), ('adjust', 'Điều chỉnh'), ('sale', 'Bán hàng')], max_length=20)),
+                ('units', models.IntegerField(default=0, help_text='Tổng số đơn vị (giá trị tuyệt đối)')),
+                ('movement_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Tổng hợp chuyển động theo danh mục',
+                'verbose_name_plural': 'Tổng hợp chuyển động theo danh mục',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RevenueDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Tổng hợp doanh thu theo ngày',
+                'verbose_name_plural': 'Tổng hợp doanh thu theo ngày',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Mốc tổng hợp',
+                'verbose_name_plural': 'Mốc tổng hợp',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='shop_order_created_86b012_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='shop_order_updated_acbfa4_idx'),
+        ),
+        migrations.AddField(
+            model_name='categorymovementdailyrollup',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movement_rollups', to='shop.category'),
+        ),
+        migrations.AddField(
+            model_name='revenuedailyrollup',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='shop.warehouse'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='categorymovementdailyrollup',
+            unique_together={('day', 'category', 'movement_type')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='revenuedailyrollup',
+            unique_together={('day', 'warehouse', 'status')},
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 10:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0007_reporting_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('velocity', models.FloatField(default=0, help_text='Số lượng tiêu thụ trung bình mỗi ngày')),
+                ('demand_stddev', models.FloatField(default=0, help_text='Độ lệch chuẩn tiêu thụ theo ngày')),
+                ('days_of_cover', models.FloatField(blank=True, help_text='Số ngày tồn kho còn đủ bán', null=True)),
+                ('reorder_point', models.IntegerField(default=0, help_text='Điểm đặt hàng lại')),
+                ('needs_reorder', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField()),
+                ('warehouse_stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='demand', to='shop.warehousestock')),
+            ],
+            options={
+                'verbose_name': 'Dự báo tiêu thụ',
+                'verbose_name_plural': 'Dự báo tiêu thụ',
+                'indexes': [models.Index(fields=['needs_reorder', 'days_of_cover'], name='shop_demand_needs_r_728802_idx')],
+            },
+        ),
+    ]
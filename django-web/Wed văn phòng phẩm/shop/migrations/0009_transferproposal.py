@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 11:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_demandforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransferProposal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch', models.CharField(db_index=True, help_text='Mã lô kế hoạch', max_length=50)),
+                ('quantity', models.IntegerField()),
+                ('status', models.CharField(choices=[('proposed', 'Đề xuất'), ('applied', 'Đã thực hiện'), ('rejected', 'Từ chối')], default='proposed', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incoming_transfers', to='shop.warehouse')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transfer_proposals', to='shop.product')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_transfers', to='shop.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Đề xuất điều chuyển',
+                'verbose_name_plural': 'Đề xuất điều chuyển',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-19 11:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_transferproposal'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('price', models.DecimalField(decimal_places=0, help_text='Đơn giá lúc đặt hàng', max_digits=10)),
+            ],
+            options={
+                'verbose_name': 'Dòng đơn hàng',
+                'verbose_name_plural': 'Dòng đơn hàng',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'warehouse'], name='shop_order_status_ee008b_idx'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='shop.order'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='shop.product'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, help_text='Kho xuất dòng hàng này', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='shop.warehouse'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_orderitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='warehousestock',
+            name='bin_location',
+            field=models.CharField(blank=True, help_text='Vị trí kệ/ô trong kho (vd. A-03-2), dùng để sắp xếp danh sách lấy hàng', max_length=30),
+        ),
+    ]
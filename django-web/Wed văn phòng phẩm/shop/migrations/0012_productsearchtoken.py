@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 11:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0011_warehousestock_bin_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1, help_text='Điểm theo trường chứa từ khóa và số lần xuất hiện')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='shop.product')),
+            ],
+            options={
+                'verbose_name': 'Từ khóa tìm kiếm',
+                'verbose_name_plural': 'Chỉ mục tìm kiếm',
+                'indexes': [models.Index(fields=['term', 'product', 'weight'], name='shop_search_term_cover')],
+            },
+        ),
+    ]
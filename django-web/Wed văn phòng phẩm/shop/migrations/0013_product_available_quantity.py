@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-19 12:10
+
+from django.db import migrations, models
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_available_quantity(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    WarehouseStock = apps.get_model('shop', 'WarehouseStock')
+    warehouse_total = (
+        WarehouseStock.objects
+        .filter(product=OuterRef('pk'), warehouse__is_active=True)
+        .values('product')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    Product.objects.update(
+        available_quantity=F('stock') + Coalesce(Subquery(warehouse_total, output_field=IntegerField()), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0012_productsearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='available_quantity',
+            field=models.IntegerField(default=0, editable=False, help_text='Tồn kho chung + tồn kho các kho đang hoạt động (tự cập nhật)'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['available_quantity'], name='shop_produc_availab_a27082_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'available_quantity'], name='shop_produc_categor_1fad71_idx'),
+        ),
+        migrations.RunPython(fill_available_quantity, migrations.RunPython.noop),
+    ]
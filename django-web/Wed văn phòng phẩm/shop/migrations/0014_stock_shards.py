@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-19 12:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0013_product_available_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='warehousestock',
+            name='is_sharded',
+            field=models.BooleanField(default=False, help_text='Số lượng đang chia thành nhiều phần (WarehouseStockShard); quantity được đồng bộ định kỳ'),
+        ),
+        migrations.CreateModel(
+            name='StockLockSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wait_ms', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('warehouse_stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shop.warehousestock')),
+            ],
+            options={
+                'verbose_name': 'Mẫu chờ khóa tồn kho',
+                'verbose_name_plural': 'Mẫu chờ khóa tồn kho',
+            },
+        ),
+        migrations.CreateModel(
+            name='WarehouseStockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard_no', models.PositiveSmallIntegerField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('warehouse_stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='shop.warehousestock')),
+            ],
+            options={
+                'verbose_name': 'Phần tồn kho',
+                'verbose_name_plural': 'Phần tồn kho',
+                'unique_together': {('warehouse_stock', 'shard_no')},
+            },
+        ),
+    ]
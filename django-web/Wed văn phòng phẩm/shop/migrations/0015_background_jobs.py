@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-19 14:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0014_stock_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queue', models.CharField(default='default', max_length=50)),
+                ('task', models.CharField(help_text='Tên task đã đăng ký bằng @task', max_length=200)),
+                ('kwargs', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Đang chờ'), ('running', 'Đang chạy'), ('done', 'Hoàn thành'), ('failed', 'Thất bại')], default='queued', max_length=20)),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Không chạy trước thời điểm này')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Công việc nền',
+                'verbose_name_plural': 'Công việc nền',
+                'ordering': ['run_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'queue', 'run_at'], name='shop_job_claim_idx'), models.Index(fields=['status', 'locked_at'], name='shop_job_locked_idx')],
+            },
+        ),
+    ]
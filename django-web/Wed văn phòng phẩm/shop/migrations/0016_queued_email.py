@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-19 15:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0015_background_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('order_confirmation', 'Xác nhận đơn hàng'), ('order_status', 'Cập nhật trạng thái đơn hàng')], max_length=30)),
+                ('to_email', models.EmailField(max_length=254)),
+                ('subject', models.CharField(max_length=255)),
+                ('body_text', models.TextField()),
+                ('body_html', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('queued', 'Đang chờ'), ('sending', 'Đang gửi'), ('sent', 'Đã gửi'), ('failed', 'Thất bại')], default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='emails', to='shop.order')),
+            ],
+            options={
+                'verbose_name': 'Email chờ gửi',
+                'verbose_name_plural': 'Email chờ gửi',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='shop_mail_claim_idx')],
+            },
+        ),
+    ]
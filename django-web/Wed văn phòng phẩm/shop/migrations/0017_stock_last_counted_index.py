@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0016_queued_email'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='warehousestock',
+            name='last_counted',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Lần cuối kiểm kê'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-19 16:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0017_stock_last_counted_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxConsumerOffset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumer', models.CharField(max_length=100, unique=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0, help_text='Số lần lỗi liên tiếp')),
+                ('last_error', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Vị trí consumer outbox',
+                'verbose_name_plural': 'Vị trí consumer outbox',
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(choices=[('product', 'Sản phẩm'), ('warehouse_stock', 'Tồn kho'), ('order', 'Đơn hàng')], max_length=30)),
+                ('event_type', models.CharField(choices=[('created', 'Tạo mới'), ('updated', 'Cập nhật'), ('deleted', 'Xóa')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Sự kiện outbox',
+                'verbose_name_plural': 'Sự kiện outbox',
+            },
+        ),
+    ]
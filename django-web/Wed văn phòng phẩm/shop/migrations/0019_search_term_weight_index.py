@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0018_outbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productsearchtoken',
+            index=models.Index(fields=['term', '-weight', 'product'], name='shop_search_term_weight'),
+        ),
+    ]
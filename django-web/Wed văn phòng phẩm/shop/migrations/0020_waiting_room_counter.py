@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0019_search_term_weight_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitingRoomCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('marked_at', models.FloatField(default=0, help_text='Mốc thời gian (epoch giây) của mốc cho vào / hạn giữ suất')),
+            ],
+            options={
+                'verbose_name': 'Bộ đếm phòng chờ',
+                'verbose_name_plural': 'Bộ đếm phòng chờ',
+            },
+        ),
+    ]
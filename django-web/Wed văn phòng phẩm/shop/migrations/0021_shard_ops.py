@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0020_waiting_room_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='warehousestockshard',
+            name='ops',
+            field=models.PositiveIntegerField(default=0, help_text='Số lần cộng/trừ kể từ lần tune_hot_stock trước'),
+        ),
+    ]
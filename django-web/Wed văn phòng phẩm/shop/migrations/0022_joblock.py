@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0021_shard_ops'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text="'queue:<tên queue>' hoặc 'schedule:<tên task>'", max_length=250, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Khóa hàng đợi',
+                'verbose_name_plural': 'Khóa hàng đợi',
+            },
+        ),
+    ]
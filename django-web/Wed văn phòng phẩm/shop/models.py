@@ -7,12 +7,54 @@ Các Models:
 - Category: Danh mục sản phẩm
 - Product: Kho sản phẩm
 - WarehouseStock: Quản lý tồn kho từng kho
+- WarehouseStockShard: Phần chia nhỏ số lượng của dòng tồn kho "nóng"
+- StockLockSample: Mẫu thời gian chờ khóa khi trừ tồn kho
 - StockMovement: Lịch sử chuyển động hàng
+- StockSnapshot: Ảnh chụp tồn kho định kỳ theo sổ cái
+- StockMovementArchive: Chuyển động hàng cũ đã được lưu trữ
+- StockMovementDailyRollup: Tổng hợp chuyển động hàng theo ngày
+- DemandForecast: Tốc độ tiêu thụ và điểm đặt hàng lại của từng dòng tồn kho
+- TransferProposal: Đề xuất điều chuyển hàng giữa các kho
 - Order: Đơn hàng của khách hàng
+- OrderItem: Dòng sản phẩm trong đơn hàng
+- RevenueDailyRollup, CategoryMovementDailyRollup: Bảng tổng hợp báo cáo
+- RollupWatermark: Mốc cập nhật tăng dần của các bảng tổng hợp
+- ProductSearchToken: Chỉ mục đảo (từ khóa -> sản phẩm) cho tìm kiếm
+- Job: Công việc nền trong hàng đợi lưu ở CSDL
+- QueuedEmail: Email thông báo đơn hàng đã dựng sẵn, chờ gửi theo lô
+- OutboxEvent, OutboxConsumerOffset: Sự kiện thay đổi (outbox) và vị trí đọc của từng consumer
 """
 
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+# ========== OUTBOX MIXIN ==========
+
+class OutboxMixin:
+    """
+    Ghi OutboxEvent trong cùng transaction với lần lưu model (xem
+    shop/outbox.py). Model khai báo `outbox_topic` và `outbox_payload()`.
+    Sự kiện xóa được ghi từ post_delete (shop/signals.py) để gồm cả
+    QuerySet.delete() và xóa dây chuyền. Cập nhật bằng QuerySet.update()/
+    bulk_update() không đi qua đây, nơi gọi tự ghi sự kiện bằng
+    outbox.record_event()/record_events().
+    """
+    outbox_topic = None
+
+    def outbox_payload(self):
+        return {}
+
+    def save(self, *args, **kwargs):
+        event_type = 'created' if self._state.adding else 'updated'
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            OutboxEvent.objects.using(using).create(
+                topic=self.outbox_topic, object_id=self.pk,
+                event_type=event_type, payload=self.outbox_payload(),
+            )
 
 
 # ========== USER MODELS ==========
@@ -79,20 +121,30 @@ class Category(models.Model):
         verbose_name_plural = "Danh mục sản phẩm"
 
 
-class Product(models.Model):
+class Product(OutboxMixin, models.Model):
     name = models.CharField(max_length=200)
     price = models.DecimalField(max_digits=10, decimal_places=0)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
     description = models.TextField()
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     stock = models.IntegerField(default=0, help_text="Tồn kho chung")
+    available_quantity = models.IntegerField(
+        default=0,
+        editable=False,
+        help_text="Tồn kho chung + tồn kho các kho đang hoạt động (tự cập nhật)"
+    )
     sku = models.CharField(max_length=100, unique=True, blank=True, help_text="SKU/Mã sản phẩm")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    outbox_topic = 'product'
+
     def __str__(self):
         return self.name
 
+    def outbox_payload(self):
+        return {'sku': self.sku, 'category': self.category_id, 'price': str(self.price)}
+
     @property
     def total_warehouse_stock(self):
         """Tính tổng tồn kho từ tất cả các kho"""
@@ -100,17 +152,21 @@ class Product(models.Model):
 
     @property
     def is_in_stock(self):
-        """Kiểm tra còn hàng hay không"""
-        return self.stock > 0 or self.total_warehouse_stock > 0
+        """Kiểm tra còn hàng hay không (theo số lượng khả dụng đã lưu sẵn)"""
+        return self.available_quantity > 0
 
     class Meta:
         verbose_name = "Sản phẩm"
         verbose_name_plural = "Sản phẩm"
+        indexes = [
+            models.Index(fields=['available_quantity']),
+            models.Index(fields=['category', 'available_quantity']),
+        ]
 
 
 # ========== STOCK MANAGEMENT MODELS ==========
 
-class WarehouseStock(models.Model):
+class WarehouseStock(OutboxMixin, models.Model):
     """Model quản lý tồn kho từng sản phẩm ở từng kho"""
     warehouse = models.ForeignKey(
         Warehouse, 
@@ -123,8 +179,19 @@ class WarehouseStock(models.Model):
         related_name='warehouse_stocks'
     )
     quantity = models.IntegerField(default=0, help_text="Số lượng trong kho")
-    last_counted = models.DateTimeField(auto_now=True, help_text="Lần cuối kiểm kê")
+    bin_location = models.CharField(
+        max_length=30,
+        blank=True,
+        help_text="Vị trí kệ/ô trong kho (vd. A-03-2), dùng để sắp xếp danh sách lấy hàng"
+    )
+    last_counted = models.DateTimeField(auto_now=True, db_index=True, help_text="Lần cuối kiểm kê")
     notes = models.TextField(blank=True, help_text="Ghi chú")
+    is_sharded = models.BooleanField(
+        default=False,
+        help_text="Số lượng đang chia thành nhiều phần (WarehouseStockShard); quantity được đồng bộ định kỳ"
+    )
+
+    outbox_topic = 'warehouse_stock'
     
     class Meta:
         unique_together = ('warehouse', 'product')
@@ -135,6 +202,44 @@ class WarehouseStock(models.Model):
     def __str__(self):
         return f"{self.product.name} - {self.warehouse.name} ({self.quantity} cái)"
 
+    def outbox_payload(self):
+        return {'warehouse': self.warehouse_id, 'product': self.product_id, 'quantity': self.quantity}
+
+
+class WarehouseStockShard(models.Model):
+    """Một phần số lượng của dòng tồn kho bán chạy, để các lần trừ kho không cùng khóa một dòng"""
+    warehouse_stock = models.ForeignKey(
+        WarehouseStock,
+        on_delete=models.CASCADE,
+        related_name='shards'
+    )
+    shard_no = models.PositiveSmallIntegerField()
+    quantity = models.IntegerField(default=0)
+    ops = models.PositiveIntegerField(default=0, help_text="Số lần cộng/trừ kể từ lần tune_hot_stock trước")
+
+    def __str__(self):
+        return f"{self.warehouse_stock_id}#{self.shard_no} ({self.quantity})"
+
+    class Meta:
+        unique_together = ('warehouse_stock', 'shard_no')
+        verbose_name = "Phần tồn kho"
+        verbose_name_plural = "Phần tồn kho"
+
+
+class StockLockSample(models.Model):
+    """Mẫu thời gian chờ khóa dòng tồn kho (chỉ ghi khi chờ lâu) để phát hiện dòng nóng"""
+    warehouse_stock = models.ForeignKey(
+        WarehouseStock,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    wait_ms = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Mẫu chờ khóa tồn kho"
+        verbose_name_plural = "Mẫu chờ khóa tồn kho"
+
 
 class StockMovement(models.Model):
     """Theo dõi lịch sử chuyển động hàng hóa"""
@@ -169,11 +274,154 @@ class StockMovement(models.Model):
     class Meta:
         verbose_name = "Chuyển động hàng"
         verbose_name_plural = "Chuyển động hàng"
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+
+class StockMovementArchive(models.Model):
+    """Chuyển động hàng đã quá hạn lưu giữ, được chuyển khỏi bảng chính (giữ nguyên ID)"""
+    id = models.BigIntegerField(primary_key=True)
+    warehouse_stock = models.ForeignKey(
+        WarehouseStock,
+        on_delete=models.CASCADE,
+        related_name='archived_movements'
+    )
+    movement_type = models.CharField(max_length=20, choices=StockMovement.MOVEMENT_TYPES)
+    quantity = models.IntegerField()
+    reference = models.CharField(max_length=100, blank=True)
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.get_movement_type_display()} #{self.id} ({self.quantity})"
+
+    class Meta:
+        verbose_name = "Chuyển động hàng (lưu trữ)"
+        verbose_name_plural = "Chuyển động hàng (lưu trữ)"
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+
+class StockMovementDailyRollup(models.Model):
+    """Tổng số lượng chuyển động đã lưu trữ theo ngày, kho, sản phẩm và loại chuyển động"""
+    day = models.DateField()
+    warehouse = models.ForeignKey(
+        Warehouse,
+        on_delete=models.CASCADE,
+        related_name='movement_rollups'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='movement_rollups'
+    )
+    movement_type = models.CharField(max_length=20, choices=StockMovement.MOVEMENT_TYPES)
+    quantity = models.IntegerField(default=0, help_text="Tổng số lượng thay đổi")
+    movement_count = models.IntegerField(default=0, help_text="Số chuyển động")
+
+    def __str__(self):
+        return f"{self.day} - {self.product} - {self.warehouse} ({self.get_movement_type_display()})"
+
+    class Meta:
+        unique_together = ('day', 'warehouse', 'product', 'movement_type')
+        verbose_name = "Tổng hợp chuyển động theo ngày"
+        verbose_name_plural = "Tổng hợp chuyển động theo ngày"
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['day', 'movement_type']),
+        ]
+
+
+class StockSnapshot(models.Model):
+    """Ảnh chụp tồn kho theo sổ cái của một dòng tồn kho tại một thời điểm"""
+    warehouse_stock = models.ForeignKey(
+        WarehouseStock,
+        on_delete=models.CASCADE,
+        related_name='snapshots'
+    )
+    quantity = models.IntegerField(help_text="Tồn kho theo sổ cái tại thời điểm chụp")
+    last_movement_id = models.BigIntegerField(
+        default=0,
+        help_text="ID chuyển động cuối cùng đã được tính vào ảnh chụp"
+    )
+    taken_at = models.DateTimeField(help_text="Thời điểm chụp")
+
+    def __str__(self):
+        return f"{self.warehouse_stock} @ {self.taken_at:%d/%m/%Y %H:%M} ({self.quantity})"
+
+    class Meta:
+        verbose_name = "Ảnh chụp tồn kho"
+        verbose_name_plural = "Ảnh chụp tồn kho"
+        ordering = ['-taken_at']
+        indexes = [
+            models.Index(fields=['warehouse_stock', 'taken_at']),
+            models.Index(fields=['taken_at']),
+        ]
+
+
+class DemandForecast(models.Model):
+    """Tốc độ tiêu thụ và điểm đặt hàng lại, tính định kỳ bởi lệnh compute_demand"""
+    warehouse_stock = models.OneToOneField(
+        WarehouseStock,
+        on_delete=models.CASCADE,
+        related_name='demand'
+    )
+    velocity = models.FloatField(default=0, help_text="Số lượng tiêu thụ trung bình mỗi ngày")
+    demand_stddev = models.FloatField(default=0, help_text="Độ lệch chuẩn tiêu thụ theo ngày")
+    days_of_cover = models.FloatField(null=True, blank=True, help_text="Số ngày tồn kho còn đủ bán")
+    reorder_point = models.IntegerField(default=0, help_text="Điểm đặt hàng lại")
+    needs_reorder = models.BooleanField(default=False)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.warehouse_stock} - {self.velocity:.1f}/ngày"
+
+    class Meta:
+        verbose_name = "Dự báo tiêu thụ"
+        verbose_name_plural = "Dự báo tiêu thụ"
+        indexes = [
+            models.Index(fields=['needs_reorder', 'days_of_cover']),
+        ]
+
+
+class TransferProposal(models.Model):
+    """Đề xuất điều chuyển hàng giữa hai kho, sinh bởi lệnh plan_rebalance"""
+    STATUS_CHOICES = [
+        ('proposed', 'Đề xuất'),
+        ('applied', 'Đã thực hiện'),
+        ('rejected', 'Từ chối'),
+    ]
+
+    batch = models.CharField(max_length=50, db_index=True, help_text="Mã lô kế hoạch")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='transfer_proposals')
+    source = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='outgoing_transfers')
+    destination = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='incoming_transfers')
+    quantity = models.IntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='proposed')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.product} : {self.source} → {self.destination} ({self.quantity})"
+
+    class Meta:
+        verbose_name = "Đề xuất điều chuyển"
+        verbose_name_plural = "Đề xuất điều chuyển"
+        ordering = ['-created_at']
 
 
 # ========== ORDER MODELS ==========
 
-class Order(models.Model):
+class Order(OutboxMixin, models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
     customer_name = models.CharField(max_length=100)
     phone = models.CharField(max_length=15)
@@ -201,10 +449,304 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    outbox_topic = 'order'
+
     def __str__(self):
         return f"Order {self.id} - {self.customer_name}"
 
+    def outbox_payload(self):
+        return {'status': self.status, 'warehouse': self.warehouse_id, 'user': self.user_id}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Nhớ trạng thái lúc đọc để signal biết đơn hàng vừa đổi trạng thái
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
     class Meta:
         verbose_name = "Đơn hàng"
         verbose_name_plural = "Đơn hàng"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['status', 'warehouse']),
+        ]
+
+
+class OrderItem(models.Model):
+    """Dòng sản phẩm trong đơn hàng và kho được phân để xuất dòng đó"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='order_items')
+    quantity = models.PositiveIntegerField(default=1)
+    price = models.DecimalField(max_digits=10, decimal_places=0, help_text="Đơn giá lúc đặt hàng")
+    warehouse = models.ForeignKey(
+        Warehouse,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='order_items',
+        help_text="Kho xuất dòng hàng này"
+    )
+
+    def __str__(self):
+        return f"{self.product} x {self.quantity}"
+
+    @property
+    def subtotal(self):
+        return self.price * self.quantity
+
+    class Meta:
+        verbose_name = "Dòng đơn hàng"
+        verbose_name_plural = "Dòng đơn hàng"
+
+
+# ========== REPORTING MODELS ==========
+
+class RevenueDailyRollup(models.Model):
+    """Doanh thu theo ngày đặt hàng, kho xuất hàng và trạng thái đơn hàng"""
+    day = models.DateField()
+    warehouse = models.ForeignKey(
+        Warehouse,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='revenue_rollups'
+    )
+    status = models.CharField(max_length=20)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+
+    def __str__(self):
+        return f"{self.day} - {self.warehouse or 'Chưa gán kho'} - {self.status}"
+
+    class Meta:
+        unique_together = ('day', 'warehouse', 'status')
+        verbose_name = "Tổng hợp doanh thu theo ngày"
+        verbose_name_plural = "Tổng hợp doanh thu theo ngày"
+        ordering = ['-day']
+
+
+class CategoryMovementDailyRollup(models.Model):
+    """Số đơn vị hàng chuyển động theo ngày, danh mục và loại chuyển động"""
+    day = models.DateField()
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='movement_rollups'
+    )
+    movement_type = models.CharField(max_length=20, choices=StockMovement.MOVEMENT_TYPES)
+    units = models.IntegerField(default=0, help_text="Tổng số đơn vị (giá trị tuyệt đối)")
+    movement_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} - {self.category} ({self.get_movement_type_display()})"
+
+    class Meta:
+        unique_together = ('day', 'category', 'movement_type')
+        verbose_name = "Tổng hợp chuyển động theo danh mục"
+        verbose_name_plural = "Tổng hợp chuyển động theo danh mục"
+        ordering = ['-day']
+
+
+class RollupWatermark(models.Model):
+    """Mốc đã xử lý của một bảng tổng hợp (ID hoặc thời điểm cập nhật cuối)"""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Mốc tổng hợp"
+        verbose_name_plural = "Mốc tổng hợp"
+
+
+# ========== SEARCH MODELS ==========
+
+class ProductSearchToken(models.Model):
+    """Một dòng chỉ mục đảo: từ khóa (đã bỏ dấu) xuất hiện trong sản phẩm với trọng số"""
+    term = models.CharField(max_length=64)
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='search_tokens'
+    )
+    weight = models.PositiveIntegerField(default=1, help_text="Điểm theo trường chứa từ khóa và số lần xuất hiện")
+
+    def __str__(self):
+        return f"{self.term} -> {self.product_id} ({self.weight})"
+
+    class Meta:
+        # Chỉ mục bao phủ: truy vấn tìm kiếm đọc (term, product, weight) hoàn toàn từ chỉ mục.
+        # Mỗi cặp (term, product) chỉ có một dòng vì index_product xóa rồi ghi lại.
+        indexes = [
+            models.Index(fields=['term', 'product', 'weight'], name='shop_search_term_cover'),
+            # Lấy nhanh các sản phẩm có trọng số cao nhất của một từ khóa phổ biến
+            models.Index(fields=['term', '-weight', 'product'], name='shop_search_term_weight'),
+        ]
+        verbose_name = "Từ khóa tìm kiếm"
+        verbose_name_plural = "Chỉ mục tìm kiếm"
+
+
+# ========== BACKGROUND JOB MODELS ==========
+
+class Job(models.Model):
+    """Một công việc nền trong hàng đợi lưu ở CSDL (xem shop/jobs.py)"""
+    STATUS_CHOICES = [
+        ('queued', 'Đang chờ'),
+        ('running', 'Đang chạy'),
+        ('done', 'Hoàn thành'),
+        ('failed', 'Thất bại'),
+    ]
+
+    queue = models.CharField(max_length=50, default='default')
+    task = models.CharField(max_length=200, help_text="Tên task đã đăng ký bằng @task")
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    run_at = models.DateTimeField(default=timezone.now, help_text="Không chạy trước thời điểm này")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.task} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            # Worker nhận việc theo (status='queued', queue, run_at <= now)
+            models.Index(fields=['status', 'queue', 'run_at'], name='shop_job_claim_idx'),
+            models.Index(fields=['status', 'locked_at'], name='shop_job_locked_idx'),
+        ]
+        verbose_name = "Công việc nền"
+        verbose_name_plural = "Công việc nền"
+
+
+class JobLock(models.Model):
+    """
+    Dòng khóa dùng chung giữa các worker của hàng đợi công việc nền: khóa
+    bằng SELECT ... FOR UPDATE để đếm-rồi-nhận việc của một queue hoặc
+    kiểm tra-rồi-tạo task định kỳ không bị hai worker làm cùng lúc.
+    """
+    name = models.CharField(max_length=250, unique=True, help_text="'queue:<tên queue>' hoặc 'schedule:<tên task>'")
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Khóa hàng đợi"
+        verbose_name_plural = "Khóa hàng đợi"
+
+
+# ========== NOTIFICATION MODELS ==========
+
+class QueuedEmail(models.Model):
+    """Email đã dựng nội dung, chờ lệnh send_queued_mail gửi theo lô (xem shop/mailer.py)"""
+    KIND_CHOICES = [
+        ('order_confirmation', 'Xác nhận đơn hàng'),
+        ('order_status', 'Cập nhật trạng thái đơn hàng'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Đang chờ'),
+        ('sending', 'Đang gửi'),
+        ('sent', 'Đã gửi'),
+        ('failed', 'Thất bại'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='emails')
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body_text = models.TextField()
+    body_html = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} -> {self.to_email} ({self.get_status_display()})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='shop_mail_claim_idx'),
+        ]
+        verbose_name = "Email chờ gửi"
+        verbose_name_plural = "Email chờ gửi"
+
+
+# ========== OUTBOX MODELS ==========
+
+class OutboxEvent(models.Model):
+    """
+    Sự kiện thay đổi Product/WarehouseStock/Order, ghi cùng transaction với thay đổi
+    (xem OutboxMixin và shop/outbox.py). Lệnh relay_outbox đọc theo ID tăng dần.
+    """
+    TOPIC_CHOICES = [
+        ('product', 'Sản phẩm'),
+        ('warehouse_stock', 'Tồn kho'),
+        ('order', 'Đơn hàng'),
+    ]
+    EVENT_TYPE_CHOICES = [
+        ('created', 'Tạo mới'),
+        ('updated', 'Cập nhật'),
+        ('deleted', 'Xóa'),
+    ]
+
+    topic = models.CharField(max_length=30, choices=TOPIC_CHOICES)
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES)
+    object_id = models.BigIntegerField()
+    payload = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.topic}:{self.object_id} {self.event_type}"
+
+    class Meta:
+        verbose_name = "Sự kiện outbox"
+        verbose_name_plural = "Sự kiện outbox"
+
+
+class OutboxConsumerOffset(models.Model):
+    """Vị trí đã xử lý xong (high-water mark) của một consumer trong outbox"""
+    consumer = models.CharField(max_length=100, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0, help_text="Số lần lỗi liên tiếp")
+    last_error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.consumer} @ {self.last_event_id}"
+
+    class Meta:
+        verbose_name = "Vị trí consumer outbox"
+        verbose_name_plural = "Vị trí consumer outbox"
+
+
+class WaitingRoomCounter(models.Model):
+    """
+    Trạng thái dùng chung của phòng chờ ảo (shop.waiting_room): số vé đã phát,
+    mốc đã cho vào và các suất thanh toán. Mọi thay đổi là câu UPDATE có điều
+    kiện nên đúng khi nhiều tiến trình cùng ghi.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    marked_at = models.FloatField(default=0, help_text="Mốc thời gian (epoch giây) của mốc cho vào / hạn giữ suất")
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+    class Meta:
+        verbose_name = "Bộ đếm phòng chờ"
+        verbose_name_plural = "Bộ đếm phòng chờ"
@@ -0,0 +1,235 @@
+"""
+Outbox giao dịch và luồng thay đổi (change feed) cho Product/WarehouseStock/Order
+
+Mỗi thay đổi ghi một OutboxEvent trong cùng transaction (OutboxMixin trong
+models.py, hoặc record_event()/record_events() cho các đường cập nhật không
+đi qua save() như adjust_stock, bulk_update), nên rollback thì sự kiện cũng
+mất theo và request không phải chờ các bên xử lý.
+
+Lệnh relay_outbox đọc outbox theo ID tăng dần và gọi các consumer đã đăng ký
+theo lô:
+
+    @consumer('search-index', topics=['product'])
+    def update_search_index(events): ...
+
+Mỗi consumer có một vị trí (OutboxConsumerOffset.last_event_id) chỉ được tăng
+sau khi handler chạy xong, nên mỗi sự kiện được giao ít nhất một lần: handler
+lỗi thì cả lô được giao lại (sau thời gian chờ tăng dần), handler phải chịu
+được sự kiện lặp lại.
+
+ID được cấp lúc INSERT nhưng transaction có thể commit không theo thứ tự: khi
+gặp khoảng trống ID, relay dừng ở đó tới khi sự kiện phía sau đã cũ hơn
+OUTBOX_GAP_TIMEOUT_SECONDS (coi như ID bị bỏ do rollback).
+"""
+
+import logging
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .jobs import backoff_delay
+from .models import OutboxConsumerOffset, OutboxEvent
+
+
+logger = logging.getLogger(__name__)
+
+# Giữ tối đa bấy nhiêu ký tự traceback trong OutboxConsumerOffset.last_error
+MAX_ERROR_LENGTH = 4000
+# Khoảng cách giữa hai lần dọn sự kiện cũ khi relay chạy liên tục
+PURGE_INTERVAL = timedelta(hours=1)
+
+_consumers = {}
+
+
+@dataclass
+class ConsumerSpec:
+    name: str
+    func: object
+    topics: tuple
+
+
+def consumer(name, topics):
+    """Decorator đăng ký handler nhận danh sách OutboxEvent của các `topics`"""
+    def register(func):
+        _consumers[name] = ConsumerSpec(name=name, func=func, topics=tuple(topics))
+        return func
+    return register
+
+
+def get_consumers():
+    return list(_consumers.values())
+
+
+def record_event(topic, object_id, event_type='updated', payload=None):
+    """Ghi một sự kiện; gọi trong transaction của thay đổi"""
+    return OutboxEvent.objects.create(
+        topic=topic, object_id=object_id, event_type=event_type, payload=payload or {},
+    )
+
+
+def record_events(topic, items, event_type='updated'):
+    """Ghi nhiều sự kiện cùng topic; `items` là các cặp (object_id, payload)"""
+    now = timezone.now()
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(topic=topic, object_id=object_id, event_type=event_type,
+                    payload=payload or {}, created_at=now)
+        for object_id, payload in items
+    ], batch_size=1000)
+
+
+# ========== ĐỌC THEO VỊ TRÍ ==========
+
+def read_after(last_event_id, limit, gap_timeout=None):
+    """
+    Đọc tối đa `limit` sự kiện liên tiếp sau `last_event_id`.
+
+    Dừng ở khoảng trống ID đầu tiên nếu sự kiện phía sau còn mới hơn
+    `gap_timeout` (transaction cấp ID nhỏ hơn có thể chưa commit).
+
+    Trả về:
+        tuple: (danh sách OutboxEvent, ID cao nhất có thể ghi nhận làm vị trí mới)
+    """
+    if gap_timeout is None:
+        gap_timeout = timedelta(seconds=settings.OUTBOX_GAP_TIMEOUT_SECONDS)
+    settled = timezone.now() - gap_timeout
+    events = []
+    expected = last_event_id + 1
+    for event in OutboxEvent.objects.filter(id__gt=last_event_id).order_by('id')[:limit]:
+        if event.id != expected and event.created_at > settled:
+            break
+        events.append(event)
+        expected = event.id + 1
+    return events, expected - 1
+
+
+def relay_consumer(spec, batch_size, gap_timeout=None):
+    """
+    Giao một lô cho consumer `spec` và ghi nhận vị trí mới.
+
+    Trả về:
+        int | None: Số sự kiện đã đọc qua (kể cả topic không đăng ký),
+        None nếu consumer đang được relay khác xử lý hoặc đang chờ thử lại
+    """
+    with transaction.atomic():
+        OutboxConsumerOffset.objects.get_or_create(consumer=spec.name)
+        offset = (
+            OutboxConsumerOffset.objects.select_for_update(skip_locked=True)
+            .filter(consumer=spec.name).first()
+        )
+        if offset is None:
+            return None
+        if offset.failures and offset.updated_at + backoff_delay(offset.failures) > timezone.now():
+            return None
+
+        events, high_water = read_after(offset.last_event_id, batch_size, gap_timeout)
+        if not events:
+            return 0
+        matching = [event for event in events if event.topic in spec.topics]
+        if matching:
+            try:
+                # Savepoint: ghi CSDL của handler bị hủy nếu handler lỗi
+                with transaction.atomic():
+                    spec.func(matching)
+            except Exception:
+                logger.exception('Consumer outbox %s lỗi sau sự kiện #%s', spec.name, offset.last_event_id)
+                offset.failures += 1
+                offset.last_error = traceback.format_exc()[-MAX_ERROR_LENGTH:]
+                offset.save(update_fields=['failures', 'last_error', 'updated_at'])
+                return None
+
+        offset.last_event_id = high_water
+        offset.failures = 0
+        offset.last_error = ''
+        offset.save(update_fields=['last_event_id', 'failures', 'last_error', 'updated_at'])
+    return len(events)
+
+
+def purge_events(retention_days=None):
+    """
+    Xóa sự kiện mọi consumer đã xử lý và cũ hơn `retention_days` ngày.
+
+    Trả về:
+        int: Số sự kiện đã xóa
+    """
+    retention_days = retention_days if retention_days is not None else settings.OUTBOX_RETENTION_DAYS
+    names = [spec.name for spec in get_consumers()]
+    offsets = list(OutboxConsumerOffset.objects.filter(consumer__in=names).values_list('last_event_id', flat=True))
+    if not names or len(offsets) < len(names):
+        # Còn consumer chưa có vị trí: nó sẽ đọc từ đầu
+        return 0
+    deleted, _ = OutboxEvent.objects.filter(
+        id__lte=min(offsets), created_at__lt=timezone.now() - timedelta(days=retention_days),
+    ).delete()
+    return deleted
+
+
+def outbox_lag():
+    """
+    Độ trễ của từng consumer đã đăng ký.
+
+    Trả về:
+        list[dict]: consumer, last_event_id, head (ID mới nhất), pending (số sự
+        kiện thuộc topic của consumer chưa xử lý), lag_seconds (tuổi sự kiện
+        chưa xử lý cũ nhất), failures, last_error
+    """
+    head = OutboxEvent.objects.aggregate(head=Max('id'))['head'] or 0
+    offsets = {offset.consumer: offset for offset in OutboxConsumerOffset.objects.all()}
+    now = timezone.now()
+    result = []
+    for spec in get_consumers():
+        offset = offsets.get(spec.name)
+        last_event_id = offset.last_event_id if offset else 0
+        pending = OutboxEvent.objects.filter(id__gt=last_event_id, topic__in=spec.topics)
+        oldest = pending.order_by('id').values_list('created_at', flat=True).first()
+        result.append({
+            'consumer': spec.name,
+            'topics': list(spec.topics),
+            'last_event_id': last_event_id,
+            'head': head,
+            'pending': pending.count(),
+            'lag_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0,
+            'failures': offset.failures if offset else 0,
+            'last_error': (offset.last_error.strip().splitlines() or [''])[-1] if offset else '',
+            'updated_at': offset.updated_at.isoformat() if offset else None,
+        })
+    return result
+
+
+class OutboxRelay:
+    """Vòng lặp giao sự kiện cho mọi consumer (lệnh relay_outbox)"""
+
+    def __init__(self, batch_size=None, poll_interval=None):
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.poll_interval = poll_interval or settings.OUTBOX_POLL_SECONDS
+        self.delivered = 0
+        self.purged = 0
+        self._last_purge = None
+
+    def relay_once(self):
+        """Một lượt qua mọi consumer; trả về True nếu còn sự kiện đọc được ngay"""
+        busy = False
+        for spec in get_consumers():
+            read = relay_consumer(spec, self.batch_size)
+            if read:
+                self.delivered += read
+                busy = busy or read >= self.batch_size
+        return busy
+
+    def run(self, stop_event, burst=False):
+        """Giao tới khi stop_event được đặt (hoặc đã đuổi kịp nếu burst)"""
+        while not stop_event.is_set():
+            close_old_connections()
+            if self.relay_once():
+                continue
+            now = timezone.now()
+            if self._last_purge is None or now - self._last_purge >= PURGE_INTERVAL:
+                self.purged += purge_events()
+                self._last_purge = now
+            if burst:
+                break
+            stop_event.wait(self.poll_interval)
@@ -0,0 +1,148 @@
+"""
+Giới hạn thời gian chạy câu truy vấn theo từng view
+
+statement_timeout(ms) đặt giới hạn cho kết nối trong phạm vi một request rồi
+trả lại như cũ, để một báo cáo chạy quá lâu bị cơ sở dữ liệu hủy thay vì giữ
+kết nối hàng chục giây:
+
+    - MySQL: SET SESSION MAX_EXECUTION_TIME (chỉ áp dụng cho SELECT)
+    - MariaDB: SET SESSION max_statement_time (giây)
+    - PostgreSQL: SET statement_timeout
+    - SQLite (môi trường dev): progress handler ngắt câu lệnh quá hạn
+
+Câu truy vấn bị hủy được ghi log kèm SQL và chuyển thành QueryTooSlow;
+StatementTimeoutMiddleware áp giới hạn theo STATEMENT_TIMEOUTS (tên URL -> ms)
+và hiển thị trang "truy vấn quá chậm".
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, OperationalError, connections
+
+
+logger = logging.getLogger(__name__)
+
+# Mã lỗi MySQL/MariaDB khi câu lệnh bị ngắt do quá thời gian
+MYSQL_TIMEOUT_ERRORS = {
+    1028,  # ER_FILSORT_ABORT (sắp xếp bị ngắt giữa chừng)
+    1317,  # ER_QUERY_INTERRUPTED
+    1969,  # ER_STATEMENT_TIMEOUT (MariaDB)
+    3024,  # ER_QUERY_TIMEOUT
+}
+# SQLSTATE query_canceled của PostgreSQL
+POSTGRES_QUERY_CANCELED = '57014'
+# Số lệnh máy ảo SQLite giữa hai lần kiểm tra thời hạn
+SQLITE_PROGRESS_STEPS = 10000
+
+
+class QueryTooSlow(OperationalError):
+    """Câu truy vấn bị hủy vì vượt giới hạn thời gian"""
+
+    def __init__(self, sql, timeout_ms, elapsed_ms):
+        super().__init__(f'Truy vấn vượt giới hạn {timeout_ms} ms')
+        self.sql = sql
+        self.timeout_ms = timeout_ms
+        self.elapsed_ms = elapsed_ms
+
+
+def _is_timeout(connection, exc):
+    if connection.vendor == 'mysql':
+        return bool(exc.args) and exc.args[0] in MYSQL_TIMEOUT_ERRORS
+    if connection.vendor == 'postgresql':
+        cause = exc.__cause__
+        return getattr(cause, 'pgcode', None) == POSTGRES_QUERY_CANCELED or \
+            getattr(cause, 'sqlstate', None) == POSTGRES_QUERY_CANCELED
+    if connection.vendor == 'sqlite':
+        return 'interrupted' in str(exc)
+    return False
+
+
+class _TimeoutGuard:
+    """execute_wrapper: nhớ câu lệnh đang chạy, ghi log và đổi lỗi khi bị hủy"""
+
+    def __init__(self, connection, timeout_ms):
+        self.connection = connection
+        self.timeout_ms = timeout_ms
+        self.deadline = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.monotonic()
+        self.deadline = started + self.timeout_ms / 1000.0
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as exc:
+            if not _is_timeout(self.connection, exc):
+                raise
+            elapsed_ms = (time.monotonic() - started) * 1000
+            logger.error(
+                'Truy vấn bị hủy sau %.0f ms (giới hạn %s ms): %s; params=%r',
+                elapsed_ms, self.timeout_ms, sql, params,
+            )
+            raise QueryTooSlow(sql, self.timeout_ms, elapsed_ms) from exc
+        finally:
+            self.deadline = None
+
+    def sqlite_progress(self):
+        """Trả về khác 0 để SQLite ngắt câu lệnh đã quá hạn"""
+        return int(self.deadline is not None and time.monotonic() > self.deadline)
+
+
+def _apply(connection, guard):
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        connection.connection.set_progress_handler(guard.sqlite_progress, SQLITE_PROGRESS_STEPS)
+        return
+    with connection.cursor() as cursor:
+        if vendor == 'mysql':
+            if connection.mysql_is_mariadb:
+                cursor.execute('SET SESSION max_statement_time = %s', [guard.timeout_ms / 1000.0])
+            else:
+                cursor.execute('SET SESSION MAX_EXECUTION_TIME = %s', [int(guard.timeout_ms)])
+        elif vendor == 'postgresql':
+            cursor.execute('SET statement_timeout = %s', [int(guard.timeout_ms)])
+
+
+def _reset(connection):
+    if connection.connection is None:
+        return
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        connection.connection.set_progress_handler(None, 0)
+        return
+    with connection.cursor() as cursor:
+        if vendor == 'mysql':
+            if connection.mysql_is_mariadb:
+                cursor.execute('SET SESSION max_statement_time = DEFAULT')
+            else:
+                cursor.execute('SET SESSION MAX_EXECUTION_TIME = DEFAULT')
+        elif vendor == 'postgresql':
+            cursor.execute('RESET statement_timeout')
+
+
+def lift_statement_timeout(using=DEFAULT_DB_ALIAS):
+    """Bỏ giới hạn sớm (vd. trước khi render trang báo lỗi trong cùng request)"""
+    _reset(connections[using])
+
+
+@contextmanager
+def statement_timeout(timeout_ms, using=DEFAULT_DB_ALIAS):
+    """
+    Giới hạn mỗi câu truy vấn trên kết nối `using` trong phạm vi khối with.
+
+    Dùng được như decorator cho view: @statement_timeout(5000)
+    """
+    connection = connections[using]
+    connection.ensure_connection()
+    guard = _TimeoutGuard(connection, timeout_ms)
+    _apply(connection, guard)
+    try:
+        with connection.execute_wrapper(guard):
+            yield
+    finally:
+        try:
+            _reset(connection)
+        except DatabaseError:
+            # Kết nối hỏng thì đóng để request sau mở kết nối mới, không mang giới hạn cũ
+            connection.close()
@@ -0,0 +1,194 @@
+"""
+Lập kế hoạch điều chuyển hàng giữa các kho
+
+Với mỗi SKU, kho có số ngày tồn kho dưới `min_days` cần được bổ sung tới
+`target_days`, còn kho có trên `max_days` có thể nhường phần vượt
+`target_days`. Bài toán vận tải được giải cho mọi SKU cùng lúc bằng NumPy:
+
+1. Ma trận (SKU x kho) của lượng thừa và lượng thiếu; lượng nhận vào mỗi kho
+   bị giới hạn bởi sức chứa còn trống của kho đó.
+2. Trong từng SKU, kho thừa nhiều nhất ghép với kho thiếu nhiều nhất: xếp
+   hàng theo số ngày tồn kho rồi ghép các đoạn tích lũy (cumsum) của cung và
+   cầu bằng searchsorted, giống phương pháp góc tây bắc nhưng vector hóa.
+
+Khi chi phí chuyển giữa mọi cặp kho như nhau, tổng lượng chuyển là tối thiểu
+cho cùng lượng thiếu được lấp, nên cách ghép này cho lời giải chi phí nhỏ nhất.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+from django.db import transaction
+
+from .availability import refresh_availability
+from .models import StockMovement, TransferProposal, Warehouse, WarehouseStock
+from .stock_counters import adjust_stock, stock_quantity
+
+
+@dataclass
+class RebalanceInput:
+    """Dữ liệu đầu vào dạng ma trận cho planner"""
+    product_ids: np.ndarray      # (S,)
+    warehouse_ids: np.ndarray    # (W,)
+    quantity: np.ndarray         # (S, W) tồn kho hiện tại
+    velocity: np.ndarray         # (S, W) tiêu thụ mỗi ngày
+    free_capacity: np.ndarray    # (W,) sức chứa còn trống (inf = không giới hạn)
+
+
+def plan_transfers(quantity, velocity, free_capacity, min_days=7, target_days=21,
+                   max_days=60, min_transfer=1):
+    """
+    Tính kế hoạch điều chuyển cho mọi SKU (thuần NumPy, không truy cập DB).
+
+    Tham số:
+        quantity, velocity: Ma trận (S, W)
+        free_capacity: Mảng (W,) sức chứa còn trống của từng kho
+        min_days: Kho có ít ngày tồn kho hơn mức này cần được bổ sung
+        target_days: Mức ngày tồn kho mong muốn sau khi điều chuyển
+        max_days: Kho có nhiều ngày tồn kho hơn mức này có thể nhường hàng
+        min_transfer: Bỏ qua các lần chuyển nhỏ hơn số lượng này
+
+    Trả về:
+        tuple: (sku_idx, source_idx, destination_idx, quantity) dạng mảng
+    """
+    quantity = np.asarray(quantity, dtype=np.int64)
+    velocity = np.asarray(velocity, dtype=np.float64)
+    n_skus, n_warehouses = quantity.shape
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cover = np.where(velocity > 0, quantity / velocity, np.inf)
+    target = np.ceil(velocity * target_days).astype(np.int64)
+
+    surplus = np.where(cover > max_days, np.maximum(quantity - target, 0), 0)
+    deficit = np.where(cover < min_days, np.maximum(target - quantity, 0), 0)
+
+    # Giới hạn tổng lượng nhận của mỗi kho theo sức chứa còn trống (kho đã quá
+    # sức chứa không nhận thêm; giá trị âm sẽ làm lượng thiếu âm và hỏng cumsum)
+    free_capacity = np.maximum(np.asarray(free_capacity, dtype=np.float64), 0)
+    incoming = deficit.sum(axis=0).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(incoming > 0, np.minimum(1.0, free_capacity / incoming), 1.0)
+    deficit = np.floor(deficit * scale).astype(np.int64)
+
+    # Kho thừa nhiều ngày nhất đứng đầu hàng cung, kho thiếu nhiều nhất đứng đầu hàng cầu
+    supply_order = np.argsort(-np.where(surplus > 0, cover, -np.inf), axis=1, kind='stable')
+    demand_order = np.argsort(np.where(deficit > 0, cover, np.inf), axis=1, kind='stable')
+    supply = np.take_along_axis(surplus, supply_order, axis=1)
+    demand = np.take_along_axis(deficit, demand_order, axis=1)
+
+    # Mỗi SKU chỉ chuyển được min(tổng cung, tổng cầu): cắt cumsum trong từng hàng
+    movable = np.minimum(supply.sum(axis=1), demand.sum(axis=1))[:, None]
+    supply_cum = np.minimum(np.cumsum(supply, axis=1), movable)
+    demand_cum = np.minimum(np.cumsum(demand, axis=1), movable)
+
+    # Nối các hàng thành một trục chung, mỗi SKU dịch theo tổng của các SKU trước
+    offsets = np.concatenate(([0], np.cumsum(movable[:, 0])[:-1]))[:, None]
+    supply_edges = (supply_cum + offsets).ravel()
+    demand_edges = (demand_cum + offsets).ravel()
+
+    breakpoints = np.unique(np.concatenate(([0], supply_edges, demand_edges)))
+    lengths = np.diff(breakpoints)
+    starts = breakpoints[:-1]
+    keep = lengths > 0
+    starts, lengths = starts[keep], lengths[keep]
+
+    supply_cell = np.searchsorted(supply_edges, starts, side='right')
+    demand_cell = np.searchsorted(demand_edges, starts, side='right')
+
+    sku = supply_cell // n_warehouses
+    source = supply_order[sku, supply_cell % n_warehouses]
+    destination = demand_order[sku, demand_cell % n_warehouses]
+
+    keep = lengths >= min_transfer
+    return sku[keep], source[keep], destination[keep], lengths[keep]
+
+
+def load_rebalance_input():
+    """
+    Đọc tồn kho, sức chứa và tốc độ tiêu thụ của các kho đang hoạt động thành ma trận.
+
+    Kho có sức chứa 0 được coi là không giới hạn sức chứa.
+    """
+    warehouses = list(Warehouse.objects.filter(is_active=True).order_by('id').values_list('id', 'capacity'))
+    warehouse_ids = np.array([w[0] for w in warehouses], dtype=np.int64)
+    capacity = np.array([w[1] for w in warehouses], dtype=np.float64)
+
+    # Số lượng chính xác (dòng chia phần cộng các phần), không dùng WarehouseStock.quantity
+    rows = list(
+        WarehouseStock.objects
+        .filter(warehouse__is_active=True)
+        .annotate(current=stock_quantity())
+        .order_by()
+        .values_list('product_id', 'warehouse_id', 'current', 'demand__velocity')
+        .iterator(chunk_size=20000)
+    )
+    if not rows:
+        free_capacity = np.where(capacity > 0, capacity, np.inf)
+        empty = np.zeros((0, len(warehouse_ids)))
+        return RebalanceInput(np.empty(0, np.int64), warehouse_ids, empty.astype(np.int64), empty, free_capacity)
+
+    product_col, warehouse_col, quantity_col, velocity_col = zip(*rows)
+    product_ids, sku_index = np.unique(np.array(product_col, dtype=np.int64), return_inverse=True)
+    warehouse_index = np.searchsorted(warehouse_ids, np.array(warehouse_col, dtype=np.int64))
+
+    quantity = np.zeros((len(product_ids), len(warehouse_ids)), dtype=np.int64)
+    velocity = np.zeros((len(product_ids), len(warehouse_ids)), dtype=np.float64)
+    quantity[sku_index, warehouse_index] = quantity_col
+    velocity[sku_index, warehouse_index] = [v or 0.0 for v in velocity_col]
+    # Sức chứa đã dùng = tổng tồn kho của kho
+    free_capacity = np.where(capacity > 0, np.maximum(capacity - quantity.sum(axis=0), 0), np.inf)
+    return RebalanceInput(product_ids, warehouse_ids, quantity, velocity, free_capacity)
+
+
+def save_proposals(data, plan, batch):
+    """
+    Ghi kế hoạch thành các đề xuất điều chuyển (trạng thái 'proposed').
+
+    Trả về:
+        int: Số đề xuất đã ghi
+    """
+    sku, source, destination, quantity = plan
+    proposals = [
+        TransferProposal(
+            batch=batch,
+            product_id=int(data.product_ids[s]),
+            source_id=int(data.warehouse_ids[src]),
+            destination_id=int(data.warehouse_ids[dst]),
+            quantity=int(q),
+        )
+        for s, src, dst, q in zip(sku, source, destination, quantity)
+    ]
+    TransferProposal.objects.bulk_create(proposals, batch_size=5000)
+    return len(proposals)
+
+
+def apply_proposal(proposal, user=None):
+    """
+    Thực hiện một đề xuất: trừ kho nguồn, cộng kho đích và ghi hai chuyển động 'transfer'.
+
+    Trả về:
+        bool: False nếu kho nguồn không còn đủ hàng
+    """
+    with transaction.atomic():
+        source = WarehouseStock.objects.get(
+            warehouse_id=proposal.source_id, product_id=proposal.product_id
+        )
+        if not adjust_stock(source, -proposal.quantity):
+            return False
+        destination, _ = WarehouseStock.objects.get_or_create(
+            warehouse_id=proposal.destination_id, product_id=proposal.product_id
+        )
+        adjust_stock(destination, proposal.quantity)
+        # update() không phát signal: tính lại số lượng khả dụng (kho nguồn/đích có thể khác trạng thái)
+        refresh_availability([proposal.product_id])
+
+        reference = f'REBAL-{proposal.pk}'
+        StockMovement.objects.bulk_create([
+            StockMovement(warehouse_stock=source, movement_type='transfer',
+                          quantity=-proposal.quantity, reference=reference, created_by=user),
+            StockMovement(warehouse_stock=destination, movement_type='transfer',
+                          quantity=proposal.quantity, reference=reference, created_by=user),
+        ])
+        proposal.status = 'applied'
+        proposal.save(update_fields=['status'])
+    return True
@@ -0,0 +1,149 @@
+"""
+Đối soát sổ cái chuyển động hàng với tồn kho đang lưu
+
+`WarehouseStock.quantity` và sổ cái `StockMovement` được cập nhật độc lập,
+nên hai nguồn có thể lệch nhau. Module này tính tồn kho kỳ vọng cho từng
+cặp (kho, sản phẩm) bằng tổng hợp nhóm trên sổ cái rồi so với số lượng đang
+lưu. `StockMovement.quantity` là lượng thay đổi có dấu (âm khi xuất/bán).
+
+Mỗi kho được xử lý độc lập nên có thể chạy song song trên nhiều tiến trình.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import django
+from django.db import connections, transaction
+from django.db.models import Sum
+
+# Models được import bên trong hàm: với start method 'spawn' (Windows, macOS)
+# tiến trình con import module này trước khi django.setup() chạy.
+
+
+@dataclass
+class StockDrift:
+    """Một dòng lệch giữa sổ cái và tồn kho đang lưu"""
+    warehouse_stock_id: int
+    warehouse_id: int
+    product_id: int
+    stored: int
+    expected: int
+
+    @property
+    def difference(self):
+        """Số lượng đang lưu trừ số lượng theo sổ cái"""
+        return self.stored - self.expected
+
+
+def _init_worker():
+    """Khởi tạo tiến trình con: nạp Django và bỏ kết nối DB kế thừa từ tiến trình cha"""
+    django.setup()
+    connections.close_all()
+
+
+def ledger_balances(warehouse_id):
+    """
+    Tính tồn kho theo sổ cái của một kho (gồm cả chuyển động đã lưu trữ).
+
+    Việc cộng dồn được đẩy xuống cơ sở dữ liệu (GROUP BY warehouse_stock_id)
+    và kết quả được đọc dạng luồng, nên bộ nhớ chỉ tỉ lệ với số dòng tồn kho
+    chứ không phải số chuyển động.
+
+    Trả về:
+        dict: {warehouse_stock_id: tổng số lượng thay đổi}
+    """
+    from .models import StockMovement, StockMovementArchive
+
+    balances = {}
+    for model in (StockMovementArchive, StockMovement):
+        rows = (
+            model.objects
+            .filter(warehouse_stock__warehouse_id=warehouse_id)
+            .values('warehouse_stock_id')
+            .annotate(total=Sum('quantity'))
+            .order_by()
+            .values_list('warehouse_stock_id', 'total')
+        )
+        for ws_id, total in rows.iterator(chunk_size=5000):
+            balances[ws_id] = balances.get(ws_id, 0) + (total or 0)
+    return balances
+
+
+def find_warehouse_drift(warehouse_id):
+    """
+    So sánh tồn kho đang lưu với sổ cái cho một kho.
+
+    Trả về:
+        list[StockDrift]: Các dòng tồn kho bị lệch
+    """
+    from .models import WarehouseStock
+    from .stock_counters import stock_quantity
+
+    expected = ledger_balances(warehouse_id)
+    # Dòng đang chia phần: WarehouseStock.quantity chỉ là giá trị đồng bộ định kỳ
+    stocks = (
+        WarehouseStock.objects
+        .filter(warehouse_id=warehouse_id)
+        .annotate(current=stock_quantity())
+        .order_by('id')
+        .values_list('id', 'product_id', 'current')
+    )
+
+    drifts = []
+    for ws_id, product_id, quantity in stocks.iterator(chunk_size=5000):
+        ledger_quantity = expected.get(ws_id, 0)
+        if quantity != ledger_quantity:
+            drifts.append(StockDrift(ws_id, warehouse_id, product_id, quantity, ledger_quantity))
+    return drifts
+
+
+def reconcile(warehouse_ids, workers=None):
+    """
+    Đối soát nhiều kho, mỗi kho chạy trên một tiến trình riêng.
+
+    Tham số:
+        warehouse_ids: Danh sách ID kho cần đối soát
+        workers: Số tiến trình tối đa (None = số CPU; 1 = chạy tuần tự)
+
+    Trả về:
+        list[StockDrift]: Các dòng lệch của tất cả các kho
+    """
+    warehouse_ids = list(warehouse_ids)
+    if workers == 1 or len(warehouse_ids) <= 1:
+        results = [find_warehouse_drift(wid) for wid in warehouse_ids]
+    else:
+        # Đóng kết nối trước khi fork để tiến trình con không dùng chung socket
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            results = list(pool.map(find_warehouse_drift, warehouse_ids))
+
+    return [drift for drifts in results for drift in drifts]
+
+
+def write_adjustments(drifts, user=None, reference='reconcile'):
+    """
+    Ghi chuyển động 'adjust' để sổ cái khớp với tồn kho đang lưu.
+
+    Tồn kho đang lưu được coi là số liệu thực tế (đã kiểm kê), nên mỗi bút
+    toán điều chỉnh bằng đúng phần chênh lệch.
+
+    Trả về:
+        int: Số chuyển động đã tạo
+    """
+    from .models import StockMovement
+
+    movements = [
+        StockMovement(
+            warehouse_stock_id=drift.warehouse_stock_id,
+            movement_type='adjust',
+            quantity=drift.difference,
+            reference=reference,
+            notes=f'Đối soát: sổ cái {drift.expected}, tồn kho {drift.stored}',
+            created_by=user,
+        )
+        for drift in drifts
+        if drift.difference
+    ]
+    with transaction.atomic():
+        StockMovement.objects.bulk_create(movements, batch_size=1000)
+    return len(movements)
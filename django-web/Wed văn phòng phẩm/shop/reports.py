@@ -0,0 +1,232 @@
+"""
+Bảng tổng hợp báo cáo doanh thu và chuyển động hàng
+
+Các bảng tổng hợp được cập nhật tăng dần từ mốc đã xử lý (RollupWatermark)
+thay vì tính lại toàn bộ:
+
+- Doanh thu: đơn hàng có thể đổi trạng thái/kho sau khi tạo, nên mốc là
+  `Order.updated_at`; các ngày có đơn hàng thay đổi được tính lại hoàn toàn
+  (idempotent), các ngày khác giữ nguyên. Đơn hàng bị xóa thì ngày của nó
+  được tính lại ngay (signal post_delete).
+- Chuyển động hàng: sổ cái chỉ thêm mới, nên mốc là ID chuyển động cuối
+  cùng đã cộng (đọc cả bảng lưu trữ vì ID được giữ nguyên khi lưu trữ).
+
+Trang báo cáo chỉ đọc từ các bảng tổng hợp.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .archival import day_bounds
+from .models import (
+    CategoryMovementDailyRollup, Order, RevenueDailyRollup, RollupWatermark,
+    StockMovement, StockMovementArchive,
+)
+
+
+REVENUE_WATERMARK = 'revenue_daily'
+MOVEMENT_WATERMARK = 'category_movement_daily'
+
+# Bỏ qua các dòng quá mới để không lỡ transaction chưa commit có ID/thời điểm nhỏ hơn
+SETTLE_DELAY = timedelta(minutes=1)
+
+
+def _watermark(name):
+    return RollupWatermark.objects.select_for_update().get_or_create(name=name)[0]
+
+
+def refresh_revenue_rollups(now=None):
+    """
+    Cập nhật tổng hợp doanh thu cho các ngày có đơn hàng thay đổi từ lần trước.
+
+    Trả về:
+        int: Số ngày đã tính lại
+    """
+    now = now or timezone.now()
+    upper = now - SETTLE_DELAY
+
+    with transaction.atomic():
+        mark = _watermark(REVENUE_WATERMARK)
+        changed = Order.objects.filter(updated_at__lt=upper)
+        if mark.last_seen_at is not None:
+            changed = changed.filter(updated_at__gte=mark.last_seen_at)
+
+        days = {timezone.localdate(created) for created in changed.values_list('created_at', flat=True).iterator()}
+        for day in sorted(days):
+            _rebuild_revenue_day(day)
+
+        mark.last_seen_at = upper
+        mark.save()
+    return len(days)
+
+
+def rebuild_revenue_day(day):
+    """
+    Tính lại tổng hợp doanh thu của một ngày ngay lập tức.
+
+    Dùng khi đơn hàng bị xóa: đơn đã xóa không còn updated_at để mốc bắt được.
+    """
+    with transaction.atomic():
+        _watermark(REVENUE_WATERMARK)
+        _rebuild_revenue_day(day)
+
+
+def _rebuild_revenue_day(day):
+    start, end = day_bounds(day, day)
+    rows = (
+        Order.objects
+        .filter(created_at__gte=start, created_at__lt=end)
+        .values('warehouse_id', 'status')
+        .annotate(order_count=Count('id'), revenue=Sum('total_price'))
+        .order_by()
+    )
+    RevenueDailyRollup.objects.filter(day=day).delete()
+    RevenueDailyRollup.objects.bulk_create([
+        RevenueDailyRollup(
+            day=day,
+            warehouse_id=row['warehouse_id'],
+            status=row['status'],
+            order_count=row['order_count'],
+            revenue=row['revenue'] or 0,
+        )
+        for row in rows
+    ])
+
+
+def refresh_movement_rollups(now=None, chunk_size=5000):
+    """
+    Cộng các chuyển động mới (ID lớn hơn mốc) vào tổng hợp theo danh mục.
+
+    Trả về:
+        int: Số chuyển động đã cộng
+    """
+    now = now or timezone.now()
+    upper = now - SETTLE_DELAY
+
+    with transaction.atomic():
+        mark = _watermark(MOVEMENT_WATERMARK)
+        totals = defaultdict(lambda: [0, 0])
+        high_water = mark.last_id
+        processed = 0
+
+        for model in (StockMovementArchive, StockMovement):
+            rows = (
+                model.objects
+                .filter(id__gt=mark.last_id, created_at__lt=upper)
+                .order_by('id')
+                .values_list('id', 'created_at', 'movement_type', 'quantity',
+                             'warehouse_stock__product__category_id')
+            )
+            for movement_id, created_at, movement_type, quantity, category_id in rows.iterator(chunk_size=chunk_size):
+                key = (timezone.localdate(created_at), category_id, movement_type)
+                totals[key][0] += abs(quantity)
+                totals[key][1] += 1
+                high_water = max(high_water, movement_id)
+                processed += 1
+
+        if totals:
+            existing = {
+                (r.day, r.category_id, r.movement_type): r
+                for r in CategoryMovementDailyRollup.objects.select_for_update().filter(
+                    day__in={key[0] for key in totals}
+                )
+            }
+            to_update, to_create = [], []
+            for key, (units, count) in totals.items():
+                rollup = existing.get(key)
+                if rollup is not None:
+                    rollup.units += units
+                    rollup.movement_count += count
+                    to_update.append(rollup)
+                else:
+                    day, category_id, movement_type = key
+                    to_create.append(CategoryMovementDailyRollup(
+                        day=day, category_id=category_id, movement_type=movement_type,
+                        units=units, movement_count=count,
+                    ))
+            CategoryMovementDailyRollup.objects.bulk_update(to_update, ['units', 'movement_count'])
+            CategoryMovementDailyRollup.objects.bulk_create(to_create)
+
+        mark.last_id = high_water
+        mark.save()
+    return processed
+
+
+def revenue_report(start, end):
+    """
+    Báo cáo doanh thu trong khoảng ngày [start, end], chỉ đọc bảng tổng hợp.
+
+    Trả về:
+        dict: {'by_day': [...], 'by_status': [...], 'by_warehouse': [...],
+               'total_revenue': Decimal, 'total_orders': int}
+    """
+    rollups = RevenueDailyRollup.objects.filter(day__gte=start, day__lte=end)
+    # Doanh thu chỉ tính đơn chưa bị hủy
+    billable = rollups.exclude(status='cancelled')
+
+    by_day = list(
+        billable.values('day')
+        .annotate(revenue=Sum('revenue'), order_count=Sum('order_count'))
+        .order_by('day')
+    )
+    by_status = list(
+        rollups.values('status')
+        .annotate(revenue=Sum('revenue'), order_count=Sum('order_count'))
+        .order_by('status')
+    )
+    by_warehouse = list(
+        billable.values('warehouse__name')
+        .annotate(revenue=Sum('revenue'), order_count=Sum('order_count'))
+        .order_by('-revenue')
+    )
+    totals = billable.aggregate(revenue=Sum('revenue'), order_count=Sum('order_count'))
+
+    status_labels = dict(Order._meta.get_field('status').choices)
+    for row in by_status:
+        row['label'] = status_labels.get(row['status'], row['status'])
+
+    return {
+        'by_day': by_day,
+        'by_status': by_status,
+        'by_warehouse': by_warehouse,
+        'total_revenue': totals['revenue'] or Decimal('0'),
+        'total_orders': totals['order_count'] or 0,
+    }
+
+
+def category_movement_report(start, end):
+    """
+    Số đơn vị chuyển động theo danh mục và loại trong khoảng ngày [start, end].
+
+    Trả về:
+        list[dict]: [{'category': tên, 'units': [số đơn vị theo thứ tự
+                      StockMovement.MOVEMENT_TYPES], 'total': tổng}, ...]
+    """
+    rows = (
+        CategoryMovementDailyRollup.objects
+        .filter(day__gte=start, day__lte=end)
+        .values('category__name', 'movement_type')
+        .annotate(units=Sum('units'))
+        .order_by('category__name')
+    )
+    columns = [value for value, _ in StockMovement.MOVEMENT_TYPES]
+    report = {}
+    for row in rows:
+        entry = report.setdefault(row['category__name'], {
+            'category': row['category__name'], 'units': [0] * len(columns), 'total': 0,
+        })
+        entry['units'][columns.index(row['movement_type'])] = row['units']
+        entry['total'] += row['units']
+    return list(report.values())
+
+
+def last_refreshed():
+    """Thời điểm cập nhật gần nhất của các bảng tổng hợp báo cáo"""
+    return RollupWatermark.objects.filter(
+        name__in=[REVENUE_WATERMARK, MOVEMENT_WATERMARK]
+    ).aggregate(last=Max('updated_at'))['last']
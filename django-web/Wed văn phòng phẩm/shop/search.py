@@ -0,0 +1,190 @@
+"""
+Tìm kiếm sản phẩm bằng chỉ mục đảo
+
+Tên, mô tả, SKU và danh mục của sản phẩm được tách thành từ khóa đã chuẩn hóa
+(chữ thường, bỏ dấu tiếng Việt, đ -> d) và lưu vào ProductSearchToken cùng
+trọng số theo trường. Truy vấn tra từng từ khóa qua chỉ mục (term, product)
+thay vì quét LIKE '%...%', cộng trọng số để xếp hạng; sản phẩm phải chứa đủ
+mọi từ khóa của truy vấn. Trang tìm kiếm chỉ xếp hạng tối đa MAX_RESULTS ứng
+viên nên từ khóa phổ biến không làm chậm truy vấn.
+
+Chỉ mục của sản phẩm được cập nhật bởi consumer outbox 'search-index'
+(shop/consumers.py), tức là chỉ khi lệnh relay_outbox đang chạy; sửa danh mục
+thì cập nhật ngay qua signal. Lệnh rebuild_search_index dựng lại toàn bộ, ví
+dụ khi relay_outbox đã dừng lâu; sau đó vẫn cần chạy relay_outbox để các thay
+đổi sản phẩm tiếp theo được đưa vào chỉ mục.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+
+from .models import Product, ProductSearchToken
+
+
+# Trọng số theo trường: khớp SKU/tên quan trọng hơn khớp mô tả
+FIELD_WEIGHTS = (
+    ('sku', 8),
+    ('name', 5),
+    ('category', 3),
+    ('description', 1),
+)
+MAX_TERM_LENGTH = 64
+# Số kết quả tối đa của trang tìm kiếm (giới hạn tập ứng viên trước khi xếp hạng)
+MAX_RESULTS = 1000
+_TERM = re.compile(r'[a-z0-9]+')
+
+
+def fold(text):
+    """Chuẩn hóa chuỗi để so khớp: chữ thường, bỏ dấu (\"Bút bi\" -> \"but bi\")"""
+    text = unicodedata.normalize('NFD', text.lower()).replace('đ', 'd')
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    """Tách chuỗi thành danh sách từ khóa đã chuẩn hóa"""
+    return [term[:MAX_TERM_LENGTH] for term in _TERM.findall(fold(text or ''))]
+
+
+def product_terms(product):
+    """
+    Tính từ khóa và trọng số của một sản phẩm.
+
+    Trả về:
+        Counter: {từ khóa: tổng trọng số}
+    """
+    fields = {
+        'sku': product.sku,
+        'name': product.name,
+        'category': product.category.name if product.category_id else '',
+        'description': product.description,
+    }
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        for term in tokenize(fields[field]):
+            terms[term] += weight
+    return terms
+
+
+def _tokens_for(product):
+    return [
+        ProductSearchToken(term=term, product_id=product.id, weight=weight)
+        for term, weight in product_terms(product).items()
+    ]
+
+
+def index_product(product):
+    """Cập nhật chỉ mục của một sản phẩm (xóa từ khóa cũ, ghi từ khóa mới)"""
+    with transaction.atomic():
+        ProductSearchToken.objects.filter(product_id=product.id).delete()
+        ProductSearchToken.objects.bulk_create(_tokens_for(product))
+
+
+def index_products(products):
+    """Cập nhật chỉ mục của nhiều sản phẩm (vd. khi đổi tên danh mục)"""
+    products = list(products)
+    with transaction.atomic():
+        ProductSearchToken.objects.filter(product__in=products).delete()
+        ProductSearchToken.objects.bulk_create(
+            [token for product in products for token in _tokens_for(product)],
+            batch_size=5000,
+        )
+
+
+def rebuild_index(batch_size=2000):
+    """
+    Dựng lại toàn bộ chỉ mục theo lô sản phẩm.
+
+    Xóa và ghi lại trong một transaction: tìm kiếm trong lúc dựng vẫn thấy chỉ
+    mục cũ đầy đủ, index_products() chạy đồng thời phải chờ tới khi commit.
+
+    Trả về:
+        tuple: (số sản phẩm, số dòng chỉ mục)
+    """
+    products = Product.objects.select_related('category').only(
+        'id', 'sku', 'name', 'description', 'category__name'
+    ).order_by('id')
+
+    product_count = token_count = 0
+    last_id = 0
+    with transaction.atomic():
+        ProductSearchToken.objects.all().delete()
+        while True:
+            batch = list(products.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            tokens = [token for product in batch for token in _tokens_for(product)]
+            ProductSearchToken.objects.bulk_create(tokens, batch_size=5000)
+            product_count += len(batch)
+            token_count += len(tokens)
+            last_id = batch[-1].id
+    return product_count, token_count
+
+
+def top_matches(terms, limit):
+    """
+    ID tối đa `limit` sản phẩm chứa mọi từ khóa, xếp theo tổng trọng số.
+
+    Đi theo danh sách của từ khóa ít sản phẩm nhất theo trọng số giảm dần (chỉ
+    mục shop_search_term_weight), lấy trọng số các từ khóa còn lại bằng truy
+    vấn con trên chỉ mục (term, product) và dừng khi đủ `limit`, nên chi phí
+    không tăng theo số sản phẩm khớp. Khi có hơn `limit` sản phẩm khớp, chỉ
+    những sản phẩm có trọng số cao nhất cho từ khóa hiếm nhất được xếp hạng.
+    """
+    tokens = ProductSearchToken.objects.filter
+    rarest = min(terms, key=lambda term: tokens(term=term)[:limit + 1].count())
+    rows = tokens(term=rarest)
+    columns = ['product_id', 'weight']
+    for i, term in enumerate(t for t in terms if t != rarest):
+        column = f'weight_{i}'
+        rows = rows.annotate(**{
+            column: Subquery(tokens(term=term, product_id=OuterRef('product_id')).values('weight')[:1]),
+        }).filter(**{f'{column}__isnull': False})
+        columns.append(column)
+    rows = rows.order_by('-weight', 'product_id').values_list(*columns)[:limit]
+    ranked = sorted(rows, key=lambda row: (-sum(row[1:]), row[0]))
+    return [row[0] for row in ranked]
+
+
+def search_ranking(query):
+    """
+    Queryset (product_id, score) của mọi sản phẩm chứa mọi từ khóa, xếp theo điểm.
+
+    Gộp toàn bộ danh sách khớp (dùng cho admin); trang tìm kiếm dùng top_matches().
+    Trả về None nếu truy vấn không có từ khóa nào.
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return None
+    return (
+        ProductSearchToken.objects
+        .filter(term__in=terms)
+        .values('product_id')
+        .annotate(score=Sum('weight'), matched=Count('term'))
+        .filter(matched=len(terms))
+        .order_by('-score', 'product_id')
+    )
+
+
+def search_products(query, page=1, per_page=24):
+    """
+    Tìm kiếm sản phẩm, xếp hạng và phân trang.
+
+    Tối đa MAX_RESULTS kết quả (xem top_matches): truy vấn gồm toàn từ phổ biến
+    không phải gộp mọi sản phẩm khớp. Danh sách ID đã xếp hạng được phân trang
+    trong bộ nhớ.
+
+    Trả về:
+        tuple: (Page chứa ID sản phẩm hoặc None, danh sách Product của trang theo thứ tự)
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return None, []
+    page_obj = Paginator(top_matches(terms, MAX_RESULTS), per_page).get_page(page)
+    ids = list(page_obj.object_list)
+    products = Product.objects.in_bulk(ids)
+    return page_obj, [products[pid] for pid in ids if pid in products]
@@ -1,7 +1,17 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
 from django.contrib.auth.models import User
-from .models import UserProfile
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from .cart import get_cart_store
+from .models import UserProfile, Product, Category, Warehouse, WarehouseStock, Order
+from .availability import refresh_availability
+from .outbox import record_event
+from .reports import rebuild_revenue_day
+from .search import index_products
+from .autocomplete import worker_index
+from .facets import worker_facets
+from .tasks import render_order_email
 
 
 @receiver(post_save, sender=User)
@@ -16,3 +26,84 @@ def save_user_profile(sender, instance, **kwargs):
     """Lưu UserProfile khi User được lưu"""
     if hasattr(instance, 'profile'):
         instance.profile.save()
+
+
+@receiver(user_logged_in)
+def merge_guest_cart(sender, request, user, **kwargs):
+    """Gộp giỏ hàng lúc chưa đăng nhập vào giỏ hàng của người dùng"""
+    if request is not None:
+        get_cart_store().merge_on_login(request, user)
+
+
+@receiver(user_logged_out)
+def reset_cart_count(sender, request, user, **kwargs):
+    """Sau khi đăng xuất, khách bắt đầu với giỏ hàng trống"""
+    if request is not None:
+        request._cart_count = 0
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_caches(sender, instance, raw=False, **kwargs):
+    """Sản phẩm được lưu: tính lại số lượng khả dụng (chỉ mục tìm kiếm do consumer outbox cập nhật, xem shop/consumers.py)"""
+    if not raw:
+        refresh_availability([instance.pk])
+        worker_index.invalidate()
+        worker_facets.invalidate()
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_autocomplete(sender, instance, **kwargs):
+    """Process hiện tại kiểm tra lại chỉ mục gợi ý và bitmap lọc ngay ở request kế tiếp"""
+    worker_index.invalidate()
+    worker_facets.invalidate()
+
+
+@receiver(post_save, sender=WarehouseStock)
+@receiver(post_delete, sender=WarehouseStock)
+def update_product_availability(sender, instance, raw=False, **kwargs):
+    """Tồn kho đổi: tính lại số lượng khả dụng của sản phẩm trong cùng transaction"""
+    if not raw:
+        refresh_availability([instance.product_id])
+    worker_facets.invalidate()
+
+
+@receiver(post_save, sender=Warehouse)
+def update_warehouse_availability(sender, instance, created, raw=False, **kwargs):
+    """Kho bật/tắt hoạt động: tính lại các sản phẩm có tồn kho ở kho này"""
+    if not raw and not created:
+        refresh_availability(instance.warehouse_stocks.values('product_id'))
+        worker_facets.invalidate()
+
+
+@receiver(post_save, sender=Category)
+def update_category_search_index(sender, instance, created, raw=False, **kwargs):
+    """Tên danh mục là một phần chỉ mục: cập nhật các sản phẩm thuộc danh mục"""
+    if not raw and not created:
+        index_products(instance.products.select_related('category'))
+
+
+@receiver(post_save, sender=Order)
+def queue_order_notification(sender, instance, created, raw=False, **kwargs):
+    """Đơn mới hoặc đổi trạng thái: dựng và gửi email ngoài request (shop/mailer.py)"""
+    if raw or instance.user_id is None:
+        return
+    previous = getattr(instance, '_loaded_status', None)
+    if created:
+        render_order_email.enqueue(order_id=instance.id, kind='order_confirmation')
+    elif previous is not None and previous != instance.status:
+        render_order_email.enqueue(order_id=instance.id, kind='order_status')
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    """Đơn hàng bị xóa (cả xóa hàng loạt trong admin): tính lại tổng hợp doanh thu của ngày đó"""
+    rebuild_revenue_day(timezone.localdate(instance.created_at))
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=WarehouseStock)
+@receiver(post_delete, sender=Order)
+def record_delete_event(sender, instance, **kwargs):
+    """Ghi sự kiện outbox 'deleted' trong transaction của lần xóa (kể cả QuerySet.delete() và xóa dây chuyền)"""
+    record_event(sender.outbox_topic, instance.pk, 'deleted', instance.outbox_payload())
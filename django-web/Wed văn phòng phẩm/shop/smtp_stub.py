@@ -0,0 +1,97 @@
+"""
+Máy chủ SMTP giả chạy cục bộ để thử và đo lệnh gửi email
+
+Nhận mọi thư và chỉ đếm (tùy chọn giữ lại nội dung), có thể giả lập độ trễ
+khi mở phiên (bắt tay/TLS/đăng nhập) và khi nhận mỗi thư để thấy lợi ích
+của việc dùng lại kết nối.
+
+    with SMTPStub(port=0, connect_delay=0.05) as stub:
+        ... EMAIL_HOST='127.0.0.1', EMAIL_PORT=stub.port ...
+        stub.received
+"""
+
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def _reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.sessions += 1
+        if server.connect_delay:
+            time.sleep(server.connect_delay)
+        self._reply('220 localhost SMTP stub')
+
+        data = None
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            if data is not None:
+                if line in (b'.\r\n', b'.\n'):
+                    if server.message_delay:
+                        time.sleep(server.message_delay)
+                    with server.lock:
+                        server.received += 1
+                        if server.keep_messages:
+                            server.messages.append(b''.join(data))
+                    data = None
+                    self._reply('250 OK')
+                else:
+                    data.append(line)
+                continue
+
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.wfile.write(b'250-localhost\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n')
+            elif command in (b'HELO', b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                self._reply('250 OK')
+            elif command == b'DATA':
+                data = []
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == b'QUIT':
+                self._reply('221 Bye')
+                break
+            else:
+                self._reply('502 Command not implemented')
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, connect_delay=0.0, message_delay=0.0, keep_messages=False):
+        super().__init__((host, port), _SMTPHandler)
+        self.connect_delay = connect_delay
+        self.message_delay = message_delay
+        self.keep_messages = keep_messages
+        self.lock = threading.Lock()
+        self.received = 0
+        self.sessions = 0
+        self.messages = []
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,153 @@
+"""
+Ảnh chụp tồn kho định kỳ và truy vấn tồn kho tại một thời điểm
+
+Mỗi lần chụp được xây dựng tăng dần: lấy ảnh chụp trước đó rồi cộng các
+chuyển động mới hơn (theo ID). Để biết tồn kho tại thời điểm bất kỳ, chỉ cần
+đọc ảnh chụp gần nhất trước thời điểm đó và cộng phần đuôi của sổ cái, nên
+chi phí truy vấn không phụ thuộc vào độ dài của sổ cái.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import StockMovement, StockMovementArchive, StockSnapshot, WarehouseStock
+
+
+DEFAULT_SNAPSHOT_INTERVAL_HOURS = 24
+
+# Chỉ chụp các chuyển động cũ hơn mức này: transaction cấp ID nhỏ hơn có thể
+# commit sau chuyển động có ID lớn hơn, mốc ID vượt qua nó thì sẽ bỏ sót vĩnh viễn
+SETTLE_DELAY = timedelta(minutes=1)
+
+
+def snapshot_interval():
+    """Khoảng cách tối thiểu giữa hai lần chụp (setting STOCK_SNAPSHOT_INTERVAL_HOURS)"""
+    hours = getattr(settings, 'STOCK_SNAPSHOT_INTERVAL_HOURS', DEFAULT_SNAPSHOT_INTERVAL_HOURS)
+    return timedelta(hours=hours)
+
+
+def last_snapshot_time():
+    """Thời điểm của lần chụp gần nhất, hoặc None nếu chưa chụp"""
+    return StockSnapshot.objects.aggregate(last=Max('taken_at'))['last']
+
+
+def _movement_totals(**filters):
+    """
+    Cộng dồn số lượng thay đổi theo warehouse_stock_id (GROUP BY ở DB).
+
+    Đọc cả bảng chuyển động và bảng lưu trữ vì chuyển động cũ có thể đã
+    được chuyển đi (ID được giữ nguyên nên các mốc ID vẫn đúng).
+    """
+    totals = {}
+    for model in (StockMovementArchive, StockMovement):
+        rows = (
+            model.objects
+            .filter(**filters)
+            .values('warehouse_stock_id')
+            .annotate(total=Sum('quantity'))
+            .order_by()
+            .values_list('warehouse_stock_id', 'total')
+        )
+        for ws_id, total in rows.iterator(chunk_size=5000):
+            totals[ws_id] = totals.get(ws_id, 0) + (total or 0)
+    return totals
+
+
+def take_snapshot(now=None):
+    """
+    Chụp tồn kho cho tất cả các dòng WarehouseStock.
+
+    Ảnh chụp mới = ảnh chụp trước + các chuyển động có ID lớn hơn mốc của
+    ảnh chụp trước. Dòng tồn kho chưa có ảnh chụp được tính từ đầu sổ cái.
+    Mốc mới chỉ gồm các chuyển động cũ hơn SETTLE_DELAY; phần mới hơn được
+    stock_at() cộng từ sổ cái như phần đuôi.
+
+    Trả về:
+        int: Số ảnh chụp đã tạo
+    """
+    now = now or timezone.now()
+    settled = now - SETTLE_DELAY
+    high_water = max(
+        StockMovement.objects.filter(created_at__lte=settled).aggregate(last=Max('id'))['last'] or 0,
+        StockMovementArchive.objects.filter(created_at__lte=settled).aggregate(last=Max('id'))['last'] or 0,
+    )
+
+    previous_time = last_snapshot_time()
+    previous = {}
+    previous_mark = 0
+    if previous_time is not None:
+        for ws_id, quantity, mark in StockSnapshot.objects.filter(
+            taken_at=previous_time
+        ).values_list('warehouse_stock_id', 'quantity', 'last_movement_id').iterator(chunk_size=5000):
+            previous[ws_id] = quantity
+            previous_mark = max(previous_mark, mark)
+    # Không lùi mốc nếu lần chụp trước mới hơn (vd. chạy lại ngay)
+    high_water = max(high_water, previous_mark)
+
+    # Phần sổ cái mới kể từ lần chụp trước
+    delta = _movement_totals(id__gt=previous_mark, id__lte=high_water)
+
+    stock_ids = list(WarehouseStock.objects.order_by('id').values_list('id', flat=True))
+    # Dòng tồn kho mới xuất hiện sau lần chụp trước: cần thêm phần sổ cái cũ
+    new_ids = [ws_id for ws_id in stock_ids if ws_id not in previous]
+    history = {}
+    if new_ids and previous_mark:
+        history = _movement_totals(warehouse_stock_id__in=new_ids, id__lte=previous_mark)
+
+    snapshots = [
+        StockSnapshot(
+            warehouse_stock_id=ws_id,
+            quantity=previous.get(ws_id, history.get(ws_id, 0)) + delta.get(ws_id, 0),
+            last_movement_id=high_water,
+            taken_at=now,
+        )
+        for ws_id in stock_ids
+    ]
+    with transaction.atomic():
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    return len(snapshots)
+
+
+def stock_at(warehouse_stock, when):
+    """
+    Tính tồn kho theo sổ cái của một dòng tồn kho tại thời điểm `when`.
+
+    Đọc ảnh chụp gần nhất không muộn hơn `when`, sau đó chỉ cộng các chuyển
+    động sau mốc của ảnh chụp và không muộn hơn `when`.
+
+    Tham số:
+        warehouse_stock: WarehouseStock hoặc ID của nó
+        when: datetime cần truy vấn
+
+    Trả về:
+        int: Số lượng tồn kho tại thời điểm đó
+    """
+    ws_id = getattr(warehouse_stock, 'pk', warehouse_stock)
+    snapshot = (
+        StockSnapshot.objects
+        .filter(warehouse_stock_id=ws_id, taken_at__lte=when)
+        .order_by('-taken_at')
+        .values_list('quantity', 'last_movement_id')
+        .first()
+    )
+    base, mark = snapshot or (0, 0)
+
+    tail = _movement_totals(warehouse_stock_id=ws_id, id__gt=mark, created_at__lte=when)
+    return base + tail.get(ws_id, 0)
+
+
+def product_stock_at(product, warehouse, when):
+    """Tồn kho của một sản phẩm ở một kho tại thời điểm `when` (0 nếu chưa có dòng tồn kho)"""
+    ws_id = (
+        WarehouseStock.objects
+        .filter(product=product, warehouse=warehouse)
+        .values_list('id', flat=True)
+        .first()
+    )
+    if ws_id is None:
+        return 0
+    return stock_at(ws_id, when)
@@ -0,0 +1,257 @@
+"""
+Tồn kho chia phần (sharded counter) cho các dòng tồn kho bán chạy
+
+Khi khuyến mãi, mọi lần trừ kho của một SKU cùng khóa một dòng WarehouseStock
+và phải xếp hàng. Với dòng được đánh dấu is_sharded, số lượng được chia vào N
+dòng WarehouseStockShard: mỗi lần trừ thử lần lượt các phần theo thứ tự ngẫu
+nhiên bằng câu UPDATE có điều kiện (quantity >= n), nên các giao dịch đồng
+thời phần lớn khóa các dòng khác nhau. Đọc chính xác thì cộng các phần.
+
+Trong chế độ chia phần, WarehouseStock.quantity là giá trị tổng được đồng bộ
+định kỳ (sync_sharded_quantities, lệnh tune_hot_stock) nên có thể trễ một
+chu kỳ; mọi thay đổi số lượng phải đi qua adjust_stock() và mọi chỗ cần số
+lượng chính xác phải đọc qua current_quantity()/stock_quantity().
+
+Dòng nóng được phát hiện từ StockLockSample (thời gian chờ khóa khi trừ kho ở
+chế độ thường) và tự chia phần; dòng đã chia phần mà ít giao dịch thì được gộp
+lại. Số giao dịch được đếm ở cột WarehouseStockShard.ops, tăng trong chính câu
+UPDATE của phần (không thêm khóa), nên lệnh tune_hot_stock chạy ở tiến trình
+riêng vẫn đọc được số của mọi worker.
+"""
+
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
+
+from .availability import refresh_availability
+from .models import StockLockSample, WarehouseStock, WarehouseStockShard
+from .outbox import record_event, record_events
+
+
+# Chỉ ghi mẫu khi chờ khóa từ mức này trở lên (ms), tránh ghi mỗi giao dịch
+LOCK_SAMPLE_MIN_MS = 5
+
+
+def current_quantity(warehouse_stock):
+    """Số lượng chính xác hiện tại (cộng các phần nếu đang chia phần)"""
+    if not warehouse_stock.is_sharded:
+        return WarehouseStock.objects.values_list('quantity', flat=True).get(pk=warehouse_stock.pk)
+    return warehouse_stock.shards.aggregate(total=Coalesce(Sum('quantity'), 0))['total']
+
+
+def _shard_total():
+    return (
+        WarehouseStockShard.objects
+        .filter(warehouse_stock=OuterRef('pk'))
+        .values('warehouse_stock')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+
+
+def stock_quantity():
+    """Biểu thức SQL cho queryset WarehouseStock: số lượng chính xác (tổng các phần nếu đang chia phần)"""
+    return Case(
+        When(is_sharded=True, then=Coalesce(Subquery(_shard_total()), Value(0))),
+        default=F('quantity'),
+        output_field=IntegerField(),
+    )
+
+
+def adjust_stock(warehouse_stock, delta):
+    """
+    Cộng/trừ số lượng của một dòng tồn kho; phải gọi trong transaction.
+
+    Trả về:
+        bool: False nếu không đủ hàng để trừ (không thay đổi gì)
+    """
+    changed = _adjust(warehouse_stock, delta)
+    if changed:
+        # Cập nhật bằng UPDATE không đi qua save(): tự ghi sự kiện outbox
+        record_event('warehouse_stock', warehouse_stock.pk, payload={
+            'warehouse': warehouse_stock.warehouse_id,
+            'product': warehouse_stock.product_id,
+            'delta': delta,
+        })
+    return changed
+
+
+def _adjust(warehouse_stock, delta):
+    if warehouse_stock.is_sharded:
+        return _adjust_sharded(warehouse_stock, delta)
+
+    started = time.perf_counter()
+    locked = WarehouseStock.objects.select_for_update().only('quantity', 'is_sharded').get(pk=warehouse_stock.pk)
+    wait_ms = (time.perf_counter() - started) * 1000
+    if wait_ms >= LOCK_SAMPLE_MIN_MS:
+        StockLockSample.objects.create(warehouse_stock_id=warehouse_stock.pk, wait_ms=wait_ms)
+
+    if locked.is_sharded:
+        # Vừa được chia phần bởi tiến trình khác
+        warehouse_stock.is_sharded = True
+        return _adjust_sharded(warehouse_stock, delta)
+    if locked.quantity + delta < 0:
+        return False
+    # last_counted là auto_now: update() phải tự đặt để facets/luồng tồn kho thấy thay đổi
+    WarehouseStock.objects.filter(pk=warehouse_stock.pk).update(
+        quantity=F('quantity') + delta, last_counted=timezone.now(),
+    )
+    return True
+
+
+def _adjust_sharded(warehouse_stock, delta):
+    shards = WarehouseStockShard.objects.filter(warehouse_stock_id=warehouse_stock.pk)
+    shard_numbers = list(shards.values_list('shard_no', flat=True))
+    if not shard_numbers:
+        # Vừa được gộp lại bởi tiến trình khác
+        warehouse_stock.is_sharded = False
+        return _adjust(warehouse_stock, delta)
+    random.shuffle(shard_numbers)
+
+    if delta >= 0:
+        if shards.filter(shard_no=shard_numbers[0]).update(quantity=F('quantity') + delta, ops=F('ops') + 1):
+            return True
+        # Các phần vừa bị demote() xóa: cộng vào dòng chính
+        warehouse_stock.is_sharded = False
+        return _adjust(warehouse_stock, delta)
+
+    need = -delta
+    for shard_no in shard_numbers:
+        if shards.filter(shard_no=shard_no, quantity__gte=need).update(
+            quantity=F('quantity') - need, ops=F('ops') + 1,
+        ):
+            return True
+
+    # Không phần nào đủ một mình: khóa tất cả theo thứ tự cố định rồi lấy dần
+    locked = list(shards.select_for_update().order_by('shard_no'))
+    if not locked:
+        # Các phần vừa bị demote() xóa: trừ ở dòng chính thay vì báo hết hàng
+        warehouse_stock.is_sharded = False
+        return _adjust(warehouse_stock, delta)
+    if sum(shard.quantity for shard in locked) < need:
+        return False
+    ops = 1
+    for shard in locked:
+        take = min(shard.quantity, need)
+        if take:
+            # Một lần trừ chỉ tính một giao dịch dù lấy từ nhiều phần
+            shards.filter(pk=shard.pk).update(quantity=F('quantity') - take, ops=F('ops') + ops)
+            need -= take
+            ops = 0
+        if not need:
+            break
+    return True
+
+
+def promote(warehouse_stock, shard_count=None):
+    """Chia số lượng của dòng tồn kho thành `shard_count` phần"""
+    shard_count = shard_count or settings.STOCK_SHARD_COUNT
+    with transaction.atomic():
+        locked = WarehouseStock.objects.select_for_update().get(pk=warehouse_stock.pk)
+        if locked.is_sharded:
+            return False
+        base, extra = divmod(max(locked.quantity, 0), shard_count)
+        WarehouseStockShard.objects.bulk_create([
+            WarehouseStockShard(warehouse_stock=locked, shard_no=i, quantity=base + (1 if i < extra else 0))
+            for i in range(shard_count)
+        ])
+        WarehouseStock.objects.filter(pk=locked.pk).update(is_sharded=True)
+    return True
+
+
+def demote(warehouse_stock):
+    """Gộp các phần về lại WarehouseStock.quantity và xóa các phần"""
+    with transaction.atomic():
+        locked = WarehouseStock.objects.select_for_update().get(pk=warehouse_stock.pk)
+        if not locked.is_sharded:
+            return False
+        shards = list(locked.shards.select_for_update().order_by('shard_no'))
+        total = sum(shard.quantity for shard in shards)
+        WarehouseStock.objects.filter(pk=locked.pk).update(quantity=total, is_sharded=False, last_counted=Now())
+        locked.shards.all().delete()
+        refresh_availability([locked.product_id])
+        record_event('warehouse_stock', locked.pk, payload={
+            'warehouse': locked.warehouse_id, 'product': locked.product_id, 'quantity': total,
+        })
+    return True
+
+
+def sync_sharded_quantities():
+    """
+    Ghi tổng các phần vào WarehouseStock.quantity (và số lượng khả dụng của sản phẩm).
+
+    Chỉ ghi các dòng có tổng khác giá trị đang lưu và ghi sự kiện outbox cho chúng.
+
+    Trả về:
+        int: Số dòng tồn kho đã đồng bộ
+    """
+    with transaction.atomic():
+        stale = list(
+            WarehouseStock.objects.filter(is_sharded=True)
+            .annotate(total=stock_quantity())
+            .exclude(quantity=F('total'))
+            .values_list('id', 'warehouse_id', 'product_id', 'total')
+        )
+        if not stale:
+            return 0
+        updated = WarehouseStock.objects.filter(id__in=[row[0] for row in stale], is_sharded=True).update(
+            quantity=Coalesce(Subquery(_shard_total()), Value(0)), last_counted=Now(),
+        )
+        refresh_availability({row[2] for row in stale})
+        record_events('warehouse_stock', [
+            (ws_id, {'warehouse': warehouse_id, 'product': product_id, 'quantity': total})
+            for ws_id, warehouse_id, product_id, total in stale
+        ])
+    return updated
+
+
+def tune_hot_stock(window_minutes=5, hot_wait_ms=None, cold_ops=None, shard_count=None):
+    """
+    Tự chia phần các dòng chờ khóa nhiều và gộp các dòng đã nguội.
+
+    Dòng thường có tổng thời gian chờ khóa trong `window_minutes` phút vượt
+    `hot_wait_ms` được chia phần. Dòng đã chia phần có ít hơn `cold_ops` lần
+    trừ/cộng kể từ lần chạy trước được gộp lại.
+
+    Trả về:
+        tuple: (danh sách id đã chia phần, danh sách id đã gộp)
+    """
+    hot_wait_ms = hot_wait_ms if hot_wait_ms is not None else settings.STOCK_HOT_LOCK_WAIT_MS
+    cold_ops = cold_ops if cold_ops is not None else settings.STOCK_COLD_OPS
+    since = timezone.now() - timedelta(minutes=window_minutes)
+
+    hot = (
+        StockLockSample.objects.filter(created_at__gte=since)
+        .values('warehouse_stock_id')
+        .annotate(total_wait=Sum('wait_ms'), samples=Count('id'))
+        .filter(total_wait__gte=hot_wait_ms)
+        .order_by()
+    )
+    promoted = [
+        row['warehouse_stock_id'] for row in hot
+        if promote(WarehouseStock(pk=row['warehouse_stock_id']), shard_count)
+    ]
+    StockLockSample.objects.filter(created_at__lt=since).delete()
+    StockLockSample.objects.filter(warehouse_stock_id__in=promoted).delete()
+
+    demoted, kept = [], []
+    sharded = (
+        WarehouseStock.objects.filter(is_sharded=True).exclude(pk__in=promoted)
+        .annotate(ops=Coalesce(Sum('shards__ops'), 0))
+        .values_list('id', 'ops')
+    )
+    for stock_id, ops in sharded:
+        if ops < cold_ops:
+            if demote(WarehouseStock(pk=stock_id)):
+                demoted.append(stock_id)
+        else:
+            kept.append(stock_id)
+    # Bắt đầu đếm chu kỳ mới cho các dòng giữ nguyên chia phần
+    WarehouseStockShard.objects.filter(warehouse_stock_id__in=kept).update(ops=0)
+    return promoted, demoted
@@ -0,0 +1,60 @@
+"""
+Các công việc nền của cửa hàng (chạy bởi lệnh runworker, xem shop/jobs.py)
+"""
+
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.mail import send_mail
+
+from .jobs import task
+from .mailer import queue_order_email
+from .models import UserProfile
+from .reports import refresh_movement_rollups, refresh_revenue_rollups
+
+
+@task(queue='email', max_attempts=8)
+def send_email(subject, message, recipient_list, from_email=None, html_message=None):
+    """Gửi email qua EMAIL_BACKEND ngoài request"""
+    send_mail(subject, message, from_email, recipient_list, html_message=html_message)
+
+
+@task(queue='email', max_attempts=5)
+def render_order_email(order_id, kind):
+    """Dựng email thông báo đơn hàng và ghi QueuedEmail cho lệnh send_queued_mail"""
+    queue_order_email(order_id, kind)
+
+
+@task(queue='default', max_attempts=3)
+def process_avatar(profile_id):
+    """Xoay đúng chiều EXIF và thu nhỏ ảnh đại diện vừa tải lên về AVATAR_MAX_SIZE"""
+    from PIL import Image, ImageOps
+
+    profile = UserProfile.objects.filter(id=profile_id).first()
+    if profile is None or not profile.avatar:
+        return
+
+    with profile.avatar.open('rb') as source:
+        image = Image.open(source)
+        image_format = image.format or 'JPEG'
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((settings.AVATAR_MAX_SIZE, settings.AVATAR_MAX_SIZE))
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, format=image_format, quality=85)
+
+    old_name = profile.avatar.name
+    profile.avatar.save(os.path.basename(old_name), ContentFile(buffer.getvalue()), save=False)
+    UserProfile.objects.filter(id=profile.id).update(avatar=profile.avatar.name)
+    if profile.avatar.name != old_name:
+        profile.avatar.storage.delete(old_name)
+
+
+@task(queue='reports', max_attempts=3)
+def refresh_report_rollups():
+    """Cập nhật tăng dần các bảng tổng hợp báo cáo (thay cho chạy trong request/cron)"""
+    refresh_revenue_rollups()
+    refresh_movement_rollups()
@@ -1,3 +1,731 @@
-from django.test import TestCase
+import smtplib
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.mail.backends.locmem import EmailBackend
+from django.db.models import Sum
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .allocation import allocate_orders
+from .autocomplete import PrefixIndex, _WorkerIndex
+from .facets import FacetIndex, _WorkerFacets, bitmap_ids
+from .forms import QuickOrderForm
+from .jobs import claim_jobs, enqueue, ensure_scheduled, task
+from .live_stock import stock_feed, stream_events
+from .mailer import BatchMailer, claim_batch
+from .middleware import PriorityClass
+from .outbox import read_after
+from .models import (
+    Category, Job, Order, OrderItem, OutboxEvent, Product, QueuedEmail, StockMovement, WaitingRoomCounter,
+    Warehouse, WarehouseStock,
+)
+from .rebalancing import load_rebalance_input, plan_transfers
+from .reconciliation import find_warehouse_drift
+from .search import index_products, rebuild_index, search_products, search_ranking, top_matches
+from .stock_counters import (
+    adjust_stock, current_quantity, demote, promote, sync_sharded_quantities, tune_hot_stock,
+)
+from . import jobs, search, waiting_room
+
+
+def make_product(name, price=1000):
+    category, _ = Category.objects.get_or_create(name='Bút')
+    return Product.objects.create(name=name, price=price, description='', category=category, sku=name)
+
+
+def make_order(lines, status='pending'):
+    order = Order.objects.create(customer_name='Khách', phone='0900000000', address='HN', status=status)
+    for product, quantity in lines:
+        OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+    return order
+
+
+# ========== REBALANCING ==========
+
+class PlanTransfersTests(SimpleTestCase):
+    """plan_transfers: ghép kho thừa với kho thiếu theo từng SKU"""
+
+    def plan(self, quantity, velocity, free_capacity, **kwargs):
+        sku, source, destination, quantity = plan_transfers(quantity, velocity, free_capacity, **kwargs)
+        return sorted(zip(sku.tolist(), source.tolist(), destination.tolist(), quantity.tolist()))
+
+    def test_moves_surplus_to_deficit(self):
+        self.assertEqual(
+            self.plan([[1000, 0]], [[1, 1]], [np.inf, np.inf]),
+            [(0, 0, 1, 21)],
+        )
+
+    def test_each_sku_matched_within_its_own_row(self):
+        plan = self.plan([[1000, 0, 0], [0, 500, 2]], [[1, 1, 1], [1, 1, 1]], [np.inf] * 3)
+        self.assertEqual(plan, [(0, 0, 1, 21), (0, 0, 2, 21), (1, 1, 0, 21), (1, 1, 2, 19)])
+        for sku, source, destination, _ in plan:
+            self.assertNotEqual(source, destination)
+
+    def test_limited_by_free_capacity(self):
+        plan = self.plan([[1000, 0, 0]], [[1, 1, 1]], [np.inf, 10, np.inf])
+        self.assertEqual(plan, [(0, 0, 1, 10), (0, 0, 2, 21)])
+
+    def test_over_capacity_warehouse_receives_nothing(self):
+        # Sức chứa còn trống âm (kho đã vượt sức chứa) không được làm hỏng các SKU khác
+        plan = self.plan([[1000, 0, 0], [0, 500, 2]], [[1, 1, 1], [1, 1, 1]], [np.inf, -50, np.inf])
+        self.assertEqual(plan, [(0, 0, 2, 21), (1, 1, 0, 21), (1, 1, 2, 19)])
+
+    def test_never_moves_more_than_supply(self):
+        quantity = np.array([[30, 0, 0]])
+        _, _, _, moved = plan_transfers(quantity, [[0.1, 5, 5]], [np.inf] * 3)
+        self.assertLessEqual(moved.sum(), 30)
+
+    def test_no_transfer_without_velocity(self):
+        self.assertEqual(self.plan([[1000, 0]], [[0, 0]], [np.inf, np.inf]), [])
+
+
+class LoadRebalanceInputTests(TestCase):
+    """load_rebalance_input: tồn kho và sức chứa đã dùng tính theo số lượng chính xác"""
+
+    def test_sharded_row_uses_shard_total(self):
+        warehouse = Warehouse.objects.create(name='Kho A', location='HN', capacity=100)
+        stock = WarehouseStock.objects.create(warehouse=warehouse, product=make_product('PEN'), quantity=10)
+        promote(stock, shard_count=2)
+        adjust_stock(stock, 30)
+
+        data = load_rebalance_input()
+
+        self.assertEqual(data.quantity.tolist(), [[40]])
+        self.assertEqual(data.free_capacity.tolist(), [60.0])
+
+
+# ========== ALLOCATION ==========
+
+class AllocateOrdersTests(TestCase):
+    """allocate_orders: phân kho cho đơn đang chờ theo tồn kho khả dụng"""
+
+    def setUp(self):
+        self.north = Warehouse.objects.create(name='Kho Bắc', location='HN')
+        self.south = Warehouse.objects.create(name='Kho Nam', location='HCM')
+        self.pen = make_product('PEN')
+        self.ink = make_product('INK')
+
+    def stock(self, warehouse, product, quantity):
+        return WarehouseStock.objects.create(warehouse=warehouse, product=product, quantity=quantity)
+
+    def test_prefers_single_warehouse(self):
+        self.stock(self.north, self.pen, 5)
+        self.stock(self.south, self.pen, 5)
+        self.stock(self.south, self.ink, 5)
+        order = make_order([(self.pen, 2), (self.ink, 1)])
+
+        result = allocate_orders()
+
+        self.assertEqual(result.allocated, [order.id])
+        self.assertEqual(result.split, [])
+        order.refresh_from_db()
+        self.assertEqual(order.warehouse, self.south)
+        self.assertEqual(set(order.items.values_list('warehouse_id', flat=True)), {self.south.id})
+
+    def test_splits_when_no_warehouse_has_everything(self):
+        self.stock(self.north, self.pen, 5)
+        self.stock(self.south, self.ink, 5)
+        order = make_order([(self.pen, 1), (self.ink, 1)])
+
+        result = allocate_orders()
+
+        self.assertEqual(result.split, [order.id])
+        items = dict(order.items.values_list('product_id', 'warehouse_id'))
+        self.assertEqual(items, {self.pen.id: self.north.id, self.ink.id: self.south.id})
+
+    def test_earlier_orders_reserve_stock(self):
+        self.stock(self.north, self.pen, 3)
+        first = make_order([(self.pen, 2)])
+        second = make_order([(self.pen, 2)])
+
+        result = allocate_orders()
+
+        self.assertEqual(result.allocated, [first.id])
+        self.assertEqual(result.skipped, [second.id])
+        # Lần chạy sau vẫn tính phần đã giữ cho đơn đầu tiên
+        self.assertEqual(allocate_orders().skipped, [second.id])
+
+    def test_bumps_updated_at(self):
+        self.stock(self.north, self.pen, 5)
+        order = make_order([(self.pen, 1)])
+        before = order.updated_at
+
+        allocate_orders()
+
+        order.refresh_from_db()
+        self.assertGreater(order.updated_at, before)
+
+    def test_sharded_row_uses_shard_total(self):
+        stock = self.stock(self.north, self.pen, 0)
+        promote(stock, shard_count=2)
+        adjust_stock(stock, 3)
+        order = make_order([(self.pen, 3)])
+
+        self.assertEqual(allocate_orders().allocated, [order.id])
+
+    def test_outbox_payload_needs_no_extra_queries(self):
+        self.stock(self.north, self.pen, 50)
+        orders = [make_order([(self.pen, 1)]) for _ in range(5)]
+        # Số truy vấn không tăng theo số đơn
+        with self.assertNumQueries(10):
+            allocate_orders()
+        payloads = OutboxEvent.objects.filter(topic='order', event_type='updated').order_by('id')
+        self.assertEqual(
+            [event.payload for event in payloads][-5:],
+            [{'status': 'pending', 'warehouse': self.north.id, 'user': None}] * len(orders),
+        )
+
+
+# ========== STOCK COUNTERS ==========
+
+class StockCountersTests(TestCase):
+    """adjust_stock/promote/demote, kể cả khi demote() chạy xen giữa một lần cộng/trừ"""
+
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name='Kho A', location='HN')
+        self.stock = WarehouseStock.objects.create(warehouse=self.warehouse, product=make_product('PEN'), quantity=10)
+
+    def assertQuantity(self, expected):
+        self.stock.refresh_from_db()
+        self.assertEqual(current_quantity(self.stock), expected)
+
+    def demote_after_shards_read(self):
+        # random.shuffle chạy sau khi đã đọc danh sách phần: giả lập demote() xen vào lúc đó
+        stock = WarehouseStock.objects.get(pk=self.stock.pk)
+        return mock.patch('shop.stock_counters.random.shuffle', side_effect=lambda numbers: demote(stock))
+
+    def test_promote_splits_and_demote_merges(self):
+        promote(self.stock, shard_count=3)
+        self.assertEqual(sorted(self.stock.shards.values_list('quantity', flat=True)), [3, 3, 4])
+        self.assertTrue(adjust_stock(self.stock, 5))
+        self.assertTrue(adjust_stock(self.stock, -12))
+        self.assertQuantity(3)
+
+        demote(self.stock)
+        self.stock.refresh_from_db()
+        self.assertFalse(self.stock.is_sharded)
+        self.assertEqual(self.stock.quantity, 3)
+        self.assertFalse(self.stock.shards.exists())
+
+    def test_decrement_spanning_shards_and_out_of_stock(self):
+        promote(self.stock, shard_count=5)
+        self.assertTrue(adjust_stock(self.stock, -7))
+        self.assertFalse(adjust_stock(self.stock, -4))
+        self.assertQuantity(3)
+
+    def test_increment_during_demote_is_not_lost(self):
+        promote(self.stock, shard_count=2)
+        with self.demote_after_shards_read():
+            self.assertTrue(adjust_stock(self.stock, 5))
+        self.assertFalse(self.stock.is_sharded)
+        self.assertQuantity(15)
+
+    def test_decrement_during_demote_is_not_out_of_stock(self):
+        promote(self.stock, shard_count=2)
+        with self.demote_after_shards_read():
+            self.assertTrue(adjust_stock(self.stock, -8))
+        self.assertQuantity(2)
+
+    def test_stale_flag_after_demote_falls_back(self):
+        promote(self.stock, shard_count=2)
+        self.stock.is_sharded = True
+        demote(WarehouseStock.objects.get(pk=self.stock.pk))
+        self.assertTrue(adjust_stock(self.stock, -10))
+        self.assertQuantity(0)
+
+    def test_tune_counts_operations_in_database(self):
+        busy = self.stock
+        cold = WarehouseStock.objects.create(warehouse=self.warehouse, product=make_product('INK'), quantity=10)
+        promote(busy, shard_count=2)
+        promote(cold, shard_count=2)
+        for _ in range(3):
+            adjust_stock(busy, -1)
+        adjust_stock(busy, -6)  # lấy từ cả hai phần: vẫn là một giao dịch
+        self.assertEqual(busy.shards.aggregate(total=Sum('ops'))['total'], 4)
+
+        promoted, demoted = tune_hot_stock(cold_ops=4)
+
+        self.assertEqual((promoted, demoted), ([], [cold.id]))
+        self.assertEqual(list(busy.shards.values_list('ops', flat=True)), [0, 0])
+        # Chu kỳ sau không có giao dịch: gộp lại
+        self.assertEqual(tune_hot_stock(cold_ops=4), ([], [busy.id]))
+
+    def test_reconciliation_reads_shard_total(self):
+        StockMovement.objects.create(warehouse_stock=self.stock, movement_type='import', quantity=10)
+        promote(self.stock, shard_count=2)
+        adjust_stock(self.stock, -4)
+        StockMovement.objects.create(warehouse_stock=self.stock, movement_type='sale', quantity=-4)
+
+        self.assertEqual(find_warehouse_drift(self.warehouse.id), [])
+
+
+# ========== QUICK ORDER ==========
+
+class QuickOrderParseTests(SimpleTestCase):
+    """QuickOrderForm.parse_lines: dòng sai được liệt kê thay vì gây lỗi"""
+
+    def test_parses_quantities_and_header(self):
+        entries, invalid = QuickOrderForm.parse_lines('sku,quantity\nABC, 3\nXYZ')
+        self.assertEqual(entries, [(2, 'ABC', 3), (3, 'XYZ', 1)])
+        self.assertEqual(invalid, [])
+
+    def test_non_decimal_digits_are_invalid(self):
+        entries, invalid = QuickOrderForm.parse_lines('ABC ²\nXYZ 0\nDEF abc')
+        self.assertEqual(entries, [])
+        self.assertEqual(invalid, [(1, 'ABC ²'), (2, 'XYZ 0'), (3, 'DEF abc')])
+
+
+# ========== CART ==========
+
+class RemoveFromCartTests(TestCase):
+    """remove_from_cart chỉ thay đổi giỏ hàng khi POST"""
+
+    def setUp(self):
+        self.product = make_product('PEN')
+        self.client.post(reverse('add_to_cart', args=[self.product.id]))
+
+    def test_get_does_not_remove(self):
+        response = self.client.get(reverse('remove_from_cart', args=[self.product.id]))
+        self.assertRedirects(response, reverse('cart'), fetch_redirect_response=False)
+        self.assertContains(self.client.get(reverse('cart')), self.product.name)
+
+    def test_post_removes(self):
+        self.client.post(reverse('remove_from_cart', args=[self.product.id]))
+        self.assertNotContains(self.client.get(reverse('cart')), self.product.name)
+
+
+# ========== PRIORITY LIMITS ==========
+
+class PriorityClassTests(SimpleTestCase):
+    """PriorityClass: ngưỡng cắt tải trước khi hết chỗ, còn chỗ thì không từ chối"""
+
+    def test_under_pressure_from_shed_at(self):
+        critical = PriorityClass('critical', limit=4, queue=2, shed_at=2)
+        self.assertIsNone(critical.acquire())
+        self.assertFalse(critical.under_pressure())
+        self.assertIsNone(critical.acquire())
+        self.assertTrue(critical.under_pressure())
+        critical.release()
+        self.assertFalse(critical.under_pressure())
+
+    def test_shed_at_defaults_to_limit(self):
+        klass = PriorityClass('normal', limit=2)
+        klass.acquire()
+        self.assertFalse(klass.under_pressure())
+        klass.acquire()
+        self.assertTrue(klass.under_pressure())
+
+    def test_free_slot_admits_even_with_full_queue(self):
+        klass = PriorityClass('normal', limit=1, queue=0)
+        self.assertIsNone(klass.acquire())
+        self.assertEqual(klass.acquire(), 'queue_full')
+        klass.release()
+        # Request chờ (đã tính vào queued) chưa kịp thức dậy: chỗ trống vẫn được dùng
+        klass.queued = 1
+        self.assertIsNone(klass.acquire())
+
+
+# ========== SEARCH ==========
+
+class SearchTests(TestCase):
+    """Tìm kiếm qua chỉ mục đảo: bỏ dấu, đủ mọi từ khóa, giới hạn ứng viên"""
+
+    def setUp(self):
+        self.red = make_product('Bút bi đỏ')
+        self.blue = make_product('Bút bi xanh')
+        self.pencil = make_product('Bút chì')
+        index_products(Product.objects.select_related('category'))
+
+    def test_folds_diacritics_and_requires_every_term(self):
+        _, products = search_products('but bi')
+        self.assertEqual({p.id for p in products}, {self.red.id, self.blue.id})
+        _, products = search_products('BÚT XANH')
+        self.assertEqual([p.id for p in products], [self.blue.id])
+
+    def test_top_matches_agrees_with_full_ranking_below_limit(self):
+        full = list(search_ranking('bút bi').values_list('product_id', flat=True))
+        self.assertEqual(top_matches(['bi', 'but'], 10), full)
+
+    def test_limit_caps_candidates(self):
+        self.assertEqual(len(top_matches(['but'], 2)), 2)
+
+    def test_failed_rebuild_keeps_old_index(self):
+        real_tokens = search._tokens_for
+        calls = []
+
+        def fail_on_second_batch(product):
+            calls.append(product.id)
+            if len(calls) > 1:
+                raise RuntimeError('lỗi giữa chừng')
+            return real_tokens(product)
+
+        with mock.patch('shop.search._tokens_for', side_effect=fail_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                rebuild_index(batch_size=1)
+        _, products = search_products('but')
+        self.assertEqual(len(products), 3)
+        self.assertEqual(rebuild_index(batch_size=2)[0], 3)
+
+
+# ========== AUTOCOMPLETE ==========
+
+class PrefixIndexTests(SimpleTestCase):
+    """PrefixIndex: tra tiền tố, cập nhật bằng chỉ mục mới (không sửa chỉ mục đang dùng)"""
+
+    def setUp(self):
+        self.index = PrefixIndex.build([
+            (1, 'Bút bi Thiên Long', 'TL-027', 50),
+            (2, 'Bút chì', 'BC-01', 10),
+            (3, 'Thước kẻ', 'TK-20', 5),
+        ])
+
+    def test_prefix_of_any_word_ranked_by_popularity(self):
+        self.assertEqual([pid for pid, _, _ in self.index.suggest('but')], [1, 2])
+        self.assertEqual([pid for pid, _, _ in self.index.suggest('thien')], [1])
+        self.assertEqual([pid for pid, _, _ in self.index.suggest('tk-2')], [3])
+
+    def test_with_changes_leaves_current_index_untouched(self):
+        entries = list(self.index.entries)
+        updated = self.index.with_changes([(2, 'Kẹp giấy', 'KG-01'), (4, 'Bút dạ', 'BD-01')], [1], {4: 7})
+
+        self.assertEqual(self.index.entries, entries)
+        self.assertEqual([pid for pid, _, _ in updated.suggest('but')], [4])
+        self.assertEqual([pid for pid, _, _ in updated.suggest('kep')], [2])
+        self.assertEqual(updated.entries, sorted(updated.entries))
+
+
+class WorkerIndexTests(TestCase):
+    """_WorkerIndex.refresh: phát hiện sản phẩm bị xóa rồi thêm mới trong cùng chu kỳ"""
+
+    def test_delete_then_add_in_same_window(self):
+        old = make_product('Bút bi')
+        worker = _WorkerIndex()
+        worker.refresh()
+        old.delete()
+        new = make_product('Bút dạ')
+        worker.refresh()
+        self.assertEqual([pid for pid, _, _ in worker.index.suggest('but')], [new.id])
+
+
+# ========== FACETS ==========
+
+class FacetIndexTests(SimpleTestCase):
+    """FacetIndex: OR trong một facet, AND giữa các facet, đếm theo lựa chọn của facet khác"""
+
+    def setUp(self):
+        self.index = FacetIndex.build([
+            (1, 10, 5000, True),
+            (2, 10, 20000, False),
+            (3, 20, 20000, True),
+        ])
+
+    def test_query_and_counts(self):
+        bitmap, counts = self.index.query({'category': [10], 'stock': [True]})
+        self.assertEqual(bitmap_ids(bitmap), [1])
+        self.assertEqual(counts['category'], {10: 1, 20: 1})
+        self.assertEqual(counts['price'], {'lt10k': 1, '10k-50k': 0})
+
+    def test_with_changes_leaves_current_index_untouched(self):
+        updated = self.index.with_changes([(2, 20, 20000, True), (4, 30, 600000, True)], removed=[1])
+
+        self.assertEqual(bitmap_ids(self.index.query({})[0]), [1, 2, 3])
+        self.assertEqual(bitmap_ids(self.index.query({'category': [20]})[0]), [3])
+        self.assertEqual(bitmap_ids(updated.query({})[0]), [2, 3, 4])
+        self.assertEqual(bitmap_ids(updated.query({'category': [20]})[0]), [2, 3])
+        self.assertNotIn(30, self.index.facets['category'])
+
+
+class WorkerFacetsTests(TestCase):
+    """_WorkerFacets.refresh: thay đổi từ tiến trình khác (xóa rồi thêm, tắt kho)"""
+
+    def test_delete_then_add_in_same_window(self):
+        old = make_product('Bút bi')
+        worker = _WorkerFacets()
+        worker.refresh()
+        old.delete()
+        new = make_product('Bút dạ')
+        worker.refresh()
+        self.assertEqual(bitmap_ids(worker.index.query({})[0]), [new.id])
+
+    def test_warehouse_deactivation_seen_by_other_worker(self):
+        product = make_product('Bút bi')
+        warehouse = Warehouse.objects.create(name='Kho A', location='HN')
+        WarehouseStock.objects.create(warehouse=warehouse, product=product, quantity=5)
+        worker = _WorkerFacets()
+        worker.refresh()
+        self.assertEqual(bitmap_ids(worker.index.query({'stock': [True]})[0]), [product.id])
+
+        warehouse.is_active = False
+        warehouse.save()
+        worker.refresh()
+        self.assertEqual(bitmap_ids(worker.index.query({'stock': [True]})[0]), [])
+
+
+# ========== WAITING ROOM ==========
+
+@override_settings(WAITING_ROOM_ADMIT_PER_MINUTE=60, WAITING_ROOM_MAX_ACTIVE=2)
+class WaitingRoomTests(TestCase):
+    """Phòng chờ: tốc độ cho vào, không tích lũy suất lúc vắng, giới hạn suất thanh toán"""
+
+    def setUp(self):
+        self.now = 1_000_000.0
+        patcher = mock.patch('shop.waiting_room.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_first_ticket_waits_for_next_admission(self):
+        ticket = waiting_room.issue_ticket()
+        self.assertEqual(ticket, 1)
+        # Mốc thời gian lùi một suất: người đầu tiên vào ngay khi đọc lại
+        self.assertEqual(waiting_room.admitted_upto(), 1)
+
+    def test_admits_at_configured_rate(self):
+        waiting_room.admitted_upto()
+        tickets = [waiting_room.issue_ticket() for _ in range(10)]
+        self.assertEqual(tickets, list(range(1, 11)))
+        self.now += 3.5
+        self.assertEqual(waiting_room.admitted_upto(), 4)
+        # Phần lẻ 0.5 giây không bị mất
+        self.now += 0.5
+        self.assertEqual(waiting_room.admitted_upto(), 5)
+
+        status = waiting_room.QueueStatus(ticket=8, admitted_upto=5)
+        self.assertFalse(status.admitted)
+        self.assertEqual(status.position, 3)
+        self.assertEqual(status.eta_seconds, 3)
+
+    def test_idle_time_does_not_accumulate(self):
+        waiting_room.admitted_upto()
+        self.now += 600
+        self.assertEqual(waiting_room.admitted_upto(), 0)
+        for _ in range(5):
+            waiting_room.issue_ticket()
+        self.assertEqual(waiting_room.admitted_upto(), 1)
+        self.now += 1
+        self.assertEqual(waiting_room.admitted_upto(), 2)
+
+    def test_concurrent_advance_is_not_overwritten(self):
+        waiting_room.admitted_upto()
+        for _ in range(5):
+            waiting_room.issue_ticket()
+        self.now += 2
+        read_counter = waiting_room._counter_value
+        raced = []
+
+        def advance_in_other_process(name, default=0):
+            # Tiến trình khác đẩy mốc giữa lúc đọc trạng thái và lúc ghi
+            if not raced:
+                raced.append(name)
+                WaitingRoomCounter.objects.filter(name=waiting_room.ADMITTED).update(value=4, marked_at=self.now + 0.5)
+            return read_counter(name, default)
+
+        with mock.patch('shop.waiting_room._counter_value', side_effect=advance_in_other_process):
+            self.assertEqual(waiting_room.admitted_upto(), 4)
+        self.assertEqual(WaitingRoomCounter.objects.get(name=waiting_room.ADMITTED).marked_at, self.now + 0.5)
+
+    def test_active_slots_limit_and_release(self):
+        first = waiting_room.acquire_active_slot()
+        second = waiting_room.acquire_active_slot()
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(second)
+        self.assertIsNone(waiting_room.acquire_active_slot())
+
+        waiting_room.release_active_slot(first)
+        self.assertIsNotNone(waiting_room.acquire_active_slot())
+
+    def test_abandoned_slot_expires(self):
+        waiting_room.acquire_active_slot()
+        stale = waiting_room.acquire_active_slot()
+        self.now += waiting_room.ACTIVE_LEASE_SECONDS + 1
+        fresh = waiting_room.acquire_active_slot()
+        self.assertIsNotNone(fresh)
+        # Trả suất đã hết hạn không được giải phóng suất người khác đang giữ
+        waiting_room.release_active_slot(stale)
+        waiting_room.release_active_slot(stale)
+        self.assertIsNotNone(waiting_room.acquire_active_slot())
+        self.assertIsNone(waiting_room.acquire_active_slot())
+
+
+# ========== MAILER ==========
+
+class StatusRecordingBackend(EmailBackend):
+    """Backend locmem ghi lại trạng thái trong CSDL của các email tại lúc gửi từng email"""
+
+    def __init__(self, fail_on=(), **kwargs):
+        super().__init__(**kwargs)
+        self.fail_on = set(fail_on)
+        self.seen = []
+
+    def send_messages(self, messages):
+        self.seen.append(dict(QueuedEmail.objects.values_list('to_email', 'status')))
+        if messages[0].to[0] in self.fail_on:
+            raise smtplib.SMTPServerDisconnected('mất kết nối')
+        return super().send_messages(messages)
+
+
+class BatchMailerTests(TestCase):
+    """BatchMailer: ghi trạng thái từng email ngay khi gửi, trả lại email kẹt trong vòng lặp"""
+
+    def queue(self, *addresses):
+        for address in addresses:
+            QueuedEmail.objects.create(kind='order_status', to_email=address, subject='Đơn hàng', body_text='...')
+
+    def test_marks_each_email_sent_immediately(self):
+        self.queue('a@example.com', 'b@example.com', 'c@example.com')
+        connection = StatusRecordingBackend(fail_on={'b@example.com'})
+        mailer = BatchMailer(connection=connection, rate=0, max_attempts=3, messages_per_connection=100)
+
+        self.assertEqual(mailer.send_batch(claim_batch(10)), 2)
+
+        # Lúc gửi email thứ hai, email đầu đã được ghi 'sent'
+        self.assertEqual(connection.seen[1]['a@example.com'], 'sent')
+        statuses = dict(QueuedEmail.objects.values_list('to_email', 'status'))
+        self.assertEqual(statuses, {'a@example.com': 'sent', 'b@example.com': 'queued', 'c@example.com': 'sent'})
+
+    def test_run_requeues_stale_emails(self):
+        self.queue('a@example.com')
+        QueuedEmail.objects.update(status='sending', locked_at=timezone.now() - timedelta(hours=1))
+        mailer = BatchMailer(connection=StatusRecordingBackend(), rate=0, max_attempts=3, messages_per_connection=100)
+
+        mailer.run(threading.Event(), burst=True)
+
+        self.assertEqual(QueuedEmail.objects.get().status, 'sent')
+
+
+# ========== JOBS ==========
+
+@task(name='shop.tests.noop', queue='reports')
+def noop_task():
+    pass
+
+
+class JobQueueTests(TestCase):
+    """claim_jobs giới hạn theo queue trên mọi worker; ensure_scheduled không tạo trùng"""
+
+    def test_claim_counts_jobs_running_on_other_workers(self):
+        for _ in range(3):
+            noop_task.enqueue()
+        Job.objects.filter(id=Job.objects.first().id).update(status='running', locked_by='other:1')
+
+        claimed = claim_jobs('reports', 2, 'me:1', max_running=2)
+
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(claim_jobs('reports', 2, 'me:1', max_running=2), [])
+        self.assertEqual(Job.objects.filter(status='running').count(), 2)
+
+    def test_ensure_scheduled_checks_after_taking_lock(self):
+        def other_worker_enqueues(name):
+            # Worker khác tạo lần chạy kế tiếp trong lúc worker này chờ khóa
+            enqueue('shop.tests.noop')
+
+        with mock.patch.object(jobs, '_lock', side_effect=other_worker_enqueues) as lock:
+            ensure_scheduled({'shop.tests.noop': 60})
+
+        lock.assert_called_once_with('schedule:shop.tests.noop')
+        self.assertEqual(Job.objects.filter(task='shop.tests.noop').count(), 1)
+
+        ensure_scheduled({'shop.tests.noop': 60})
+        self.assertEqual(Job.objects.filter(task='shop.tests.noop').count(), 1)
+
+
+# ========== LIVE STOCK ==========
+
+class StockEventsTests(TestCase):
+    """Luồng SSE chỉ phục vụ qua ASGI; kết nối chỉ đăng ký khi bắt đầu phát"""
+
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name='Kho A', location='HN')
+
+    def test_wsgi_gets_no_stream_and_no_script(self):
+        response = self.client.get(reverse('stock_events'))
+        self.assertEqual(response.status_code, 204)
+
+        page = self.client.get(reverse('warehouse_detail', args=[self.warehouse.id]))
+        self.assertNotContains(page, 'EventSource')
+
+    async def test_asgi_page_opens_stream(self):
+        page = await AsyncClient().get(reverse('warehouse_detail', args=[self.warehouse.id]))
+        self.assertContains(page, 'EventSource')
+
+    async def test_subscribes_only_while_streaming(self):
+        events = stream_events(self.warehouse.id, keepalive=1)
+        self.assertEqual(stock_feed.listener_count(), 0)
+        await anext(events)
+        self.assertEqual(stock_feed.listener_count(), 1)
+        await events.aclose()
+        self.assertEqual(stock_feed.listener_count(), 0)
+
+
+# ========== OUTBOX ==========
+
+class ReadAfterTests(TestCase):
+    """read_after: dừng ở khoảng trống ID mới, bỏ qua khoảng trống đã cũ"""
+
+    def event(self, event_id, age_seconds=0):
+        return OutboxEvent.objects.create(
+            id=event_id, topic='product', object_id=1, event_type='updated',
+            created_at=timezone.now() - timedelta(seconds=age_seconds),
+        )
+
+    def test_stops_at_recent_gap(self):
+        self.event(1)
+        self.event(2)
+        self.event(4)
+        events, high_water = read_after(0, 10, gap_timeout=timedelta(seconds=60))
+        self.assertEqual([event.id for event in events], [1, 2])
+        self.assertEqual(high_water, 2)
+
+    def test_skips_settled_gap(self):
+        self.event(1, age_seconds=600)
+        self.event(3, age_seconds=600)
+        self.event(5)
+        events, high_water = read_after(0, 10, gap_timeout=timedelta(seconds=60))
+        self.assertEqual([event.id for event in events], [1, 3])
+        self.assertEqual(high_water, 3)
+
+    def test_empty_keeps_position(self):
+        self.assertEqual(read_after(7, 10), ([], 7))
+
+
+class OutboxDeleteEventTests(TestCase):
+    """Sự kiện 'deleted' cho mọi cách xóa và sự kiện cho các đường update() của tồn kho"""
+
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name='Kho A', location='HN')
+        self.product = make_product('PEN')
+        self.stock = WarehouseStock.objects.create(warehouse=self.warehouse, product=self.product, quantity=10)
+
+    def events(self, topic, event_type):
+        return list(OutboxEvent.objects.filter(topic=topic, event_type=event_type).values_list('object_id', flat=True))
+
+    def test_queryset_delete(self):
+        order = make_order([(self.product, 1)])
+        Order.objects.filter(id=order.id).delete()
+        self.assertEqual(self.events('order', 'deleted'), [order.id])
+
+    def test_cascade_delete(self):
+        self.warehouse.delete()
+        self.assertEqual(self.events('warehouse_stock', 'deleted'), [self.stock.id])
+
+    def test_instance_delete_recorded_once(self):
+        product_id = self.product.id
+        self.product.delete()
+        self.assertEqual(self.events('product', 'deleted'), [product_id])
+        self.assertEqual(self.events('warehouse_stock', 'deleted'), [self.stock.id])
+
+    def test_demote_and_sync_record_events(self):
+        promote(self.stock, shard_count=2)
+        adjust_stock(self.stock, 5)
+        OutboxEvent.objects.all().delete()
+
+        self.assertEqual(sync_sharded_quantities(), 1)
+        self.assertEqual(sync_sharded_quantities(), 0)
+        adjust_stock(self.stock, -3)
+        demote(self.stock)
+
+        payloads = list(OutboxEvent.objects.filter(topic='warehouse_stock').order_by('id').values_list('payload', flat=True))
+        self.assertEqual([payload.get('quantity') for payload in payloads], [15, None, 12])
@@ -0,0 +1,129 @@
+"""
+Chuỗi thời gian mức tồn kho cho biểu đồ
+
+Tồn kho tại đầu khoảng được lấy từ ảnh chụp gần nhất (shop.snapshots), sau
+đó số dư chạy được tính bằng tổng tích lũy (NumPy cumsum) trên các chuyển
+động trong khoảng. Chuỗi được rút gọn về số điểm yêu cầu bằng thuật toán
+Largest-Triangle-Three-Buckets (LTTB) để giữ nguyên hình dạng đỉnh/đáy.
+"""
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Max
+
+from .models import StockMovement, StockMovementArchive, WarehouseStock
+from .snapshots import stock_at
+
+
+CACHE_TIMEOUT = 60 * 60
+CACHE_STEP_SECONDS = 60
+
+
+def lttb(x, y, threshold):
+    """
+    Rút gọn chuỗi (x, y) về `threshold` điểm bằng Largest-Triangle-Three-Buckets.
+
+    Luôn giữ điểm đầu và điểm cuối; mỗi bucket ở giữa chọn điểm tạo tam giác
+    lớn nhất với điểm đã chọn trước đó và trung bình của bucket kế tiếp.
+
+    Trả về:
+        np.ndarray: Chỉ số các điểm được giữ lại (tăng dần)
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Biên các bucket cho n - 2 điểm ở giữa
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        px, py = x[previous], y[previous]
+        area = np.abs(
+            (px - avg_x) * (y[start:end] - py) - (px - x[start:end]) * (avg_y - py)
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def _movement_arrays(ws_ids, start, end):
+    """Đọc (thời điểm, số lượng) của các chuyển động trong (start, end] vào mảng NumPy"""
+    times, quantities = [], []
+    for model in (StockMovementArchive, StockMovement):
+        rows = (
+            model.objects
+            .filter(warehouse_stock_id__in=ws_ids, created_at__gt=start, created_at__lte=end)
+            .order_by()
+            .values_list('created_at', 'quantity')
+        )
+        for created_at, quantity in rows.iterator(chunk_size=10000):
+            times.append(created_at.timestamp())
+            quantities.append(quantity)
+
+    t = np.asarray(times, dtype=np.float64)
+    q = np.asarray(quantities, dtype=np.int64)
+    order = np.argsort(t, kind='stable')
+    return t[order], q[order]
+
+
+def last_movement_id(ws_ids):
+    """ID chuyển động mới nhất của các dòng tồn kho (dùng làm khóa cache)"""
+    return StockMovement.objects.filter(
+        warehouse_stock_id__in=ws_ids
+    ).aggregate(last=Max('id'))['last'] or 0
+
+
+def stock_series(product_id, start, end, warehouse_id=None, points=500):
+    """
+    Chuỗi mức tồn kho của một sản phẩm (một kho hoặc tổng các kho) trong [start, end].
+
+    Kết quả được cache theo sản phẩm, kho, độ dài khoảng, số điểm, `end` đã
+    làm tròn và ID chuyển động mới nhất, nên cache tự mất hiệu lực khi có
+    chuyển động mới.
+
+    Trả về:
+        list[tuple]: [(timestamp giây, số lượng), ...] tối đa `points` điểm
+    """
+    stocks = WarehouseStock.objects.filter(product_id=product_id)
+    if warehouse_id:
+        stocks = stocks.filter(warehouse_id=warehouse_id)
+    ws_ids = list(stocks.values_list('id', flat=True))
+    if not ws_ids:
+        return []
+
+    # Khóa theo độ dài khoảng và `end` làm tròn theo độ rộng một điểm (tối thiểu
+    # CACHE_STEP_SECONDS), không theo từng giây, nên request liên tiếp dùng lại được
+    span = int((end - start).total_seconds())
+    step = max(span // points, CACHE_STEP_SECONDS)
+    cache_key = 'stock-series:{}:{}:{}:{}:{}:{}'.format(
+        product_id, warehouse_id or 'all', span, points,
+        int(end.timestamp()) // step, last_movement_id(ws_ids),
+    )
+    series = cache.get(cache_key)
+    if series is not None:
+        # Cùng ID chuyển động mới nhất: mức cuối cùng giữ nguyên tới `end`
+        return series[:-1] + [(end.timestamp(), series[-1][1])]
+
+    base = sum(stock_at(ws_id, start) for ws_id in ws_ids)
+    t, q = _movement_arrays(ws_ids, start, end)
+
+    x = np.concatenate(([start.timestamp()], t, [end.timestamp()]))
+    balance = base + np.cumsum(q)
+    y = np.concatenate(([base], balance, [balance[-1] if len(balance) else base])).astype(np.float64)
+
+    keep = lttb(x, y, points)
+    series = [(float(x[i]), int(y[i])) for i in keep]
+    cache.set(cache_key, series, CACHE_TIMEOUT)
+    return series
@@ -5,16 +5,23 @@ urlpatterns = [
     # Home & Products
     path('', views.home, name='home'),
     path('product/<int:id>/', views.product_detail, name='product_detail'),
+    path('search/', views.search, name='search'),
+    path('api/autocomplete/', views.autocomplete, name='autocomplete'),
     
     # Shopping Cart
     path('add-to-cart/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
     path('cart/', views.cart_view, name='cart'),
     path('remove-from-cart/<int:product_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('update-cart/<int:product_id>/', views.update_cart, name='update_cart'),
+    path('quick-order/', views.quick_order, name='quick_order'),
+    path('api/cart/add/<int:product_id>/', views.cart_api_add, name='cart_api_add'),
+    path('api/cart/update/<int:product_id>/', views.cart_api_update, name='cart_api_update'),
+    path('api/cart/remove/<int:product_id>/', views.cart_api_remove, name='cart_api_remove'),
     
     # Checkout
     path('checkout/', views.checkout, name='checkout'),
     path('checkout-success/', views.checkout_success, name='checkout_success'),
+    path('waiting-room/', views.waiting_room, name='waiting_room'),
     
     # Authentication - Đăng nhập, Đăng ký, Đăng xuất
     path('register/', views.register, name='register'),
@@ -28,7 +35,14 @@ urlpatterns = [
     # Warehouse Management - Quản lý kho hàng
     path('warehouses/', views.warehouse_list, name='warehouse_list'),
     path('warehouse/<int:warehouse_id>/', views.warehouse_detail, name='warehouse_detail'),
+    path('warehouse/<int:warehouse_id>/pick-list/', views.pick_list, name='pick_list'),
     path('product/<int:product_id>/availability/', views.product_warehouse_availability, name='product_availability'),
+    path('low-stock/', views.low_stock_report, name='low_stock_report'),
+    path('api/stock-series/', views.stock_timeseries, name='stock_timeseries'),
     path('stock-movements/', views.stock_movement_log, name='stock_movement_log'),
+    path('api/stock-events/', views.stock_events, name='stock_events'),
     path('warehouse-statistics/', views.warehouse_statistics, name='warehouse_statistics'),
+    path('sales-report/', views.sales_report, name='sales_report'),
+    path('api/load-metrics/', views.load_metrics, name='load_metrics'),
+    path('api/outbox-lag/', views.outbox_status, name='outbox_status'),
 ]
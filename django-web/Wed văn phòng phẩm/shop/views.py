@@ -3,34 +3,48 @@ View Django cho Cửa hàng Văn Phòng Phẩm
 Xử lý: Sản phẩm, Giỏ hàng, Đơn hàng, Người dùng, Kho hàng, Quản lý tồn kho
 """
 
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_POST
+from datetime import timedelta
 from decimal import Decimal
 
 from .models import (
-    Product, Category, Order, UserProfile,
-    Warehouse, WarehouseStock, StockMovement
+    Product, Category, Order, OrderItem, UserProfile,
+    Warehouse, WarehouseStock, StockMovement, DemandForecast
+)
+from .forms import RegisterForm, LoginForm, UserProfileForm, QuickOrderForm
+from .archival import day_bounds, movement_summary
+from .autocomplete import suggest
+from .facets import PRICE_BANDS, filter_catalog
+from .live_stock import stream_events, streaming_supported
+from .middleware import priority_metrics
+from .outbox import outbox_lag
+from .cart import clear_cart, load_cart, save_cart
+from .picking import build_pick_waves
+from .reports import category_movement_report, last_refreshed, revenue_report
+from .search import MAX_RESULTS, search_products
+from .tasks import process_avatar
+from .timeseries import stock_series
+from .waiting_room import (
+    QueueStatus, admitted_upto, is_enabled as waiting_room_enabled, issue_ticket,
+    queue_status, release_ticket, set_ticket_cookie, waiting_room_required,
 )
-from .forms import RegisterForm, LoginForm, UserProfileForm
 
 
 # ========== HELPER FUNCTIONS ==========
 
-def get_cart_from_session(request):
-    """Lấy giỏ hàng từ session và chuyển đổi key thành string"""
-    cart = request.session.get('cart', {})
-    return {str(k): v for k, v in cart.items()}
-
-
-def save_cart_to_session(request, cart):
-    """Lưu giỏ hàng vào session"""
-    request.session['cart'] = cart
-    request.session.modified = True
-
-
 def calculate_cart_totals(cart):
     """
     Tính toán tổng giá và danh sách sản phẩm từ giỏ hàng.
@@ -40,9 +54,12 @@ def calculate_cart_totals(cart):
     """
     cart_items = []
     total_price = Decimal('0')
+    products = Product.objects.in_bulk([int(product_id_str) for product_id_str in cart])
     
     for product_id_str, quantity in cart.items():
-        product = get_object_or_404(Product, id=int(product_id_str))
+        product = products.get(int(product_id_str))
+        if product is None:
+            raise Http404('Sản phẩm trong giỏ hàng không tồn tại')
         subtotal = product.price * quantity
         
         cart_items.append({
@@ -55,10 +72,12 @@ def calculate_cart_totals(cart):
     return cart_items, total_price
 
 
-def clear_cart_session(request):
-    """Xóa giỏ hàng trong session"""
-    request.session['cart'] = {}
-    request.session.modified = True
+def get_date_param(request, name):
+    """Ngày YYYY-MM-DD trong query string; None nếu thiếu hoặc không hợp lệ (vd. 2024-02-30)"""
+    try:
+        return parse_date(request.GET.get(name) or '')
+    except ValueError:
+        return None
 
 
 # ============================================================
@@ -66,24 +85,65 @@ def clear_cart_session(request):
 # ============================================================
 
 def home(request):
-    """Hiển thị danh sách sản phẩm với lọc theo danh mục"""
-    categories = Category.objects.all()
-    category_id = request.GET.get('category')
+    """Hiển thị danh sách sản phẩm, lọc kết hợp theo danh mục, khoảng giá và còn hàng"""
+    selection = {
+        'category': [int(value) for value in request.GET.getlist('category') if value.isdigit()],
+        'price': [value for value in request.GET.getlist('price') if value in {band[0] for band in PRICE_BANDS}],
+        'stock': [True] if request.GET.get('in_stock') else [],
+    }
+    product_ids, counts = filter_catalog(selection)
     
-    # Lọc sản phẩm theo danh mục nếu được chỉ định
-    if category_id:
-        products = Product.objects.filter(category_id=category_id)
-    else:
-        products = Product.objects.all()
+    # Phân trang trên danh sách ID, chỉ nạp sản phẩm của trang hiện tại
+    page_obj = Paginator(product_ids, 24).get_page(request.GET.get('page'))
+    products = Product.objects.in_bulk(list(page_obj.object_list))
+    
+    categories = [
+        (category, counts['category'].get(category.id, 0))
+        for category in Category.objects.all()
+    ]
+    price_bands = [(key, label, counts['price'].get(key, 0)) for key, label, _, _ in PRICE_BANDS]
+    
+    query = request.GET.copy()
+    query.pop('page', None)
     
     context = {
-        'products': products,
+        'products': [products[pid] for pid in page_obj.object_list if pid in products],
+        'page_obj': page_obj,
         'categories': categories,
-        'selected_category': category_id,
+        'price_bands': price_bands,
+        'in_stock_count': counts['stock'].get(True, 0),
+        'selection': selection,
+        'filter_query': query.urlencode(),
     }
     return render(request, 'home.html', context)
 
 
+def search(request):
+    """Tìm kiếm sản phẩm (không phân biệt dấu), xếp hạng và phân trang"""
+    query = request.GET.get('q', '').strip()
+    page_obj, products = search_products(query, page=request.GET.get('page', 1))
+    
+    context = {
+        'query': query,
+        'products': products,
+        'page_obj': page_obj,
+        'max_results': MAX_RESULTS,
+    }
+    return render(request, 'search.html', context)
+
+
+def autocomplete(request):
+    """API JSON: gợi ý sản phẩm theo tên/SKU khi gõ (đọc từ chỉ mục trong bộ nhớ)"""
+    query = request.GET.get('q', '')[:100]
+    results = [
+        {'id': product_id, 'name': name, 'sku': sku, 'url': reverse('product_detail', args=[product_id])}
+        for product_id, name, sku in suggest(query)
+    ]
+    response = JsonResponse({'query': query, 'results': results})
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
 def product_detail(request, id):
     """Hiển thị chi tiết sản phẩm"""
     product = get_object_or_404(Product, id=id)
@@ -95,25 +155,26 @@ def product_detail(request, id):
 # ============================================================
 
 def add_to_cart(request, product_id):
-    """Thêm sản phẩm vào giỏ hàng"""
-    cart = get_cart_from_session(request)
-    product_id_str = str(product_id)
+    """Thêm sản phẩm vào giỏ hàng (chỉ POST; GET không thay đổi giỏ hàng)"""
+    if request.method != 'POST':
+        return redirect('product_detail', id=product_id)
     
-    # Tăng số lượng hoặc thêm mới
-    cart[product_id_str] = cart.get(product_id_str, 0) + 1
-    save_cart_to_session(request, cart)
+    cart = load_cart(request)
+    _add_cart_line(cart, product_id)
+    save_cart(request, cart)
     
     return redirect(request.META.get('HTTP_REFERER', 'home'))
 
 
 def remove_from_cart(request, product_id):
-    """Xóa sản phẩm khỏi giỏ hàng"""
-    cart = get_cart_from_session(request)
-    product_id_str = str(product_id)
+    """Xóa sản phẩm khỏi giỏ hàng (chỉ POST để có kiểm tra CSRF)"""
+    if request.method != 'POST':
+        return redirect('cart')
     
-    if product_id_str in cart:
-        del cart[product_id_str]
-        save_cart_to_session(request, cart)
+    cart = load_cart(request)
+    
+    if _remove_cart_line(cart, product_id):
+        save_cart(request, cart)
     
     return redirect('cart')
 
@@ -124,21 +185,171 @@ def update_cart(request, product_id):
         return redirect('cart')
     
     quantity = int(request.POST.get('quantity', 1))
-    cart = get_cart_from_session(request)
-    product_id_str = str(product_id)
+    cart = load_cart(request)
+    _set_cart_line(cart, product_id, quantity)
     
+    save_cart(request, cart)
+    return redirect('cart')
+
+
+def _add_cart_line(cart, product_id, quantity=1):
+    """Tăng số lượng hoặc thêm mới một dòng giỏ hàng"""
+    product_id_str = str(product_id)
+    cart[product_id_str] = cart.get(product_id_str, 0) + quantity
+
+
+def _set_cart_line(cart, product_id, quantity):
+    """Đặt số lượng của một dòng; số lượng <= 0 thì xóa dòng"""
+    product_id_str = str(product_id)
     if quantity > 0:
         cart[product_id_str] = quantity
     elif product_id_str in cart:
         del cart[product_id_str]
+
+
+def _remove_cart_line(cart, product_id):
+    """Xóa một dòng giỏ hàng, trả về True nếu giỏ hàng thay đổi"""
+    return cart.pop(str(product_id), None) is not None
+
+
+# ========== CART API (AJAX) ==========
+
+def _cart_json(cart, product):
+    """
+    Hàm trợ giúp: Phản hồi JSON sau khi thay đổi giỏ hàng.
     
-    save_cart_to_session(request, cart)
-    return redirect('cart')
+    Trả về dòng vừa thay đổi, số dòng và tổng tiền để trang cập nhật
+    mà không cần tải lại.
+    """
+    _, total_price = calculate_cart_totals(cart)
+    quantity = cart.get(str(product.id), 0)
+    return JsonResponse({
+        'product_id': product.id,
+        'quantity': quantity,
+        'subtotal': str(product.price * quantity),
+        'cart_count': len(cart),
+        'total_price': str(total_price),
+    })
+
+
+@require_POST
+def cart_api_add(request, product_id):
+    """API: thêm sản phẩm vào giỏ hàng (POST, tham số quantity mặc định 1)"""
+    product = get_object_or_404(Product, id=product_id)
+    try:
+        quantity = int(request.POST.get('quantity', 1))
+    except ValueError:
+        return JsonResponse({'error': 'Số lượng không hợp lệ'}, status=400)
+    if quantity < 1:
+        return JsonResponse({'error': 'Số lượng không hợp lệ'}, status=400)
+    
+    cart = load_cart(request)
+    _add_cart_line(cart, product.id, quantity)
+    save_cart(request, cart)
+    return _cart_json(cart, product)
+
+
+@require_POST
+def cart_api_update(request, product_id):
+    """API: đặt số lượng một dòng giỏ hàng (POST, quantity <= 0 để xóa)"""
+    product = get_object_or_404(Product, id=product_id)
+    try:
+        quantity = int(request.POST.get('quantity', 1))
+    except ValueError:
+        return JsonResponse({'error': 'Số lượng không hợp lệ'}, status=400)
+    
+    cart = load_cart(request)
+    _set_cart_line(cart, product.id, quantity)
+    save_cart(request, cart)
+    return _cart_json(cart, product)
+
+
+@require_POST
+def cart_api_remove(request, product_id):
+    """API: xóa một dòng khỏi giỏ hàng (POST)"""
+    product = get_object_or_404(Product, id=product_id)
+    cart = load_cart(request)
+    if _remove_cart_line(cart, product.id):
+        save_cart(request, cart)
+    return _cart_json(cart, product)
+
+
+def quick_order(request):
+    """Đặt hàng nhanh: thêm hàng loạt sản phẩm vào giỏ từ danh sách `sku,số lượng`"""
+    report = None
+    
+    if request.method == 'POST':
+        form = QuickOrderForm(request.POST, request.FILES)
+        if form.is_valid():
+            report = _merge_quick_order(request, form.cleaned_data['entries'])
+            report['invalid'] = form.cleaned_data['invalid']
+            if report['added']:
+                messages.success(request, f"Đã thêm {len(report['added'])} sản phẩm vào giỏ hàng!")
+            if not (report['unknown'] or report['out_of_stock'] or report['reduced'] or report['invalid']):
+                return redirect('cart')
+    else:
+        form = QuickOrderForm()
+    
+    context = {
+        'form': form,
+        'report': report,
+    }
+    return render(request, 'quick_order.html', context)
+
+
+def _merge_quick_order(request, entries):
+    """
+    Hàm trợ giúp: Tra cứu toàn bộ SKU bằng một truy vấn và gộp vào giỏ hàng.
+    
+    Tham số:
+        request: Đối tượng request của Django
+        entries: Danh sách (số dòng, sku, số lượng) đã kiểm tra cú pháp
+    
+    Trả về:
+        dict: Các dòng đã thêm, bị giảm số lượng, không có SKU, hết hàng
+    """
+    requested = {}
+    for line_no, sku, quantity in entries:
+        requested[sku] = requested.get(sku, 0) + quantity
+    
+    # Một truy vấn theo chỉ mục unique của sku
+    products = {
+        product.sku: product
+        for product in Product.objects.filter(sku__in=list(requested))
+        .only('id', 'sku', 'name', 'available_quantity')
+    }
+    
+    cart = load_cart(request)
+    report = {'added': [], 'reduced': [], 'unknown': [], 'out_of_stock': []}
+    
+    for sku, quantity in requested.items():
+        product = products.get(sku)
+        if product is None:
+            report['unknown'].append(sku)
+            continue
+        
+        product_id_str = str(product.id)
+        in_cart = cart.get(product_id_str, 0)
+        available = product.available_quantity - in_cart
+        if available <= 0:
+            report['out_of_stock'].append(product)
+            continue
+        
+        if quantity > available:
+            report['reduced'].append((product, quantity, available))
+            quantity = available
+        cart[product_id_str] = in_cart + quantity
+        report['added'].append((product, quantity))
+    
+    # Chỉ ghi giỏ hàng một lần cho cả danh sách
+    if report['added']:
+        save_cart(request, cart)
+    return report
 
 
 def cart_view(request):
     """Hiển thị trang giỏ hàng"""
-    cart = get_cart_from_session(request)
+    cart = load_cart(request)
     cart_items, total_price = calculate_cart_totals(cart)
     
     context = {
@@ -153,9 +364,10 @@ def cart_view(request):
 # CHECKOUT VIEWS
 # ============================================================
 
+@waiting_room_required
 def checkout(request):
     """Xử lý thanh toán từ giỏ hàng"""
-    cart = get_cart_from_session(request)
+    cart = load_cart(request)
     
     # Kiểm tra giỏ hàng không trống
     if not cart:
@@ -197,19 +409,29 @@ def _create_order(request, cart):
         return redirect('checkout')
     
     # Tính tổng tiền của đơn hàng
-    _, total_price = calculate_cart_totals(cart)
+    cart_items, total_price = calculate_cart_totals(cart)
     
-    # Tạo bản ghi đơn hàng trong cơ sở dữ liệu
-    order = Order.objects.create(
-        user=request.user if request.user.is_authenticated else None,
-        customer_name=customer_name,
-        phone=phone,
-        address=address,
-        total_price=total_price,
-    )
+    # Tạo bản ghi đơn hàng và các dòng sản phẩm trong cơ sở dữ liệu
+    with transaction.atomic():
+        order = Order.objects.create(
+            user=request.user if request.user.is_authenticated else None,
+            customer_name=customer_name,
+            phone=phone,
+            address=address,
+            total_price=total_price,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=item['product'],
+                quantity=item['quantity'],
+                price=item['product'].price,
+            )
+            for item in cart_items
+        ])
     
     # Xóa giỏ hàng sau khi đặt hàng thành công
-    clear_cart_session(request)
+    clear_cart(request)
     messages.success(request, 'Đặt hàng thành công! Cảm ơn bạn!')
     
     return redirect('checkout_success')
@@ -217,7 +439,39 @@ def _create_order(request, cart):
 
 def checkout_success(request):
     """Hiển thị trang xác nhận đặt hàng thành công"""
-    return render(request, 'checkout_success.html')
+    response = render(request, 'checkout_success.html')
+    release_ticket(response)
+    return response
+
+
+def waiting_room(request):
+    """
+    Trang chờ khi khuyến mãi: hiển thị vị trí và thời gian chờ ước tính,
+    tự tải lại cho tới khi tới lượt thì chuyển sang thanh toán.
+    """
+    if not waiting_room_enabled():
+        return redirect('checkout')
+
+    status = queue_status(request)
+    if status is not None and status.admitted:
+        return redirect('checkout')
+
+    new_ticket = None
+    if status is None:
+        new_ticket = issue_ticket()
+        status = QueueStatus(ticket=new_ticket, admitted_upto=admitted_upto())
+        if status.admitted:
+            response = redirect('checkout')
+            set_ticket_cookie(response, new_ticket)
+            return response
+
+    response = render(request, 'waiting_room.html', {
+        'status': status,
+        'refresh_seconds': settings.WAITING_ROOM_REFRESH_SECONDS,
+    })
+    if new_ticket is not None:
+        set_ticket_cookie(response, new_ticket)
+    return response
 
 
 # ============================================================
@@ -310,6 +564,9 @@ def user_profile(request):
         form = UserProfileForm(request.POST, request.FILES, instance=user_profile)
         if form.is_valid():
             form.save()
+            if 'avatar' in form.changed_data and user_profile.avatar:
+                # Thu nhỏ ảnh ngoài request (lệnh runworker)
+                process_avatar.enqueue(profile_id=user_profile.id)
             messages.success(request, 'Cập nhật hồ sơ thành công!')
             return redirect('user_profile')
     else:
@@ -358,11 +615,30 @@ def warehouse_detail(request, warehouse_id):
     context = {
         'warehouse': warehouse,
         'warehouse_stocks': warehouse_stocks,
+        'live_stock': streaming_supported(request),
         'page_title': f'Kho: {warehouse.name}',
     }
     return render(request, 'warehouse/warehouse_detail.html', context)
 
 
+@staff_member_required
+def pick_list(request, warehouse_id):
+    """Danh sách lấy hàng theo đợt của một kho (bản in)"""
+    warehouse = get_object_or_404(Warehouse, id=warehouse_id, is_active=True)
+    try:
+        wave_size = min(max(int(request.GET.get('wave_size', 50)), 1), 1000)
+    except ValueError:
+        wave_size = 50
+    
+    context = {
+        'warehouse': warehouse,
+        'waves': build_pick_waves(warehouse.id, wave_size=wave_size),
+        'wave_size': wave_size,
+        'page_title': f'Lấy hàng: {warehouse.name}',
+    }
+    return render(request, 'warehouse/pick_list.html', context)
+
+
 def product_warehouse_availability(request, product_id):
     """Xem tồn kho của một sản phẩm ở các kho khác nhau"""
     product = get_object_or_404(Product, id=product_id)
@@ -382,6 +658,86 @@ def product_warehouse_availability(request, product_id):
     return render(request, 'warehouse/product_availability.html', context)
 
 
+def low_stock_report(request):
+    """Danh sách dòng tồn kho cần đặt hàng lại, sắp xếp theo số ngày tồn kho còn lại"""
+    forecasts = DemandForecast.objects.filter(
+        needs_reorder=True,
+        warehouse_stock__warehouse__is_active=True,
+    ).select_related(
+        'warehouse_stock__product',
+        'warehouse_stock__warehouse',
+    ).order_by('days_of_cover')
+    
+    warehouse_id = request.GET.get('warehouse')
+    if warehouse_id:
+        forecasts = forecasts.filter(warehouse_stock__warehouse_id=warehouse_id)
+    
+    context = {
+        'forecasts': forecasts[:200],
+        'warehouses': Warehouse.objects.filter(is_active=True),
+        'selected_warehouse': warehouse_id,
+        'page_title': 'Hàng Sắp Hết',
+    }
+    return render(request, 'warehouse/low_stock.html', context)
+
+
+@staff_member_required
+def load_metrics(request):
+    """Trạng thái giới hạn theo lớp ưu tiên của tiến trình xử lý request này (JSON)"""
+    return JsonResponse({'classes': priority_metrics()})
+
+
+@staff_member_required
+def outbox_status(request):
+    """Độ trễ của các consumer outbox so với sự kiện mới nhất (JSON)"""
+    return JsonResponse({'consumers': outbox_lag()})
+
+
+def stock_timeseries(request):
+    """API JSON: chuỗi mức tồn kho của sản phẩm theo thời gian (đã rút gọn) cho biểu đồ"""
+    try:
+        product_id = int(request.GET.get('product') or 0)
+        warehouse_id = int(request.GET['warehouse']) if request.GET.get('warehouse') else None
+        days = min(max(int(request.GET.get('days', 365)), 1), 3650)
+        points = min(max(int(request.GET.get('points', 500)), 3), 5000)
+    except ValueError:
+        return JsonResponse({'error': 'Tham số không hợp lệ'}, status=400)
+    product = get_object_or_404(Product, id=product_id)
+    
+    end = timezone.now()
+    start = end - timedelta(days=days)
+    series = stock_series(product.id, start, end, warehouse_id=warehouse_id, points=points)
+    
+    return JsonResponse({
+        'product': product.id,
+        'warehouse': warehouse_id,
+        'points': [[int(ts * 1000), quantity] for ts, quantity in series],
+    })
+
+
+async def stock_events(request):
+    """
+    Luồng SSE thay đổi tồn kho (?warehouse=<id> để lọc theo kho) cho trang
+    chi tiết kho và lịch sử chuyển động; chỉ phục vụ qua asgi.py.
+    """
+    if not streaming_supported(request):
+        # 204: EventSource dừng hẳn, không kết nối lại
+        return HttpResponse(status=204)
+    try:
+        warehouse_id = int(request.GET['warehouse']) if request.GET.get('warehouse') else None
+    except ValueError:
+        return JsonResponse({'error': 'Tham số không hợp lệ'}, status=400)
+
+    response = StreamingHttpResponse(
+        stream_events(warehouse_id, keepalive=settings.LIVE_STOCK_KEEPALIVE_SECONDS),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Không để nginx gom bộ đệm làm trễ sự kiện
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 def stock_movement_log(request):
     """Xem lịch sử chuyển động hàng hóa"""
     movements = StockMovement.objects.all().select_related(
@@ -400,12 +756,27 @@ def stock_movement_log(request):
     if warehouse_id:
         movements = movements.filter(warehouse_stock__warehouse_id=warehouse_id)
     
+    # Khoảng ngày cho bảng tổng hợp (mặc định 30 ngày gần nhất)
+    date_to = get_date_param(request, 'date_to') or timezone.localdate()
+    date_from = get_date_param(request, 'date_from') or date_to - timedelta(days=29)
+    if request.GET.get('date_from') or request.GET.get('date_to'):
+        # Lọc theo khoảng datetime để dùng được index trên created_at
+        start, end = day_bounds(date_from, date_to)
+        movements = movements.filter(created_at__gte=start, created_at__lt=end)
+    
+    # Tổng hợp: phần đã lưu trữ đọc từ bảng tổng hợp theo ngày, phần gần đây đọc từ bảng gốc
+    summary = movement_summary(date_from, date_to, warehouse_id=warehouse_id, movement_type=movement_type)
+    
     context = {
         'movements': movements[:100],  # Giới hạn lấy 100 bản ghi chuyển động gần nhất
         'movement_types': StockMovement.MOVEMENT_TYPES,
         'warehouses': Warehouse.objects.filter(is_active=True),
         'selected_type': movement_type,
         'selected_warehouse': warehouse_id,
+        'date_from': date_from,
+        'date_to': date_to,
+        'summary': summary,
+        'live_stock': streaming_supported(request),
         'page_title': 'Lịch Sử Chuyển Động Hàng',
     }
     return render(request, 'warehouse/stock_movement_log.html', context)
@@ -445,3 +816,21 @@ def warehouse_statistics(request):
         'page_title': 'Thống Kê Kho Hàng',
     }
     return render(request, 'warehouse/statistics.html', context)
+
+
+@staff_member_required
+def sales_report(request):
+    """Báo cáo doanh thu và chuyển động hàng (chỉ đọc từ bảng tổng hợp)"""
+    date_to = get_date_param(request, 'date_to') or timezone.localdate()
+    date_from = get_date_param(request, 'date_from') or date_to - timedelta(days=29)
+    
+    context = {
+        'revenue': revenue_report(date_from, date_to),
+        'category_movements': category_movement_report(date_from, date_to),
+        'movement_types': StockMovement.MOVEMENT_TYPES,
+        'last_refreshed': last_refreshed(),
+        'date_from': date_from,
+        'date_to': date_to,
+        'page_title': 'Báo Cáo Bán Hàng',
+    }
+    return render(request, 'warehouse/sales_report.html', context)
@@ -0,0 +1,230 @@
+"""
+Phòng chờ ảo (virtual waiting room) cho thanh toán khi khuyến mãi
+
+Khi bật WAITING_ROOM_ENABLED, mỗi người mua vào trang thanh toán được cấp một
+số thứ tự (bộ đếm nguyên tử) lưu trong cookie đã ký. Mốc "đã cho vào" tăng
+dần theo WAITING_ROOM_ADMIT_PER_MINUTE nhưng không vượt quá số vé đã phát, nên
+lúc vắng không tích lũy suất để rồi dồn một lúc. Vé có số <= mốc thì được thanh toán
+trong WAITING_ROOM_TICKET_TTL giây; vé chưa tới lượt được chuyển tới trang chờ
+hiển thị vị trí và thời gian chờ ước tính.
+
+Ngoài ra số request thanh toán chạy đồng thời bị giới hạn bởi
+WAITING_ROOM_MAX_ACTIVE, để phần lớn worker vẫn rảnh phục vụ trang danh mục:
+mỗi request giữ một trong WAITING_ROOM_MAX_ACTIVE suất, suất có hạn
+ACTIVE_LEASE_SECONDS nên worker chết giữa chừng không giữ suất mãi.
+
+Trạng thái nằm trong bảng WaitingRoomCounter (dùng chung giữa các tiến trình)
+và chỉ được đổi bằng UPDATE nguyên tử hoặc có điều kiện (so sánh rồi ghi),
+không đọc-sửa-ghi qua cache.
+"""
+
+import math
+import random
+import time
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import F
+from django.shortcuts import redirect, render
+
+from .models import WaitingRoomCounter
+
+
+TICKET_COOKIE = 'wr_ticket'
+TICKET_SALT = 'shop.waiting_room'
+
+ISSUED = 'issued'
+ADMITTED = 'admitted'
+ACTIVE_SLOT_PREFIX = 'active:'
+
+# Hạn giữ một suất thanh toán (giây), dài hơn mọi request thanh toán
+ACTIVE_LEASE_SECONDS = 120
+
+
+def is_enabled():
+    return getattr(settings, 'WAITING_ROOM_ENABLED', False)
+
+
+def _admit_rate():
+    """Số người được cho vào mỗi giây"""
+    return settings.WAITING_ROOM_ADMIT_PER_MINUTE / 60.0
+
+
+def _counter_value(name, default=0):
+    value = WaitingRoomCounter.objects.filter(name=name).values_list('value', flat=True).first()
+    return default if value is None else value
+
+
+def _incr(name, delta=1):
+    """Cộng nguyên tử vào bộ đếm `name` và trả về giá trị mới"""
+    counters = WaitingRoomCounter.objects.filter(name=name)
+    with transaction.atomic():
+        if not counters.update(value=F('value') + delta):
+            WaitingRoomCounter.objects.get_or_create(name=name)
+            counters.update(value=F('value') + delta)
+        # Dòng còn bị khóa bởi UPDATE tới khi commit: giá trị đọc được là của chính lần cộng này
+        return counters.values_list('value', flat=True).get()
+
+
+@dataclass
+class QueueStatus:
+    ticket: int
+    admitted_upto: int
+
+    @property
+    def admitted(self):
+        return self.ticket <= self.admitted_upto
+
+    @property
+    def position(self):
+        return max(self.ticket - self.admitted_upto, 0)
+
+    @property
+    def eta_seconds(self):
+        return math.ceil(self.position / _admit_rate()) if self.position else 0
+
+
+def issue_ticket():
+    """Cấp số thứ tự tiếp theo"""
+    # Khởi tạo mốc trước khi phát vé để đợt vé đầu tiên cũng phải xếp hàng
+    admitted_upto()
+    return _incr(ISSUED)
+
+
+def admitted_upto():
+    """
+    Trả về mốc vé đã được cho vào, đồng thời đẩy mốc lên theo thời gian.
+
+    Mốc mới chỉ được ghi nếu dòng vẫn giữ đúng giá trị vừa đọc (so sánh rồi
+    ghi trong một câu UPDATE); tiến trình ghi chậm hơn đọc lại giá trị của
+    tiến trình kia, nên không cho vào quá tốc độ cấu hình.
+    """
+    now = time.time()
+    # Lùi mốc thời gian một suất: lúc vắng người mua tiếp theo vào ngay
+    idle_last = now - 1 / _admit_rate()
+    state = WaitingRoomCounter.objects.filter(name=ADMITTED).values_list('value', 'marked_at').first()
+    if state is None:
+        # Lần đầu: mọi vé đã phát coi như được vào, bắt đầu tính từ đây
+        counter, _ = WaitingRoomCounter.objects.get_or_create(
+            name=ADMITTED, defaults={'value': _counter_value(ISSUED), 'marked_at': idle_last},
+        )
+        return counter.value
+
+    upto, last = state
+    gained = int((now - last) * _admit_rate())
+    if gained < 1:
+        return upto
+    new_upto = min(upto + gained, _counter_value(ISSUED))
+    if new_upto <= upto:
+        # Không ai chờ: chỉ dời mốc thời gian để lúc vắng không tích lũy suất
+        new_upto = upto
+    # Lùi mốc thời gian đúng bằng phần đã dùng để không mất phần lẻ
+    new_last = last + gained / _admit_rate() if new_upto == upto + gained else idle_last
+    if WaitingRoomCounter.objects.filter(name=ADMITTED, value=upto, marked_at=last).update(
+        value=new_upto, marked_at=new_last,
+    ):
+        return new_upto
+    return _counter_value(ADMITTED, upto)
+
+
+def acquire_active_slot():
+    """
+    Giữ một suất thanh toán trong WAITING_ROOM_MAX_ACTIVE suất.
+
+    Trả về:
+        tuple | None: (tên suất, hạn giữ) để trả lại bằng release_active_slot(),
+        None nếu mọi suất đang được giữ
+    """
+    names = [f'{ACTIVE_SLOT_PREFIX}{i}' for i in range(settings.WAITING_ROOM_MAX_ACTIVE)]
+    slots = WaitingRoomCounter.objects.filter(name__in=names)
+    now = time.time()
+    free = list(slots.filter(marked_at__lt=now).values_list('name', flat=True))
+    if not free and slots.count() < len(names):
+        WaitingRoomCounter.objects.bulk_create(
+            [WaitingRoomCounter(name=name) for name in names], ignore_conflicts=True,
+        )
+        free = list(slots.filter(marked_at__lt=now).values_list('name', flat=True))
+    random.shuffle(free)
+
+    expires = now + ACTIVE_LEASE_SECONDS
+    for name in free:
+        # Chỉ giành được nếu suất vẫn còn trống (tiến trình khác có thể vừa lấy)
+        if slots.filter(name=name, marked_at__lt=now).update(marked_at=expires):
+            return name, expires
+    return None
+
+
+def release_active_slot(slot):
+    """Trả suất; hạn giữ là dấu sở hữu nên không trả nhầm suất đã hết hạn rồi bị người khác lấy"""
+    name, expires = slot
+    WaitingRoomCounter.objects.filter(name=name, marked_at=expires).update(marked_at=0)
+
+
+def read_ticket(request):
+    """Số vé trong cookie đã ký, hoặc None nếu không có/hết hạn/bị sửa"""
+    try:
+        return int(request.get_signed_cookie(
+            TICKET_COOKIE, salt=TICKET_SALT, max_age=settings.WAITING_ROOM_TICKET_TTL
+        ))
+    except (KeyError, ValueError, signing.BadSignature):
+        return None
+
+
+def queue_status(request):
+    """QueueStatus của người mua hiện tại, hoặc None nếu chưa có vé"""
+    ticket = read_ticket(request)
+    if ticket is None:
+        return None
+    return QueueStatus(ticket=ticket, admitted_upto=admitted_upto())
+
+
+def set_ticket_cookie(response, ticket):
+    response.set_signed_cookie(
+        TICKET_COOKIE, str(ticket), salt=TICKET_SALT,
+        max_age=settings.WAITING_ROOM_TICKET_TTL, httponly=True, samesite='Lax',
+        secure=settings.SESSION_COOKIE_SECURE,
+    )
+
+
+def release_ticket(response):
+    """Xóa vé sau khi đặt hàng xong để vé không bị dùng lại"""
+    response.delete_cookie(TICKET_COOKIE, samesite='Lax')
+
+
+def waiting_room_required(view_func):
+    """
+    Decorator đặt trước view thanh toán: người chưa tới lượt bị chuyển tới trang
+    chờ; người đã tới lượt chỉ vào được khi số request thanh toán đang chạy
+    chưa vượt WAITING_ROOM_MAX_ACTIVE (ngược lại trả 503 kèm Retry-After).
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not is_enabled():
+            return view_func(request, *args, **kwargs)
+
+        status = queue_status(request)
+        if status is None:
+            response = redirect('waiting_room')
+            set_ticket_cookie(response, issue_ticket())
+            return response
+        if not status.admitted:
+            return redirect('waiting_room')
+
+        slot = acquire_active_slot()
+        if slot is None:
+            response = render(request, 'waiting_room.html', {
+                'status': status,
+                'busy': True,
+                'refresh_seconds': settings.WAITING_ROOM_REFRESH_SECONDS,
+            }, status=503)
+            response['Retry-After'] = str(settings.WAITING_ROOM_REFRESH_SECONDS)
+            return response
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            release_active_slot(slot)
+
+    return wrapper
@@ -3,6 +3,10 @@ ASGI config for vanphongpham project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Luồng SSE tồn kho (/api/stock-events/) cần chạy qua ASGI, ví dụ:
+    uvicorn vanphongpham.asgi:application --workers 4
+Mỗi tiến trình có một bộ đọc thay đổi dùng chung (shop/live_stock.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
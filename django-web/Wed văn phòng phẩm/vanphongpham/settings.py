@@ -42,11 +42,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'shop.middleware.PriorityLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'shop.middleware.StatementTimeoutMiddleware',
+    'shop.middleware.CartMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -62,6 +65,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'shop.context_processors.cart',
             ],
         },
     },
@@ -136,3 +140,107 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Inventory configuration - Cấu hình kho hàng
+# Khoảng cách tối thiểu giữa hai lần chụp tồn kho (lệnh take_stock_snapshot)
+STOCK_SNAPSHOT_INTERVAL_HOURS = 24
+# Số ngày giữ chuyển động hàng trong bảng chính (lệnh archive_stock_movements)
+STOCK_MOVEMENT_RETENTION_DAYS = 180
+# Dự báo tiêu thụ (lệnh compute_demand)
+DEMAND_WINDOW_DAYS = 90
+REORDER_LEAD_TIME_DAYS = 7
+REORDER_SERVICE_Z = 1.65
+# Chia phần tồn kho cho dòng bán chạy (lệnh tune_hot_stock)
+STOCK_SHARD_COUNT = 8
+STOCK_HOT_LOCK_WAIT_MS = 2000  # tổng thời gian chờ khóa trong cửa sổ để chia phần
+STOCK_COLD_OPS = 50  # dưới số lần trừ/cộng mỗi chu kỳ thì gộp lại
+
+# Nơi lưu giỏ hàng: SessionCartStore hoặc CacheCartStore (cần cache dùng chung giữa các process)
+CART_STORE = 'shop.cart.SessionCartStore'
+# Chu kỳ (giây) mỗi worker kiểm tra thay đổi danh mục để cập nhật chỉ mục gợi ý tìm kiếm
+AUTOCOMPLETE_REFRESH_SECONDS = 30
+# Chu kỳ (giây) mỗi worker kiểm tra thay đổi sản phẩm/tồn kho để cập nhật bitmap lọc trang chủ
+FACET_REFRESH_SECONDS = 30
+# Phòng chờ ảo trước trang thanh toán khi khuyến mãi (bật lên khi chạy sale)
+WAITING_ROOM_ENABLED = False
+# Số người mua được cho vào thanh toán mỗi phút
+WAITING_ROOM_ADMIT_PER_MINUTE = 120
+# Số request thanh toán chạy đồng thời tối đa (phần worker còn lại phục vụ danh mục)
+WAITING_ROOM_MAX_ACTIVE = 8
+# Thời hạn (giây) của vé xếp hàng đã ký
+WAITING_ROOM_TICKET_TTL = 1800
+# Chu kỳ (giây) trang chờ tự tải lại
+WAITING_ROOM_REFRESH_SECONDS = 15
+# Giới hạn request đồng thời theo lớp ưu tiên (mỗi tiến trình): limit = số request chạy cùng lúc,
+# queue = số request được chờ, timeout_ms = thời gian chờ tối đa, yield_to = lớp được nhường khi quá tải,
+# shed_at = số request đang chạy của lớp mà từ đó các lớp nhường cho nó bị từ chối (mặc định = limit)
+REQUEST_PRIORITY_CLASSES = {
+    'critical': {'limit': 16, 'queue': 64, 'timeout_ms': 10000, 'shed_at': 12},
+    'normal': {'limit': 24, 'queue': 48, 'timeout_ms': 3000},
+    'heavy': {'limit': 2, 'queue': 4, 'timeout_ms': 1000, 'yield_to': 'critical'},
+}
+REQUEST_PRIORITY_DEFAULT = 'normal'
+# Tên URL -> lớp ưu tiên
+REQUEST_PRIORITY_ROUTES = {
+    'checkout': 'critical',
+    'checkout_success': 'critical',
+    'waiting_room': 'critical',
+    'cart': 'critical',
+    'cart_api_add': 'critical',
+    'cart_api_update': 'critical',
+    'cart_api_remove': 'critical',
+    'warehouse_statistics': 'heavy',
+    'stock_movement_log': 'heavy',
+    'sales_report': 'heavy',
+    'low_stock_report': 'heavy',
+    'stock_timeseries': 'heavy',
+    'pick_list': 'heavy',
+}
+# Giá trị Retry-After (giây) khi request bị từ chối
+REQUEST_PRIORITY_RETRY_AFTER = 5
+# Giới hạn thời gian (ms) mỗi câu truy vấn theo tên URL; quá hạn thì CSDL hủy câu lệnh
+STATEMENT_TIMEOUTS = {
+    'stock_movement_log': 5000,
+    'warehouse_statistics': 10000,
+    'sales_report': 10000,
+    'low_stock_report': 5000,
+    'stock_timeseries': 5000,
+}
+# Hàng đợi công việc nền (lệnh runworker): queue -> số việc chạy đồng thời tối đa (tính chung mọi worker)
+JOB_QUEUES = {
+    'default': 4,
+    'email': 2,
+    'reports': 1,
+}
+# Chu kỳ (giây) worker kiểm tra việc mới khi hàng đợi trống
+JOB_POLL_SECONDS = 1.0
+# Thời gian chờ trước lần thử lại đầu tiên (giây), tăng gấp đôi mỗi lần, tối đa JOB_RETRY_MAX_SECONDS
+JOB_RETRY_BASE_SECONDS = 10
+JOB_RETRY_MAX_SECONDS = 3600
+# Việc 'running' quá thời hạn này (giây) coi như worker đã chết và được trả lại hàng đợi
+JOB_LOCK_TIMEOUT_SECONDS = 900
+# Task định kỳ: tên task -> chu kỳ (giây)
+JOB_SCHEDULE = {
+    'shop.tasks.refresh_report_rollups': 300,
+}
+# Kích thước tối đa (px) của ảnh đại diện sau khi xử lý
+AVATAR_MAX_SIZE = 512
+# Gửi email thông báo đơn hàng theo lô (lệnh send_queued_mail)
+MAIL_BATCH_SIZE = 100
+# Số email tối đa mỗi giây (0 = không giới hạn) và số email mỗi phiên SMTP trước khi kết nối lại
+MAIL_RATE_PER_SECOND = 10
+MAIL_MESSAGES_PER_CONNECTION = 100
+MAIL_MAX_ATTEMPTS = 6
+MAIL_POLL_SECONDS = 2.0
+# Luồng SSE thay đổi tồn kho: chu kỳ (giây) bộ đọc chung của mỗi tiến trình kiểm tra CSDL,
+# chu kỳ gửi keepalive (giây) và thời gian trình duyệt chờ trước khi kết nối lại (ms)
+LIVE_STOCK_POLL_SECONDS = 2.0
+LIVE_STOCK_KEEPALIVE_SECONDS = 15
+LIVE_STOCK_RETRY_MS = 5000
+# Outbox sự kiện thay đổi (lệnh relay_outbox): số sự kiện mỗi lô, chu kỳ kiểm tra khi rảnh (giây),
+# thời gian chờ một ID bị thiếu trước khi coi là đã rollback (giây) và số ngày giữ sự kiện đã xử lý
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_POLL_SECONDS = 1.0
+OUTBOX_GAP_TIMEOUT_SECONDS = 30
+OUTBOX_RETENTION_DAYS = 7